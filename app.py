@@ -3,22 +3,58 @@ Frontend Web para SalmoAvianLight
 """
 import streamlit as st
 import pandas as pd
-import os
 import time
-import shutil
 from pathlib import Path
-from typing import Optional, Dict, Tuple, List
+from typing import Callable, Optional, Dict, Tuple, List
 import sys
 import io
-import concurrent.futures
 import base64
+import requests
 
 # Agregar el directorio raíz al path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from services.analysis_client import AnalysisClient
-from utils.zipper import crear_zip_resultados
+from services.analysis_client import ESTADO_NO_DISPONIBLE, AnalysisClient
+from services import metricas
+from services.pool_analisis import crear_pool_desde_entorno
+from services.sondeo import PlanificadorSondeo
+from services.tablas_resultados import TablasResultados
+from src.tabla_columnar import COLUMNA_GC, COLUMNA_LONGITUD, COLUMNAS_ORDENABLES
+from utils.zipper import FORMATOS_TABLAS, iterar_zip, miembros_resultados
+from src.compresion import es_nombre_fasta_valido
+from src.validacion import describir_invalidos, validar_fasta
+
+# Extensiones aceptadas por el cargador (FASTA plano o comprimido con gzip/BGZF/zstd)
+TIPOS_ARCHIVO_FASTA = ['fa', 'fasta', 'gz', 'bgz', 'zst']
+
+# Nombres de los formatos de tablas del ZIP de resultados
+NOMBRES_FORMATOS_TABLAS = {
+    'csv': 'CSV',
+    'csv.zst': 'CSV comprimido (zstd)',
+    'parquet': 'Parquet',
+}
+
+# Nombres de las políticas de tratamiento de Ns (ver src/codificacion.py)
+NOMBRES_POLITICAS_NS = {
+    'imputar': 'Reemplazar N por A',
+    'conservar': 'Conservar (codones con N aparte)',
+    'omitir_codones': 'Omitir codones con N',
+    'enmascarar': 'Omitir codones con N y excluir N del %GC',
+    'descartar': 'Descartar secuencias con muchas N',
+}
+
+# Navegador de la tabla de métricas: nombres de columnas y filas por página
+NOMBRES_COLUMNAS_METRICAS = {
+    'id': 'Identificador',
+    'longitud': 'Longitud (pb)',
+    'porcentaje_GC': 'Contenido GC (%)',
+}
+TAMANOS_PAGINA_METRICAS = [15, 50, 100, 500]
+
+# Modo API: segundos seguidos sin respuesta del backend antes de dejar de
+# consultar el estado de un trabajo
+PLAZO_SIN_RESPUESTA_S = 300
 
 # Configuración de la página
 st.set_page_config(
@@ -166,6 +202,13 @@ CHART_MASTER = {
     }
 }
 
+# Gráficos que admiten modo interactivo (agregados en el servidor y renderizados en el navegador)
+GRAFICOS_INTERACTIVOS = {
+    "GF5": {"columna": "longitud", "eje": "Longitud de secuencia (pb)", "color": "skyblue"},
+    "GF3": {"columna": "porcentaje_GC", "eje": "Contenido de GC (%)", "color": "lightgreen"},
+    "GF9": {"columna": None, "eje": None, "color": None},
+}
+
 @st.cache_data(ttl=3600, show_spinner=False)
 def get_available_charts():
     """Gráficos disponibles que COINCIDEN EXACTAMENTE con visualizacion.py"""
@@ -194,12 +237,67 @@ def get_chart_descriptions():
         "DESC_GF9": "Relación entre Longitud y Contenido GC - Diagrama de dispersión que explora la posible correlación entre el tamaño de las secuencias y su composición GC. Utiliza densidad de color para mostrar concentraciones de puntos, revelando si genes más largos tienden a tener composiciones GC específicas o si no existe relación aparente."
     }
 
+@st.cache_resource(show_spinner=False)
+def obtener_pool_analisis():
+    """Pool de procesos precalentados, compartido por todas las sesiones (SALMO_POOL_TRABAJADORES)."""
+    return crear_pool_desde_entorno()
+
+@st.cache_resource(max_entries=8, ttl=3600, show_spinner=False)
+def _cargar_tablas_resultados(clave_trabajo: str, _cargar) -> TablasResultados:
+    """Tablas de un trabajo (clave_trabajo identifica el trabajo; _cargar no entra en la clave de la caché)."""
+    # Solo se ejecuta la primera vez que se muestran los resultados del trabajo
+    metricas.registrar_fallo_cache("tablas_resultados")
+    return _cargar()
+
+def obtener_tablas_resultados(resultados: Dict, artefactos: Dict) -> TablasResultados:
+    """
+    Tablas de resultados del análisis actual, leídas una vez por trabajo.
+    
+    Los reruns siguientes (checkboxes, sliders, descargas) reutilizan los
+    DataFrames y los bytes de los CSV sin volver a leerlos ni serializarlos.
+    La tabla de métricas se consulta por páginas (en modo API, al backend) y
+    su CSV solo se descarga si se pide.
+    
+    Lanza:
+    ------
+    ValueError: Si en modo API faltan las URLs de las tablas
+    """
+    metricas.registrar_consulta_cache("tablas_resultados")
+    if st.session_state.analysis_client.mode == "API":
+        urls = {'metricas': resultados.get('resumen_csv_url'), 'codones': resultados.get('codon_csv_url')}
+        if not all(urls.values()):
+            raise ValueError("URLs de las tablas de resultados no disponibles")
+        clave = st.session_state.job_id or urls['metricas']
+        cliente = st.session_state.analysis_client
+        url_metricas = resultados.get('metricas_url')
+        if url_metricas:
+            cargar = lambda: TablasResultados(
+                {
+                    'metricas': lambda: cliente.descargar_artefacto(urls['metricas'], timeout=120),
+                    'codones': contenido_artefacto(artefactos, urls['codones']),
+                },
+                lambda consulta: cliente.consultar_metricas(url_metricas, consulta),
+            )
+        else:
+            # Backend sin /metricas: las dos tablas se descargan enteras
+            cargar = lambda: TablasResultados({nombre: contenido_artefacto(artefactos, url) for nombre, url in urls.items()})
+    else:
+        directorio = str(Path(resultados.get('resumen_csv_path', 'results/resumen_metricas.csv')).parent)
+        clave = st.session_state.job_id or directorio
+        cargar = lambda: TablasResultados.desde_directorio(directorio)
+    return _cargar_tablas_resultados(clave, cargar)
+
 def init_session_state():
     """Inicialización del estado de la sesión"""
     defaults = {
-        'analysis_client': AnalysisClient(),
+        'analysis_client': AnalysisClient(pool=obtener_pool_analisis()),
         'job_id': None,
         'analysis_status': None,
+        'estado_trabajo': None,
+        'planificador_sondeo': None,
+        'sin_respuesta_desde': None,
+        'artefactos_descargados': {},
+        'descargas_preparadas': {},
         'analysis_results': None,
         'last_params': None,
         'error_message': None,
@@ -212,68 +310,60 @@ def init_session_state():
         if key not in st.session_state:
             st.session_state[key] = value
 
-@st.cache_data(ttl=300, show_spinner=False)
 def validar_archivo_fasta(archivo) -> Tuple[bool, Optional[str]]:
+    """Valida un FASTA subido usando la caché de validaciones (ver _validar_archivo_fasta_cacheado)."""
+    metricas.registrar_consulta_cache("validacion_fasta")
+    return _validar_archivo_fasta_cacheado(archivo)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _validar_archivo_fasta_cacheado(archivo) -> Tuple[bool, Optional[str]]:
     """
-    Validación mejorada de archivos FASTA.
+    Validación completa de archivos FASTA.
     
     Verifica:
     - Que el archivo no sea None
-    - Que tenga extensión .fa o .fasta
+    - Que tenga extensión .fa o .fasta (opcionalmente .gz, .bgz o .zst)
     - Que no esté vacío
-    - Que tenga el formato FASTA básico (comience con '>')
-    - Que tenga al menos una secuencia válida
+    - Todo su contenido (descomprimido en flujo, ver src/validacion.py): que
+      empiece por una cabecera '>', que cada cabecera tenga identificador
+      y que haya al menos una base. Los caracteres distintos de A, T, C, G y
+      N no rechazan el archivo (el análisis los omite): se avisa en el resumen
+    
+    Retorna:
+    --------
+    tuple
+        (True, resumen con registros, bases y avisos) o (False, mensaje de error)
     """
+    # Solo se ejecuta cuando la caché no tiene el resultado
+    metricas.registrar_fallo_cache("validacion_fasta")
     if archivo is None:
         return False, "❌ Archivo requerido"
     
-    nombre = archivo.name.lower()
-    if not (nombre.endswith('.fa') or nombre.endswith('.fasta')):
-        return False, "❌ El archivo debe tener extensión .fa o .fasta"
+    if not es_nombre_fasta_valido(archivo.name):
+        return False, "❌ El archivo debe tener extensión .fa o .fasta (opcionalmente comprimido: .gz, .bgz o .zst)"
     
     if archivo.size == 0:
         return False, "❌ El archivo está vacío"
     
     try:
-        # Leer los primeros bytes para validar formato básico
-        archivo.seek(0)
-        primeros_bytes = archivo.read(1000)  # Leer más bytes para mejor validación
-        archivo.seek(0)
-        
-        # Verificar que comience con '>'
-        if not primeros_bytes.startswith(b'>'):
-            return False, "❌ Formato FASTA inválido: el archivo debe comenzar con '>' (cabecera de secuencia)"
-        
-        # Verificar que tenga al menos una secuencia completa
-        # Buscar patrón: '>' seguido de texto y luego nueva línea con secuencia
-        contenido_str = primeros_bytes.decode('utf-8', errors='ignore')
-        
-        # Verificar que haya al menos un salto de línea después de la primera cabecera
-        if b'\n' not in primeros_bytes and b'\r\n' not in primeros_bytes:
-            if len(primeros_bytes) < 50:
-                return False, "❌ El archivo parece estar incompleto o corrupto. Verifique que tenga el formato FASTA correcto."
-        
-        # Verificar que haya al menos una secuencia (buscar múltiples '>')
-        num_cabeceras = primeros_bytes.count(b'>')
-        if num_cabeceras == 0:
-            return False, "❌ No se encontraron secuencias FASTA válidas en el archivo"
-        
-        # Verificar que no sea solo texto sin secuencias
-        # Un FASTA válido debe tener: '>ID\n' seguido de caracteres de secuencia
-        lineas = contenido_str.split('\n', 3)
-        if len(lineas) < 2:
-            return False, "❌ El archivo FASTA parece estar incompleto. Debe tener al menos una cabecera y una secuencia."
-        
-        # Verificar que la segunda línea (secuencia) tenga caracteres válidos
-        if len(lineas) >= 2 and len(lineas[1].strip()) == 0:
-            return False, "❌ El archivo FASTA tiene una cabecera pero la secuencia está vacía"
-            
-    except UnicodeDecodeError:
-        return False, "❌ Error: el archivo contiene caracteres no válidos. Verifique que sea un archivo de texto FASTA."
+        # Una pasada por todo el archivo antes de analizar: un archivo corrupto
+        # se rechaza aquí y no tras minutos de análisis
+        resultado = validar_fasta(archivo, archivo.name)
+    except ValueError as e:
+        return False, f"❌ {str(e)}"
     except Exception as e:
         return False, f"❌ Error al leer el archivo: {str(e)}. El archivo puede estar corrupto."
+    finally:
+        archivo.seek(0)
     
-    return True, None
+    if resultado['bases'] == 0:
+        return False, "❌ El archivo FASTA tiene cabeceras pero ninguna secuencia"
+    
+    resumen = f"{resultado['registros']} secuencias, {resultado['bases']} bases"
+    if resultado['invalidos']:
+        # El análisis omite estos caracteres al cargar: se avisa, no se rechaza
+        resumen += f"; ⚠️ {describir_invalidos(resultado)}"
+    return True, resumen
 
 def mostrar_seleccion_graficos():
     """Selección de gráficos sin prefijos GF"""
@@ -328,10 +418,11 @@ def ejecutar_analisis(salmonella_file, gallus_file, params: Dict):
             st.write(f"Archivo Gallus: {gallus_file.name} ({tamaño_gall:.1f}MB)")
             st.write(f"Gráficos seleccionados: {num_charts}")
             
-            # Leer archivos
+            # Los archivos subidos se pasan tal cual: el cliente los lee en flujo
+            # sin copiarlos enteros a bytes/str ni escribirlos a disco
             st.write("Procesando archivos FASTA...")
-            salmonella_content = salmonella_file.getvalue()
-            gallus_content = gallus_file.getvalue()
+            salmonella_content = salmonella_file
+            gallus_content = gallus_file
             
             # Configurar parámetros
             params['selected_charts'] = st.session_state.selected_charts
@@ -346,16 +437,19 @@ def ejecutar_analisis(salmonella_file, gallus_file, params: Dict):
                 )
                 st.session_state.job_id = resultado.get('jobId')
                 st.session_state.analysis_status = 'SUBMITTED'
+                # El estado se consulta después, con intervalo adaptativo (ver main)
+                st.session_state.planificador_sondeo = PlanificadorSondeo()
+                status.update(label="Análisis enviado al servidor", state="complete")
             else:
                 resultado = st.session_state.analysis_client.start_analysis(
                     salmonella_content,
                     gallus_content,
                     params
                 )
+                st.session_state.job_id = resultado.get('jobId')
                 st.session_state.analysis_status = resultado.get('status')
                 st.session_state.analysis_results = resultado.get('results')
-            
-            status.update(label="Análisis completado!", state="complete")
+                status.update(label="Análisis completado!", state="complete")
         
         # Guardar parámetros
         st.session_state.last_params = {
@@ -418,8 +512,240 @@ def ejecutar_analisis(salmonella_file, gallus_file, params: Dict):
         st.error(mensaje_usuario)
         return False
 
-def mostrar_graficos_correspondientes(resultados: Dict):
-    """Muestra gráficos sin prefijos GF en los títulos"""
+def _slider_rango(etiqueta: str, limites: Optional[Tuple[float, float]], key: str) -> Optional[Tuple[float, float]]:
+    """Control de zoom: devuelve el rango visible elegido o None si no hay rango que elegir."""
+    if limites is None or not limites[0] < limites[1]:
+        return None
+    minimo, maximo = limites
+    return st.slider(etiqueta, min_value=minimo, max_value=maximo, value=(minimo, maximo), key=key)
+
+def mostrar_grafico_interactivo(chart_id: str, tablas: TablasResultados):
+    """
+    Renderiza un gráfico web nativo a partir de datos pre-agregados.
+    
+    Solo se envía al navegador el agregado (intervalos o teselas de densidad),
+    nunca un punto por gen. El zoom se implementa re-agregando el rango visible,
+    de modo que el tamaño del payload es fijo. Cada agregado se guarda en las
+    tablas del trabajo: volver a un zoom ya visto no recorre los genes.
+    """
+    import altair as alt
+    from src.agregacion import agregar_histograma, agregar_densidad_2d
+    
+    config = GRAFICOS_INTERACTIVOS[chart_id]
+    df_metricas = tablas.tabla('metricas')
+    
+    if config["columna"] is not None:
+        columna = config["columna"]
+        rango = _slider_rango(f"Rango visible: {config['eje']}", tablas.rango('metricas', columna), key=f"zoom_{chart_id}")
+        df_agregado = tablas.memorizar(
+            ('histograma', columna, rango),
+            lambda: agregar_histograma(df_metricas[columna], bins=50, rango=rango)
+        )
+        
+        grafico = alt.Chart(df_agregado).mark_bar(color=config["color"], stroke="black", strokeWidth=0.5).encode(
+            x=alt.X("inicio:Q", bin="binned", title=config["eje"]),
+            x2="fin:Q",
+            y=alt.Y("conteo:Q", title="Frecuencia"),
+            tooltip=["inicio:Q", "fin:Q", "conteo:Q"],
+        )
+    else:
+        col_x, col_y = st.columns(2)
+        with col_x:
+            rango_x = _slider_rango("Rango visible: Longitud (pb)", tablas.rango('metricas', "longitud"), key=f"zoom_{chart_id}_x")
+        with col_y:
+            rango_y = _slider_rango("Rango visible: Contenido GC (%)", tablas.rango('metricas', "porcentaje_GC"), key=f"zoom_{chart_id}_y")
+        df_agregado = tablas.memorizar(
+            ('densidad', rango_x, rango_y),
+            lambda: agregar_densidad_2d(
+                df_metricas["longitud"], df_metricas["porcentaje_GC"],
+                rango_x=rango_x, rango_y=rango_y
+            )
+        )
+        
+        grafico = alt.Chart(df_agregado).mark_rect().encode(
+            x=alt.X("x_inicio:Q", title="Longitud (pb)"),
+            x2="x_fin:Q",
+            y=alt.Y("y_inicio:Q", title="Contenido GC (%)"),
+            y2="y_fin:Q",
+            color=alt.Color("conteo:Q", title="Genes", scale=alt.Scale(scheme="viridis")),
+            tooltip=["x_inicio:Q", "x_fin:Q", "y_inicio:Q", "y_fin:Q", "conteo:Q"],
+        )
+    
+    st.altair_chart(grafico, use_container_width=True)
+
+def mostrar_navegador_metricas(tablas: TablasResultados):
+    """
+    Navegador de la tabla de métricas con filtro, orden y paginación en el servidor.
+    
+    La consulta se resuelve sobre la tabla en Parquet (localmente o en el
+    backend) y al navegador solo llega la página visible, así que el tiempo
+    de cada interacción no depende del número de genes.
+    """
+    # Claves de los controles por trabajo: los rangos de otro análisis no valen
+    sufijo = st.session_state.job_id or ""
+    consulta_inicial = {'pagina': 0, 'tam_pagina': TAMANOS_PAGINA_METRICAS[0]}
+    info = tablas.pagina_metricas(consulta_inicial)
+    rangos = info['rangos']
+    
+    col_id, col_gc, col_longitud = st.columns(3)
+    with col_id:
+        filtro_id = st.text_input("Buscar por id", key=f"nav_metricas_id_{sufijo}", placeholder="Parte del identificador")
+    with col_gc:
+        rango_gc = _slider_rango("Contenido GC (%)", rangos[COLUMNA_GC], key=f"nav_metricas_gc_{sufijo}")
+    with col_longitud:
+        rango_longitud = _slider_rango("Longitud (pb)", rangos[COLUMNA_LONGITUD], key=f"nav_metricas_longitud_{sufijo}")
+    
+    col_orden, col_sentido, col_tam = st.columns(3)
+    with col_orden:
+        orden = st.selectbox(
+            "Ordenar por",
+            options=[None, *COLUMNAS_ORDENABLES],
+            format_func=lambda columna: NOMBRES_COLUMNAS_METRICAS.get(columna, "Orden del análisis"),
+            key=f"nav_metricas_orden_{sufijo}"
+        )
+    with col_sentido:
+        descendente = st.checkbox("Descendente", key=f"nav_metricas_descendente_{sufijo}", disabled=orden is None)
+    with col_tam:
+        tam_pagina = st.selectbox("Filas por página", options=TAMANOS_PAGINA_METRICAS, key=f"nav_metricas_tam_{sufijo}")
+    
+    consulta = {
+        'filtro_id': filtro_id.strip() or None,
+        # El rango completo no filtra: así la vista inicial lee solo su página
+        'rango_gc': None if rango_gc == rangos[COLUMNA_GC] else rango_gc,
+        'rango_longitud': None if rango_longitud == rangos[COLUMNA_LONGITUD] else rango_longitud,
+        'orden': orden,
+        'descendente': descendente and orden is not None,
+        'tam_pagina': tam_pagina,
+    }
+    # Un filtro u orden nuevo vuelve a la primera página
+    clave_pagina = f"nav_metricas_pagina_{sufijo}"
+    if st.session_state.get(f"nav_metricas_consulta_{sufijo}") != consulta:
+        st.session_state[f"nav_metricas_consulta_{sufijo}"] = consulta
+        st.session_state[clave_pagina] = 1
+    
+    pagina = tablas.pagina_metricas({**consulta, 'pagina': st.session_state.get(clave_pagina, 1) - 1})
+    # La página pedida puede no existir (ej: menos filas que antes): se muestra la última
+    st.session_state[clave_pagina] = pagina['pagina'] + 1
+    st.dataframe(pagina['filas'], use_container_width=True, hide_index=True)
+    
+    col_pagina, col_resumen = st.columns([1, 3])
+    with col_pagina:
+        st.number_input("Página", min_value=1, max_value=pagina['paginas'], step=1, key=clave_pagina)
+    with col_resumen:
+        st.caption(
+            f"{pagina['total']} de {pagina['num_filas']} genes · "
+            f"página {pagina['pagina'] + 1} de {pagina['paginas']}"
+        )
+
+def urls_graficos_seleccionados(resultados: Dict) -> List[str]:
+    """URLs (modo API) de las imágenes de los gráficos seleccionados."""
+    chart_map = {chart["id"]: chart for chart in get_available_charts()}
+    urls = []
+    for chart_id in st.session_state.selected_charts:
+        chart_info = chart_map.get(chart_id)
+        if not chart_info:
+            continue
+        for img_url in resultados.get('images', []):
+            if chart_info["filename"] in img_url:
+                urls.append(img_url)
+                break
+    return urls
+
+def contenido_artefacto(artefactos: Dict, url: str) -> bytes:
+    """Contenido de un artefacto ya descargado; si no está, lo descarga ahora."""
+    if url not in artefactos:
+        return st.session_state.analysis_client.descargar_artefacto(url)
+    contenido = artefactos[url]
+    if isinstance(contenido, Exception):
+        raise contenido
+    return contenido
+
+def descargar_artefactos_sesion(urls: List[str]) -> Dict:
+    """
+    Descarga en paralelo los artefactos que la sesión aún no tiene.
+    
+    Lo ya descargado mientras el análisis estaba en curso (resultados
+    parciales) no se vuelve a pedir al mostrar los resultados finales.
+    """
+    descargados = st.session_state.artefactos_descargados
+    faltantes = [url for url in urls if url not in descargados]
+    nuevos = st.session_state.analysis_client.descargar_artefactos(faltantes)
+    # Solo se guardan las descargas correctas: un fallo se reintenta en la siguiente
+    descargados.update({url: contenido for url, contenido in nuevos.items() if not isinstance(contenido, Exception)})
+    return {**nuevos, **{url: descargados[url] for url in urls if url in descargados}}
+
+def boton_descarga_diferida(etiqueta: str, clave: str, generar: Callable[[], bytes], file_name: str, mime: str):
+    """
+    Botón de descarga cuyo contenido solo se genera si el usuario lo pide.
+    
+    st.download_button necesita los bytes al dibujarse: un callable como data
+    no funciona en todas las versiones de Streamlit de requirements.txt. Un
+    primer botón genera el contenido y lo guarda en la sesión bajo clave
+    (incluye el trabajo); a partir de ahí se muestra el botón de descarga.
+    """
+    preparadas = st.session_state.descargas_preparadas
+    if clave not in preparadas:
+        hueco = st.empty()
+        if not hueco.button(f"Preparar {etiqueta}", key=f"preparar_{clave}", use_container_width=True):
+            return
+        with st.spinner(f"Preparando {etiqueta}..."):
+            preparadas[clave] = generar()
+        hueco.empty()
+    st.download_button(
+        label=f"Descargar {etiqueta}",
+        data=preparadas[clave],
+        file_name=file_name,
+        mime=mime,
+        key=f"descargar_{clave}",
+        use_container_width=True
+    )
+
+def mostrar_resultados_parciales(parciales: Dict):
+    """Muestra las tablas y gráficos que el backend ya terminó mientras el análisis sigue en curso."""
+    urls_tablas = [parciales.get('resumen_csv_url'), parciales.get('codon_csv_url')]
+    urls_imagenes = urls_graficos_seleccionados(parciales)
+    if not any(urls_tablas) and not urls_imagenes:
+        return
+    artefactos = descargar_artefactos_sesion([u for u in urls_tablas if u] + urls_imagenes)
+    
+    st.markdown('<div class="section-header">Resultados Parciales</div>', unsafe_allow_html=True)
+    col1, col2 = st.columns(2)
+    for col, titulo, url in ((col1, "Resumen de Métricas", urls_tablas[0]), (col2, "Uso de Codones", urls_tablas[1])):
+        with col:
+            st.subheader(titulo)
+            if not url:
+                st.caption("Calculando...")
+                continue
+            try:
+                st.dataframe(pd.read_csv(io.BytesIO(contenido_artefacto(artefactos, url))).head(15), use_container_width=True)
+            except Exception as e:
+                st.error(f"Error cargando {titulo.lower()}: {e}")
+    
+    chart_map = {chart["filename"]: chart for chart in get_available_charts()}
+    for url in urls_imagenes:
+        chart_info = next((c for nombre, c in chart_map.items() if nombre in url), None)
+        try:
+            st.markdown(f'<div class="chart-title">{chart_info["name"] if chart_info else url}</div>', unsafe_allow_html=True)
+            st.image(contenido_artefacto(artefactos, url), use_container_width=True)
+        except Exception as e:
+            st.error(f"Error cargando gráfico: {e}")
+    pendientes = len(st.session_state.selected_charts) - len(urls_imagenes)
+    if pendientes > 0:
+        st.caption(f"Gráficos pendientes: {pendientes}")
+
+def mostrar_graficos_correspondientes(
+    resultados: Dict,
+    tablas: Optional[TablasResultados] = None,
+    artefactos: Optional[Dict] = None
+):
+    """
+    Muestra gráficos sin prefijos GF en los títulos.
+    
+    Si se pasan las tablas del trabajo, los gráficos de GRAFICOS_INTERACTIVOS se muestran
+    en modo interactivo en lugar de como imagen PNG. En modo API, artefactos
+    contiene las imágenes ya descargadas en paralelo (url -> bytes).
+    """
+    artefactos = artefactos or {}
     st.markdown('<div class="section-header">Resultados Gráficos Generados</div>', unsafe_allow_html=True)
     
     available_charts = get_available_charts()
@@ -445,17 +771,20 @@ def mostrar_graficos_correspondientes(resultados: Dict):
             try:
                 image_found = False
                 
-                if st.session_state.analysis_client.mode == "API":
+                if tablas is not None and chart_id in GRAFICOS_INTERACTIVOS:
+                    mostrar_grafico_interactivo(chart_id, tablas)
+                    image_found = True
+                elif st.session_state.analysis_client.mode == "API":
                     # En modo API, buscar en las URLs de resultados
                     images = resultados.get('images', [])
                     for img_url in images:
                         if filename in img_url:
-                            import requests
-                            response = requests.get(img_url, timeout=10)
-                            if response.status_code == 200:
-                                st.image(response.content, use_container_width=True)
+                            try:
+                                st.image(contenido_artefacto(artefactos, img_url), use_container_width=True)
                                 image_found = True
-                                break
+                            except requests.exceptions.RequestException:
+                                pass
+                            break
                 else:
                     # En modo local, buscar en el sistema de archivos
                     image_path = Path("results/graficos") / filename
@@ -479,67 +808,107 @@ def mostrar_resultados(resultados: Dict):
     """Muestra todos los resultados con gráficos sin prefijos GF"""
     st.markdown('<div class="section-header">Resultados del Análisis</div>', unsafe_allow_html=True)
     
-    # Métricas y datos
-    col1, col2 = st.columns(2)
+    # En modo API: CSVs e imágenes seleccionadas se descargan a la vez (una
+    # sola vez por sesión, ver descargar_artefactos_sesion)
+    artefactos = {}
+    if st.session_state.analysis_client.mode == "API":
+        urls = [resultados.get('codon_csv_url')] + urls_graficos_seleccionados(resultados)
+        if not resultados.get('metricas_url'):
+            # Sin consulta por páginas en el backend, la tabla de métricas se descarga entera
+            urls.append(resultados.get('resumen_csv_url'))
+        artefactos = descargar_artefactos_sesion([u for u in urls if u])
     
-    with col1:
-        st.subheader("Resumen de Métricas")
-        try:
-            if st.session_state.analysis_client.mode == "API":
-                import requests
-                resumen_csv_url = resultados.get('resumen_csv_url')
-                if resumen_csv_url:
-                    response = requests.get(resumen_csv_url, timeout=10)
-                    df_metricas = pd.read_csv(io.StringIO(response.text))
-                else:
-                    st.error("URL de métricas no disponible")
-                    return
-            else:
-                df_metricas = pd.read_csv(resultados.get('resumen_csv_path', 'results/resumen_metricas.csv'))
-            
-            st.dataframe(df_metricas.head(15), use_container_width=True)
-            
-            csv_metricas = df_metricas.to_csv(index=False)
+    # Tablas leídas una vez por trabajo: los reruns no vuelven a leer ni serializar los CSV
+    try:
+        tablas = obtener_tablas_resultados(resultados, artefactos)
+    except Exception as e:
+        st.error(f"Error cargando las tablas de resultados: {e}")
+        return
+    
+    # Identifica el trabajo en las descargas preparadas de la sesión
+    clave_trabajo = st.session_state.job_id or resultados.get('resumen_csv_path') or resultados.get('resumen_csv_url')
+    
+    st.subheader("Resumen de Métricas")
+    try:
+        if tablas.consulta_metricas_disponible:
+            mostrar_navegador_metricas(tablas)
+            # El CSV completo solo se lee (o descarga del backend) si se pide
+            boton_descarga_diferida(
+                "Métricas (CSV)", f"metricas_csv_{clave_trabajo}", lambda: tablas.csv('metricas'),
+                file_name="metricas_salmoavian.csv", mime="text/csv"
+            )
+        else:
+            st.dataframe(tablas.tabla('metricas').head(15), use_container_width=True)
+            # La tabla ya está leída: sus bytes están en memoria
             st.download_button(
                 label="Descargar Métricas (CSV)",
-                data=csv_metricas,
+                data=tablas.csv('metricas'),
                 file_name="metricas_salmoavian.csv",
                 mime="text/csv",
                 use_container_width=True
             )
-        except Exception as e:
-            st.error(f"Error cargando métricas: {e}")
+    except Exception as e:
+        st.error(f"Error cargando métricas: {e}")
     
-    with col2:
-        st.subheader("Uso de Codones")
-        try:
-            if st.session_state.analysis_client.mode == "API":
-                import requests
-                codon_csv_url = resultados.get('codon_csv_url')
-                if codon_csv_url:
-                    response = requests.get(codon_csv_url, timeout=10)
-                    df_codones = pd.read_csv(io.StringIO(response.text))
-                else:
-                    st.error("URL de codones no disponible")
-                    return
-            else:
-                df_codones = pd.read_csv(resultados.get('codon_csv_path', 'results/codon_usage.csv'))
-            
-            st.dataframe(df_codones.head(15), use_container_width=True)
-            
-            csv_codones = df_codones.to_csv(index=False)
-            st.download_button(
-                label="Descargar Codones (CSV)",
-                data=csv_codones,
-                file_name="codones_salmoavian.csv",
-                mime="text/csv",
-                use_container_width=True
-            )
-        except Exception as e:
-            st.error(f"Error cargando datos de codones: {e}")
+    st.subheader("Uso de Codones")
+    try:
+        st.dataframe(tablas.tabla('codones').head(15), use_container_width=True)
+        st.download_button(
+            label="Descargar Codones (CSV)",
+            data=tablas.csv('codones'),
+            file_name="codones_salmoavian.csv",
+            mime="text/csv",
+            use_container_width=True
+        )
+    except Exception as e:
+        st.error(f"Error cargando datos de codones: {e}")
     
     # Gráficos sin prefijos GF
-    mostrar_graficos_correspondientes(resultados)
+    modo_interactivo = st.toggle(
+        "Gráficos interactivos",
+        key="modo_graficos_interactivos",
+        help="Agrega los datos en el servidor y dibuja en el navegador con zoom. Recomendado para conjuntos con muchos genes."
+    )
+    mostrar_graficos_correspondientes(resultados, tablas if modo_interactivo else None, artefactos)
+    
+    # ZIP completo: CSV, gráficos y, si se activó SALMO_PERFIL, el perfil. Se
+    # genera al pedirlo, una vez por trabajo y formato (en modo local, en flujo
+    # desde los archivos; en modo API, lo genera el backend)
+    try:
+        zip_datos = None
+        if resultados.get('resumen_csv_path') or resultados.get('zip_url'):
+            formato_tablas = st.selectbox(
+                "Formato de las tablas en el ZIP",
+                options=list(FORMATOS_TABLAS),
+                format_func=lambda f: NOMBRES_FORMATOS_TABLAS[f],
+                key="formato_tablas_zip",
+                help="Parquet se carga en pandas, Polars o DuckDB sin interpretar texto. El ZIP incluye manifiesto.json con el SHA-256 de cada archivo."
+            )
+        if resultados.get('resumen_csv_path'):
+            directorio = str(Path(resultados['resumen_csv_path']).parent)
+            zip_datos = lambda: b''.join(iterar_zip(miembros_resultados(directorio, formato_tablas=formato_tablas),
+                                                    manifiesto=True))
+        elif resultados.get('zip_url'):
+            cliente = st.session_state.analysis_client
+            url_zip = f"{resultados['zip_url']}?formato={formato_tablas}"
+            zip_datos = lambda: cliente.descargar_artefacto(url_zip, timeout=120)
+        if zip_datos is not None:
+            boton_descarga_diferida(
+                "Todo (ZIP)", f"zip_{formato_tablas}_{clave_trabajo}", zip_datos,
+                file_name="resultados_salmoavian.zip", mime="application/zip"
+            )
+    except Exception as e:
+        st.error(f"Error generando el ZIP de resultados: {e}")
+    
+    # Tiempos y memoria por etapa (solo disponibles en modo local)
+    instrumentacion = resultados.get('instrumentacion')
+    if instrumentacion:
+        with st.expander("Diagnóstico de rendimiento"):
+            st.caption(f"Tiempo total: {instrumentacion['total_segundos']:.2f} s")
+            df_etapas = pd.DataFrame(instrumentacion['etapas'])
+            columnas = ['etapa', 'estado', 'segundos', 'cpu_segundos', 'rss_pico_mb',
+                        'delta_rss_pico_mb', 'registros', 'bases', 'bases_por_segundo']
+            st.dataframe(df_etapas[[c for c in columnas if c in df_etapas.columns]], use_container_width=True)
 
 def interfaz_carga_archivos():
     """Interfaz para carga de archivos"""
@@ -552,15 +921,15 @@ def interfaz_carga_archivos():
         st.subheader("Salmonella")
         salmonella_file = st.file_uploader(
             "Archivo FASTA de Salmonella",
-            type=['fa', 'fasta'],
+            type=TIPOS_ARCHIVO_FASTA,
             key="salmonella_file",
-            help="Secuencias de Salmonella en formato FASTA"
+            help="Secuencias de Salmonella en formato FASTA (admite .gz, .bgz y .zst)"
         )
         if salmonella_file:
             es_valido, mensaje = validar_archivo_fasta(salmonella_file)
             if es_valido:
                 tamaño_mb = salmonella_file.size / (1024 * 1024)
-                st.markdown(f'<p class="upload-success"> Válido: {salmonella_file.name} ({tamaño_mb:.1f}MB)</p>', unsafe_allow_html=True)
+                st.markdown(f'<p class="upload-success"> Válido: {salmonella_file.name} ({tamaño_mb:.1f}MB; {mensaje})</p>', unsafe_allow_html=True)
             else:
                 st.error(f" {mensaje}")
         st.markdown('</div>', unsafe_allow_html=True)
@@ -570,15 +939,15 @@ def interfaz_carga_archivos():
         st.subheader("Gallus")
         gallus_file = st.file_uploader(
             "Archivo FASTA de Gallus", 
-            type=['fa', 'fasta'],
+            type=TIPOS_ARCHIVO_FASTA,
             key="gallus_file",
-            help="Secuencias de Gallus en formato FASTA"
+            help="Secuencias de Gallus en formato FASTA (admite .gz, .bgz y .zst)"
         )
         if gallus_file:
             es_valido, mensaje = validar_archivo_fasta(gallus_file)
             if es_valido:
                 tamaño_mb = gallus_file.size / (1024 * 1024)
-                st.markdown(f'<p class="upload-success"> Válido: {gallus_file.name} ({tamaño_mb:.1f}MB)</p>', unsafe_allow_html=True)
+                st.markdown(f'<p class="upload-success"> Válido: {gallus_file.name} ({tamaño_mb:.1f}MB; {mensaje})</p>', unsafe_allow_html=True)
             else:
                 st.error(f" {mensaje}")
         st.markdown('</div>', unsafe_allow_html=True)
@@ -632,13 +1001,26 @@ def main():
     with col1:
         min_len = st.number_input("Longitud mínima", value=0, help="Filtrar secuencias muy cortas")
     with col2:
-        limpiar_ns = st.checkbox("Limpiar secuencias con Ns", value=True, help="Remover secuencias ambiguas")
+        politica_ns = st.selectbox(
+            "Tratamiento de Ns",
+            options=list(NOMBRES_POLITICAS_NS),
+            format_func=lambda p: NOMBRES_POLITICAS_NS[p],
+            help="Cómo se tratan las bases ambiguas (N) en las métricas y el uso de codones"
+        )
+        fraccion_max_ns = 0.1
+        if politica_ns == 'descartar':
+            fraccion_max_ns = st.number_input(
+                "Fracción máxima de Ns", min_value=0.0, max_value=1.0, value=0.1, step=0.01,
+                help="Se descartan las secuencias con una fracción de N mayor"
+            )
     with col3:
         top_codons = st.slider("Top codones a analizar", 5, 30, 15, help="Número de codones principales")
     
     params = {
         'min_len': min_len, 
-        'limpiar_ns': limpiar_ns, 
+        'limpiar_ns': politica_ns != 'conservar',
+        'politica_ns': politica_ns,
+        'fraccion_max_ns': fraccion_max_ns,
         'top_codons': top_codons
     }
     
@@ -657,6 +1039,10 @@ def main():
     if ejecutar_btn and archivos_listos:
         st.session_state.analysis_results = None
         st.session_state.analysis_status = None
+        st.session_state.estado_trabajo = None
+        st.session_state.sin_respuesta_desde = None
+        st.session_state.artefactos_descargados = {}
+        st.session_state.descargas_preparadas = {}
         st.session_state.error_message = None
         
         if ejecutar_analisis(salmonella_file, gallus_file, params):
@@ -666,18 +1052,56 @@ def main():
     if st.session_state.analysis_status:
         st.markdown('<div class="section-header">Estado del Análisis</div>', unsafe_allow_html=True)
         
+        # Modo API: consultar el estado del trabajo en cada ejecución mientras no termine
+        cliente = st.session_state.analysis_client
+        en_curso = st.session_state.analysis_status in ('SUBMITTED', 'RUNNING')
+        respuesta = None
+        if cliente.mode == "API" and st.session_state.job_id and en_curso:
+            respuesta = cliente.get_status(st.session_state.job_id)
+            if respuesta.get('status') == ESTADO_NO_DISPONIBLE:
+                # Fallo de red transitorio: el trabajo puede seguir en el backend,
+                # se sigue consultando (con esperas crecientes) hasta el plazo
+                ahora = time.monotonic()
+                if st.session_state.sin_respuesta_desde is None:
+                    st.session_state.sin_respuesta_desde = ahora
+                elif ahora - st.session_state.sin_respuesta_desde > PLAZO_SIN_RESPUESTA_S:
+                    cliente.abandonar_trabajo(st.session_state.job_id)
+                    st.session_state.analysis_status = 'FAILED'
+                    st.session_state.error_message = (
+                        f"El servidor no responde desde hace más de {PLAZO_SIN_RESPUESTA_S} s "
+                        f"(trabajo {st.session_state.job_id}; puede seguir en curso). {respuesta.get('message')}"
+                    )
+            else:
+                st.session_state.sin_respuesta_desde = None
+                st.session_state.estado_trabajo = respuesta
+                st.session_state.analysis_status = respuesta.get('status', 'SUBMITTED')
+                if st.session_state.analysis_status == 'FAILED':
+                    st.session_state.error_message = respuesta.get('message')
+        
         status = st.session_state.analysis_status
+        estado = st.session_state.estado_trabajo or {}
         
-        if status == 'SUBMITTED':
-            st.info(" Análisis en cola de procesamiento...")
-            st.progress(0.3)
-        elif status == 'RUNNING':
-            st.info(" Procesamiento en curso...")
-            st.progress(0.7)
+        if status in ('SUBMITTED', 'RUNNING'):
+            if st.session_state.sin_respuesta_desde is not None:
+                st.warning(f" Sin respuesta del servidor, reintentando... ({respuesta.get('message') if respuesta else ''})")
+            if status == 'SUBMITTED':
+                st.info(" Análisis en cola de procesamiento...")
+            else:
+                etapa = estado.get('etapa')
+                st.info(f" Procesamiento en curso... (última etapa: {etapa})" if etapa else " Procesamiento en curso...")
+            st.progress(float(estado.get('progreso') or 0.0))
+            mostrar_resultados_parciales(estado.get('parciales') or {})
+            
+            # Esperar (intervalo adaptativo con desfase aleatorio) y volver a consultar
+            planificador = st.session_state.planificador_sondeo
+            if planificador is None:
+                planificador = st.session_state.planificador_sondeo = PlanificadorSondeo()
+            time.sleep(planificador.siguiente_espera(respuesta or estado))
+            st.rerun()
         elif status == 'COMPLETED':
             st.success(" Análisis completado exitosamente!")
             
-            if st.session_state.analysis_client.mode == "API" and st.session_state.job_id:
+            if st.session_state.analysis_client.mode == "API" and st.session_state.job_id and not st.session_state.analysis_results:
                 try:
                     with st.spinner("Obteniendo resultados..."):
                         resultados = st.session_state.analysis_client.get_results(st.session_state.job_id)
@@ -689,9 +1113,8 @@ def main():
                 mostrar_resultados(st.session_state.analysis_results)
         
         elif status == 'FAILED':
-            st.error(" Error en el análisis del archivo, se han encontrado caracteres inválidos en las secuencias.")
-            if st.session_state.error_message:
-                st.error(st.session_state.error_message)
+            # El mensaje que registró el trabajo (validación, memoria, backend...)
+            st.error(st.session_state.error_message or " Error en el análisis.")
 
 if __name__ == "__main__":
     main()
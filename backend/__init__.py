@@ -0,0 +1 @@
+# Backend de referencia para el modo API de AnalysisClient
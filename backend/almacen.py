@@ -0,0 +1,195 @@
+"""
+Almacén de archivos subidos por fragmentos direccionados por contenido.
+
+Cada fragmento se guarda una sola vez bajo su SHA-256, de modo que un
+fragmento (o un archivo completo) que ya se subió no se vuelve a enviar.
+Un archivo se identifica por el SHA-256 de todo su contenido.
+
+    <directorio>/fragmentos/ab/abcdef...    fragmento (bytes sin comprimir)
+    <directorio>/subidas/<sha256>.json      lista de fragmentos del archivo
+    <directorio>/archivos/<sha256>          archivo ensamblado
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+_PATRON_SHA256 = re.compile(r'^[0-9a-f]{64}$')
+TAM_BLOQUE_COPIA = 1024 * 1024
+
+
+def validar_sha256(valor: str) -> str:
+    """Comprueba que valor sea un SHA-256 en hexadecimal (evita rutas arbitrarias)."""
+    if not isinstance(valor, str) or not _PATRON_SHA256.match(valor):
+        raise ValueError(f"Identificador SHA-256 no válido: {valor!r}")
+    return valor
+
+
+def _escribir_atomico(ruta: Path, datos: bytes):
+    """Escribe a un temporal en el mismo directorio y lo renombra (nunca queda a medias)."""
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, prefix=".tmp_")
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(datos)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+
+
+class AlmacenFragmentos:
+    """Almacén en disco de fragmentos y archivos, seguro entre hilos."""
+
+    def __init__(self, directorio: str):
+        self.directorio = Path(directorio)
+        self._lock = threading.Lock()
+        for sub in ("fragmentos", "subidas", "archivos"):
+            (self.directorio / sub).mkdir(parents=True, exist_ok=True)
+
+    # --- Fragmentos ---
+
+    def ruta_fragmento(self, sha256: str) -> Path:
+        validar_sha256(sha256)
+        return self.directorio / "fragmentos" / sha256[:2] / sha256
+
+    def tiene_fragmento(self, sha256: str) -> bool:
+        return self.ruta_fragmento(sha256).exists()
+
+    def guardar_fragmento(self, sha256: str, datos: bytes) -> bool:
+        """
+        Guarda un fragmento tras comprobar su suma.
+
+        Retorna:
+        --------
+        bool
+            True si el fragmento es nuevo, False si ya existía
+
+        Lanza:
+        ------
+        ValueError: Si el contenido no corresponde al SHA-256 indicado
+        """
+        ruta = self.ruta_fragmento(sha256)
+        if hashlib.sha256(datos).hexdigest() != sha256:
+            raise ValueError(f"El contenido del fragmento no coincide con su SHA-256 ({sha256[:12]}...)")
+        if ruta.exists():
+            return False
+        _escribir_atomico(ruta, datos)
+        return True
+
+    # --- Subidas y archivos ---
+
+    def ruta_archivo(self, sha256: str) -> Path:
+        validar_sha256(sha256)
+        return self.directorio / "archivos" / sha256
+
+    def tiene_archivo(self, sha256: str) -> bool:
+        return self.ruta_archivo(sha256).exists()
+
+    def usar_archivo(self, sha256: str) -> Path:
+        """Ruta de un archivo almacenado, marcándolo como usado (reinicia su expiración)."""
+        ruta = self.ruta_archivo(sha256)
+        os.utime(ruta)
+        return ruta
+
+    def registrar_subida(self, sha256: str, tamano: int, fragmentos: List[str]) -> List[str]:
+        """
+        Registra la lista de fragmentos de un archivo.
+
+        Retorna:
+        --------
+        list
+            SHA-256 de los fragmentos que faltan por subir (vacía si el
+            archivo ya existe o todos los fragmentos son conocidos)
+        """
+        validar_sha256(sha256)
+        for h in fragmentos:
+            validar_sha256(h)
+        if self.tiene_archivo(sha256):
+            self.usar_archivo(sha256)
+            return []
+        manifiesto = {'sha256': sha256, 'tamano': int(tamano), 'fragmentos': list(fragmentos)}
+        _escribir_atomico(self.directorio / "subidas" / f"{sha256}.json",
+                          json.dumps(manifiesto).encode('utf-8'))
+        return list(dict.fromkeys(h for h in fragmentos if not self.tiene_fragmento(h)))
+
+    def completar_subida(self, sha256: str) -> Path:
+        """
+        Ensambla el archivo a partir de sus fragmentos y verifica su suma completa.
+
+        Lanza:
+        ------
+        ValueError: Si la subida no está registrada, faltan fragmentos o la
+        suma del archivo ensamblado no coincide
+        """
+        ruta = self.ruta_archivo(sha256)
+        if ruta.exists():
+            return ruta
+        ruta_manifiesto = self.directorio / "subidas" / f"{sha256}.json"
+        if not ruta_manifiesto.exists():
+            raise ValueError(f"Subida no registrada: {sha256[:12]}...")
+        with open(ruta_manifiesto, encoding='utf-8') as f:
+            manifiesto = json.load(f)
+
+        faltantes = [h for h in manifiesto['fragmentos'] if not self.tiene_fragmento(h)]
+        if faltantes:
+            raise ValueError(f"Faltan {len(faltantes)} fragmento(s) para completar la subida")
+
+        with self._lock:
+            if ruta.exists():
+                return ruta
+            suma = hashlib.sha256()
+            descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, prefix=".tmp_")
+            try:
+                with os.fdopen(descriptor, 'wb') as salida:
+                    for h in manifiesto['fragmentos']:
+                        with open(self.ruta_fragmento(h), 'rb') as fragmento:
+                            for bloque in iter(lambda: fragmento.read(TAM_BLOQUE_COPIA), b''):
+                                suma.update(bloque)
+                                salida.write(bloque)
+                if suma.hexdigest() != sha256:
+                    raise ValueError("El archivo ensamblado no coincide con su SHA-256")
+                os.replace(temporal, ruta)
+            finally:
+                if os.path.exists(temporal):
+                    os.unlink(temporal)
+        ruta_manifiesto.unlink(missing_ok=True)
+        return ruta
+
+    def guardar_archivo(self, datos: bytes) -> str:
+        """Guarda un archivo completo recibido de una vez (subida multipart clásica)."""
+        sha256 = hashlib.sha256(datos).hexdigest()
+        ruta = self.ruta_archivo(sha256)
+        if not ruta.exists():
+            _escribir_atomico(ruta, datos)
+        return sha256
+
+    def expirar(self, antiguedad_max: float, ahora: float) -> int:
+        """
+        Borra archivos, fragmentos y subidas a medias sin uso en antiguedad_max segundos.
+
+        Retorna:
+        --------
+        int
+            Número de elementos borrados
+        """
+        borrados = 0
+        for patron in ("archivos/*", "fragmentos/*/*", "subidas/*.json"):
+            for ruta in self.directorio.glob(patron):
+                try:
+                    if ahora - ruta.stat().st_mtime > antiguedad_max:
+                        ruta.unlink()
+                        borrados += 1
+                except FileNotFoundError:
+                    pass
+        return borrados
+
+    def resumen(self) -> Dict:
+        fragmentos = sum(1 for _ in (self.directorio / "fragmentos").glob("*/*"))
+        archivos = sum(1 for _ in (self.directorio / "archivos").iterdir())
+        return {'fragmentos': fragmentos, 'archivos': archivos}
@@ -0,0 +1,419 @@
+"""
+Servidor HTTP de referencia que implementa el contrato del modo API.
+
+Uso:
+    python -m backend.servidor --puerto 8000 --directorio /tmp/salmo_backend --trabajadores 4
+    BACKEND_BASE_URL=http://localhost:8000 streamlit run app.py
+
+El servidor solo atiende HTTP; los análisis se ejecutan en un pool de
+procesos (ver backend/trabajos.py). Varias instancias detrás de un balanceador
+necesitan compartir --directorio o enrutar cada trabajo a la instancia que lo
+creó.
+
+Endpoints:
+    POST /uploads                      {"sha256", "tamano", "fragmentos": [...]}
+                                       -> {"faltantes": [...]}
+    PUT  /fragmentos/<sha256>          cuerpo del fragmento (Content-Encoding:
+                                       deflate o identity)
+    POST /uploads/<sha256>/completar   -> {"archivo": sha256}
+    POST /start-analysis               JSON {"salmonella": sha256, "gallus": sha256,
+                                       "min_len", "limpiar_ns", "top_codons",
+                                       "politica_ns", "fraccion_max_ns", "tam_bloque"} o
+                                       multipart con los dos FASTA (formato clásico)
+                                       -> {"jobId": str} (503 si la cola está llena)
+    GET  /status/<jobId>               -> {"status", "message", "progreso", "etapa",
+                                       "parciales": {"resumen_csv_url", ...}}
+    GET  /results/<jobId>              -> {"resumen_csv_url", "codon_csv_url", "metricas_url",
+                                       "images", "zip_url"}
+    GET  /metricas/<jobId>?...         una página de la tabla de métricas: filtro (id,
+                                       gc_min, gc_max, longitud_min, longitud_max), orden
+                                       (orden, descendente) y página (pagina, tam_pagina)
+                                       -> {"columnas", "filas", "total", "pagina",
+                                       "paginas", "num_filas", "rangos"}
+    GET  /zip/<jobId>[?formato=...]    todos los resultados en un ZIP (por fragmentos);
+                                       formato de tablas: csv, csv.zst o parquet
+    GET  /artefactos/<jobId>/<ruta>    CSV e imágenes generados
+    GET  /salud                        estado del servicio
+"""
+import argparse
+import email.parser
+import email.policy
+import json
+import mimetypes
+import sys
+import traceback
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# Permitir ejecutar desde la raíz del proyecto (python -m backend.servidor)
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.trabajos import ColaLlena, ServicioAnalisis
+from src.pipeline import PARAMETROS_POR_DEFECTO, resolver_politica_ns
+from src.tabla_columnar import COLUMNA_GC, COLUMNA_LONGITUD, TAM_PAGINA_POR_DEFECTO
+from utils.zipper import iterar_zip, miembros_resultados
+
+# Límite de un fragmento descomprimido (el cliente usa 8 MiB)
+TAM_MAX_FRAGMENTO = 64 * 1024 * 1024
+# Límite del cuerpo de una petición JSON o multipart clásica
+TAM_MAX_CUERPO = 2 * 1024 * 1024 * 1024
+
+
+def _descomprimir_deflate(datos: bytes, limite: int) -> bytes:
+    """Descomprime zlib/deflate sin superar limite bytes (evita bombas de compresión)."""
+    descompresor = zlib.decompressobj()
+    resultado = descompresor.decompress(datos, limite + 1)
+    if len(resultado) > limite or descompresor.unconsumed_tail:
+        raise ValueError(f"El fragmento descomprimido supera {limite} bytes")
+    return resultado
+
+
+def _leer_multipart(tipo_contenido: str, cuerpo: bytes) -> Dict[str, bytes]:
+    """Extrae los campos de un formulario multipart/form-data (nombre -> bytes)."""
+    mensaje = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        b"Content-Type: " + tipo_contenido.encode('latin-1') + b"\r\n\r\n" + cuerpo
+    )
+    if not mensaje.is_multipart():
+        raise ValueError("Se esperaba un formulario multipart/form-data")
+    campos = {}
+    for parte in mensaje.iter_parts():
+        nombre = parte.get_param('name', header='content-disposition')
+        if nombre:
+            campos[nombre] = parte.get_payload(decode=True) or b''
+    return campos
+
+
+def _parametros_analisis(origen: Dict) -> Dict:
+    """
+    Normaliza los parámetros del análisis (llegan como texto en multipart).
+
+    Lanza:
+    ------
+    ValueError: Si algún parámetro no tiene el tipo esperado o la política de Ns no existe
+    """
+    limpiar = origen.get('limpiar_ns', True)
+    if isinstance(limpiar, (bytes, str)):
+        limpiar = (limpiar.decode() if isinstance(limpiar, bytes) else limpiar).strip().lower() in ('1', 'true', 'si', 'sí')
+    try:
+        params = {
+            'min_len': int(origen.get('min_len', 0)),
+            'limpiar_ns': bool(limpiar),
+            'top_codons': int(origen.get('top_codons', 20)),
+            'politica_ns': origen.get('politica_ns') or None,
+            'fraccion_max_ns': float(origen.get('fraccion_max_ns', PARAMETROS_POR_DEFECTO['fraccion_max_ns'])),
+            'tam_bloque': int(origen.get('tam_bloque', PARAMETROS_POR_DEFECTO['tam_bloque'])),
+        }
+    except (TypeError, ValueError):
+        raise ValueError(
+            "Parámetros del análisis no válidos (min_len, top_codons y tam_bloque deben ser enteros y fraccion_max_ns un número)"
+        )
+    # Validar aquí: un error de parámetros es un 400, no un trabajo fallido
+    resolver_politica_ns(params)
+    return params
+
+
+def _consulta_tabla(query: Dict[str, List[str]]) -> Dict:
+    """
+    Convierte la query de /metricas en argumentos de TablaColumnar.consultar.
+
+    Lanza:
+    ------
+    ValueError: Si algún número no es válido
+    """
+    valor = lambda nombre: (query.get(nombre) or [''])[0].strip()
+    numero = lambda nombre: float(valor(nombre)) if valor(nombre) else None
+    try:
+        return {
+            'filtro_id': valor('id') or None,
+            'rango_gc': (numero('gc_min'), numero('gc_max')),
+            'rango_longitud': (numero('longitud_min'), numero('longitud_max')),
+            'orden': valor('orden') or None,
+            'descendente': valor('descendente').lower() in ('1', 'true', 'si', 'sí'),
+            'pagina': int(valor('pagina') or 0),
+            'tam_pagina': int(valor('tam_pagina') or TAM_PAGINA_POR_DEFECTO),
+        }
+    except ValueError:
+        raise ValueError("Consulta no válida (los rangos deben ser números y pagina y tam_pagina enteros)")
+
+
+class ManejadorAPI(BaseHTTPRequestHandler):
+    """Enruta las peticiones al ServicioAnalisis del servidor."""
+
+    protocol_version = "HTTP/1.1"
+    servicio: ServicioAnalisis = None
+
+    # --- Utilidades ---
+
+    def _responder_json(self, codigo: int, datos: Dict):
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _error(self, codigo: int, mensaje: str):
+        self._responder_json(codigo, {'error': mensaje})
+
+    def _leer_cuerpo(self, limite: int = TAM_MAX_CUERPO) -> bytes:
+        longitud = int(self.headers.get("Content-Length") or 0)
+        if longitud > limite:
+            raise ValueError(f"Cuerpo demasiado grande ({longitud} bytes)")
+        return self.rfile.read(longitud)
+
+    def _leer_json(self) -> Dict:
+        try:
+            return json.loads(self._leer_cuerpo(1024 * 1024) or b'{}')
+        except json.JSONDecodeError:
+            raise ValueError("El cuerpo de la petición no es JSON válido")
+
+    def _url_base(self) -> str:
+        host = self.headers.get("Host") or f"{self.server.server_address[0]}:{self.server.server_address[1]}"
+        return f"http://{host}"
+
+    def _partes(self):
+        return [unquote(p) for p in urlsplit(self.path).path.strip('/').split('/') if p]
+
+    def _despachar(self, rutas):
+        partes = self._partes()
+        for patron, funcion in rutas:
+            if len(patron) == len(partes) and all(p.startswith('{') or p == v for p, v in zip(patron, partes)):
+                argumentos = [v for p, v in zip(patron, partes) if p.startswith('{')]
+                try:
+                    funcion(self, *argumentos)
+                except ValueError as e:
+                    self._error(400, str(e))
+                except ColaLlena as e:
+                    self._error(503, str(e))
+                except Exception as e:
+                    traceback.print_exc()
+                    self._error(500, f"Error interno: {e}")
+                return
+        self._error(404, f"Ruta no encontrada: {self.path}")
+
+    def log_message(self, formato, *args):
+        # Solo errores: el cliente consulta el estado en bucle
+        if args and str(args[1]).startswith(('4', '5')):
+            super().log_message(formato, *args)
+
+    # --- Subida por fragmentos ---
+
+    def _registrar_subida(self):
+        datos = self._leer_json()
+        faltantes = self.servicio.almacen.registrar_subida(
+            datos.get('sha256'), int(datos.get('tamano', 0)), datos.get('fragmentos', [])
+        )
+        self._responder_json(200, {'faltantes': faltantes})
+
+    def _subir_fragmento(self, sha256: str):
+        cuerpo = self._leer_cuerpo(TAM_MAX_FRAGMENTO)
+        codificacion = (self.headers.get("Content-Encoding") or "identity").lower()
+        if codificacion == "deflate":
+            cuerpo = _descomprimir_deflate(cuerpo, TAM_MAX_FRAGMENTO)
+        elif codificacion != "identity":
+            raise ValueError(f"Content-Encoding no soportado: {codificacion}")
+        nuevo = self.servicio.almacen.guardar_fragmento(sha256, cuerpo)
+        self._responder_json(201 if nuevo else 200, {'sha256': sha256})
+
+    def _completar_subida(self, sha256: str):
+        self.servicio.almacen.completar_subida(sha256)
+        self._responder_json(200, {'archivo': sha256})
+
+    # --- Análisis ---
+
+    def _iniciar_analisis(self):
+        tipo = self.headers.get("Content-Type", "")
+        if tipo.startswith("multipart/form-data"):
+            # Formato clásico: los dos FASTA completos en el formulario
+            campos = _leer_multipart(tipo, self._leer_cuerpo())
+            for especie in ('salmonella_fasta', 'gallus_fasta'):
+                if especie not in campos:
+                    raise ValueError(f"Falta el archivo {especie}")
+            salmonella = self.servicio.almacen.guardar_archivo(campos['salmonella_fasta'])
+            gallus = self.servicio.almacen.guardar_archivo(campos['gallus_fasta'])
+            params = _parametros_analisis({k: v.decode() for k, v in campos.items() if not k.endswith('_fasta')})
+        else:
+            datos = self._leer_json()
+            salmonella, gallus = datos.get('salmonella'), datos.get('gallus')
+            params = _parametros_analisis(datos)
+        job_id = self.servicio.crear_trabajo(salmonella, gallus, params)
+        self._responder_json(200, {'jobId': job_id})
+
+    def _estado(self, job_id: str):
+        from src.pipeline import ETAPAS_PIPELINE
+
+        trabajo = self.servicio.estado(job_id)
+        if trabajo is None:
+            self._error(404, f"Trabajo no encontrado: {job_id}")
+            return
+        # Resultados parciales: tablas y gráficos que ya están escritos
+        base = f"{self._url_base()}/artefactos/{job_id}"
+        parciales = {'images': []}
+        for artefacto in trabajo['artefactos']:
+            if artefacto == 'resumen_metricas.csv':
+                parciales['resumen_csv_url'] = f"{base}/{artefacto}"
+            elif artefacto == 'codon_usage.csv':
+                parciales['codon_csv_url'] = f"{base}/{artefacto}"
+            else:
+                parciales['images'].append(f"{base}/{artefacto}")
+        self._responder_json(200, {
+            'status': trabajo['status'],
+            'message': trabajo['message'],
+            'progreso': 1.0 if trabajo['status'] == 'COMPLETED' else round(len(trabajo['etapas']) / len(ETAPAS_PIPELINE), 3),
+            'etapa': trabajo['etapas'][-1] if trabajo['etapas'] else None,
+            'parciales': parciales,
+        })
+
+    def _resultados(self, job_id: str):
+        trabajo = self.servicio.estado(job_id)
+        if trabajo is None:
+            self._error(404, f"Trabajo no encontrado: {job_id}")
+            return
+        if trabajo['status'] != 'COMPLETED':
+            self._error(409, f"El trabajo no ha terminado (estado: {trabajo['status']})")
+            return
+        base = f"{self._url_base()}/artefactos/{job_id}"
+        self._responder_json(200, {
+            'resumen_csv_url': f"{base}/resumen_metricas.csv",
+            'codon_csv_url': f"{base}/codon_usage.csv",
+            'metricas_url': f"{self._url_base()}/metricas/{job_id}",
+            'images': [f"{base}/graficos/{Path(p).name}" for p in trabajo['resultados']['images']],
+            'zip_url': f"{self._url_base()}/zip/{job_id}",
+        })
+
+    def _zip(self, job_id: str):
+        trabajo = self.servicio.estado(job_id)
+        if trabajo is None or trabajo['status'] != 'COMPLETED':
+            self._error(404, f"Resultados no disponibles: {job_id}")
+            return
+        formato = parse_qs(urlsplit(self.path).query).get('formato', ['csv'])[0]
+        miembros = miembros_resultados(str(Path(trabajo['resultados']['resumen_csv_path']).parent), formato_tablas=formato)
+        # Respuesta por fragmentos: el ZIP se envía mientras se genera
+        self.send_response(200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Disposition", f'attachment; filename="resultados_{job_id}.zip"')
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for bloque in iterar_zip(miembros, manifiesto=True):
+                self.wfile.write(f"{len(bloque):X}\r\n".encode('ascii') + bloque + b"\r\n")
+        except Exception:
+            # Ya se enviaron las cabeceras: cortar la conexión sin el fragmento
+            # final para que el cliente vea la descarga incompleta
+            traceback.print_exc()
+            self.close_connection = True
+            return
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _metricas(self, job_id: str):
+        tabla = self.servicio.tabla_metricas(job_id)
+        if tabla is None:
+            self._error(404, f"Tabla de métricas no disponible: {job_id}")
+            return
+        resultado = tabla.consultar(**_consulta_tabla(parse_qs(urlsplit(self.path).query)))
+        self._responder_json(200, {
+            'columnas': list(resultado['filas'].columns),
+            'filas': resultado['filas'].to_dict(orient='split')['data'],
+            'total': resultado['total'],
+            'pagina': resultado['pagina'],
+            'paginas': resultado['paginas'],
+            'num_filas': tabla.num_filas,
+            'rangos': {columna: tabla.rango(columna) for columna in (COLUMNA_LONGITUD, COLUMNA_GC)},
+        })
+
+    def _artefacto(self, job_id: str, *ruta):
+        archivo = self.servicio.ruta_artefacto(job_id, "/".join(ruta))
+        if archivo is None:
+            self._error(404, "Artefacto no encontrado")
+            return
+        tamano = archivo.stat().st_size
+        self.send_response(200)
+        self.send_header("Content-Type", mimetypes.guess_type(archivo.name)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(tamano))
+        self.end_headers()
+        with open(archivo, 'rb') as f:
+            while bloque := f.read(1024 * 1024):
+                self.wfile.write(bloque)
+
+    def _salud(self):
+        self._responder_json(200, {'status': 'OK', **self.servicio.resumen()})
+
+    # --- Rutas ---
+
+    def do_GET(self):
+        partes = self._partes()
+        if len(partes) >= 3 and partes[0] == 'artefactos':
+            try:
+                self._artefacto(partes[1], *partes[2:])
+            except Exception as e:
+                self._error(500, f"Error interno: {e}")
+            return
+        self._despachar([
+            (('status', '{id}'), ManejadorAPI._estado),
+            (('results', '{id}'), ManejadorAPI._resultados),
+            (('zip', '{id}'), ManejadorAPI._zip),
+            (('metricas', '{id}'), ManejadorAPI._metricas),
+            (('salud',), ManejadorAPI._salud),
+        ])
+
+    def do_POST(self):
+        self._despachar([
+            (('uploads',), ManejadorAPI._registrar_subida),
+            (('uploads', '{sha256}', 'completar'), ManejadorAPI._completar_subida),
+            (('start-analysis',), ManejadorAPI._iniciar_analisis),
+        ])
+
+    def do_PUT(self):
+        self._despachar([
+            (('fragmentos', '{sha256}'), ManejadorAPI._subir_fragmento),
+        ])
+
+
+def crear_servidor(direccion: str, puerto: int, servicio: ServicioAnalisis) -> ThreadingHTTPServer:
+    """Crea (sin arrancar) el servidor HTTP que atiende al servicio dado."""
+    manejador = type("ManejadorServicio", (ManejadorAPI,), {'servicio': servicio})
+    servidor = ThreadingHTTPServer((direccion, puerto), manejador)
+    servidor.daemon_threads = True
+    return servidor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backend de referencia del modo API de SalmoAvianLight")
+    parser.add_argument("--direccion", default="127.0.0.1", help="Dirección de escucha (por defecto: 127.0.0.1)")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--directorio", default="backend_datos", help="Almacén de subidas y resultados")
+    parser.add_argument("--trabajadores", type=int, default=None,
+                        help="Procesos de análisis en paralelo (por defecto: núcleos)")
+    parser.add_argument("--max-en-cola", type=int, default=100,
+                        help="Trabajos pendientes admitidos antes de responder 503")
+    parser.add_argument("--ttl-resultados", type=float, default=3600,
+                        help="Segundos que se conservan los resultados de un trabajo terminado")
+    parser.add_argument("--ttl-subidas", type=float, default=24 * 3600,
+                        help="Segundos que se conservan los archivos subidos sin uso")
+    args = parser.parse_args(argv)
+
+    servicio = ServicioAnalisis(
+        args.directorio,
+        trabajadores=args.trabajadores,
+        max_en_cola=args.max_en_cola,
+        ttl_resultados=args.ttl_resultados,
+        ttl_subidas=args.ttl_subidas,
+    )
+    servidor = crear_servidor(args.direccion, args.puerto, servicio)
+    print(f"Backend escuchando en http://{args.direccion}:{servidor.server_address[1]} "
+          f"({servicio.trabajadores} proceso(s) de análisis)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\nBackend detenido")
+    finally:
+        servidor.server_close()
+        servicio.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Cola de trabajos del backend: pool de procesos y expiración de resultados.
+
+Cada análisis se ejecuta en un proceso del pool (el pipeline cambia el
+directorio de trabajo del proceso, así que dos análisis no pueden compartir
+proceso a la vez). Los procesos informan del inicio y de cada etapa
+terminada por una cola compartida; un hilo del servidor la lee y actualiza
+el estado que sirve /status.
+
+Los resultados de un trabajo terminado se borran pasado ttl_resultados, y
+los archivos y fragmentos subidos que nadie usa, pasado ttl_subidas.
+"""
+import collections
+import concurrent.futures
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Optional
+
+from backend.almacen import AlmacenFragmentos, validar_sha256
+
+# Tablas de métricas abiertas (con su última selección) que se conservan
+MAX_TABLAS_ABIERTAS = 16
+
+
+class ColaLlena(Exception):
+    """La cola de análisis no admite más trabajos (el cliente debe reintentar más tarde)."""
+
+
+# Cola de avisos del proceso trabajador al servidor (fijada por el inicializador)
+_avisos = None
+
+
+def _inicializar_trabajador(avisos):
+    """Inicializador de cada proceso: guarda la cola de avisos y precarga el pipeline."""
+    global _avisos
+    _avisos = avisos
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import src.pipeline  # noqa: F401
+    import src.visualizacion  # noqa: F401
+
+
+def _ejecutar_trabajo(job_id, ruta_salmonella, ruta_gallus, params, directorio_trabajo, ramas_paralelas=None):
+    """
+    Proceso del pool: ejecuta el pipeline avisando del inicio y de cada etapa.
+
+    Con un solo trabajador, las dos especies de cada trabajo se procesan en
+    paralelo (ver src/paralelo.py); con varios, los núcleos ya los ocupan
+    otros trabajos (ramas_paralelas=False).
+    """
+    from src.instrumentacion import MedidorEtapas
+    from src.pipeline import ejecutar_pipeline
+
+    _avisos.put((job_id, 'inicio', None))
+    medidor = MedidorEtapas(
+        contexto={'job_id': job_id},
+        ruta_jsonl=str(Path(directorio_trabajo) / "etapas.jsonl"),
+        al_terminar=lambda medicion: _avisos.put((job_id, 'etapa', medicion)),
+    )
+    return ejecutar_pipeline(ruta_salmonella, ruta_gallus, params, directorio_trabajo, medidor,
+                             ramas_paralelas=ramas_paralelas)
+
+
+class ServicioAnalisis:
+    """
+    Estado del backend: almacén de subidas, cola de trabajos y su ejecución.
+
+    Parámetros:
+    -----------
+    directorio : str
+        Raíz del almacén (almacen/) y de los resultados (trabajos/<jobId>/)
+    trabajadores : int, optional
+        Procesos que ejecutan análisis a la vez (por defecto: núcleos)
+    max_en_cola : int
+        Trabajos pendientes (en cola o en curso) admitidos; por encima,
+        crear_trabajo lanza ColaLlena
+    ttl_resultados, ttl_subidas : float
+        Segundos que se conservan los resultados de un trabajo terminado y
+        los archivos subidos sin uso
+    """
+
+    def __init__(
+        self,
+        directorio: str,
+        trabajadores: Optional[int] = None,
+        max_en_cola: int = 100,
+        ttl_resultados: float = 3600,
+        ttl_subidas: float = 24 * 3600
+    ):
+        trabajadores = trabajadores or os.cpu_count() or 1
+        if trabajadores < 1:
+            raise ValueError(f"El backend necesita al menos un trabajador (recibido: {trabajadores})")
+        self.directorio = Path(directorio).absolute()
+        self.almacen = AlmacenFragmentos(self.directorio / "almacen")
+        self.directorio_trabajos = self.directorio / "trabajos"
+        self.directorio_trabajos.mkdir(parents=True, exist_ok=True)
+        self.trabajadores = trabajadores
+        self.max_en_cola = max_en_cola
+        self.ttl_resultados = ttl_resultados
+        self.ttl_subidas = ttl_subidas
+        self.trabajos: Dict[str, Dict] = {}
+        self._tablas = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._cerrado = threading.Event()
+
+        # 'spawn': el servidor HTTP tiene hilos y fork no es seguro con ellos
+        self._contexto_mp = multiprocessing.get_context("spawn")
+        self._avisos = self._contexto_mp.Queue()
+        self._executor = None
+        self._crear_executor()
+
+        threading.Thread(target=self._leer_avisos, name="avisos-trabajos", daemon=True).start()
+        threading.Thread(target=self._expirar_periodicamente, name="expiracion", daemon=True).start()
+
+    def _crear_executor(self):
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.trabajadores,
+            mp_context=self._contexto_mp,
+            initializer=_inicializar_trabajador,
+            initargs=(self._avisos,),
+        )
+
+    # --- Trabajos ---
+
+    def crear_trabajo(self, salmonella: str, gallus: str, params: Dict) -> str:
+        """
+        Encola un análisis de dos archivos ya almacenados y devuelve su id.
+
+        Lanza:
+        ------
+        ValueError: Si algún archivo no está en el almacén
+        ColaLlena: Si ya hay max_en_cola trabajos pendientes
+        """
+        rutas = []
+        for sha256 in (salmonella, gallus):
+            if not self.almacen.tiene_archivo(validar_sha256(sha256)):
+                raise ValueError(f"Archivo no encontrado en el almacén: {sha256[:12]}...")
+            rutas.append(str(self.almacen.usar_archivo(sha256)))
+
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            pendientes = sum(1 for t in self.trabajos.values() if t['status'] in ('SUBMITTED', 'RUNNING'))
+            if pendientes >= self.max_en_cola:
+                raise ColaLlena(f"Cola de análisis llena ({pendientes} trabajos pendientes)")
+            self.trabajos[job_id] = {
+                'status': 'SUBMITTED',
+                'message': 'Análisis en cola',
+                'params': params,
+                'resultados': None,
+                'terminado_en': None,
+                # Progreso: etapas terminadas y archivos ya escritos (relativos a results/)
+                'etapas': [],
+                'artefactos': [],
+            }
+            executor = self._executor
+        try:
+            futuro = executor.submit(
+                _ejecutar_trabajo, job_id, rutas[0], rutas[1], params, str(self.directorio_trabajos / job_id),
+                None if self.trabajadores == 1 else False,
+            )
+        except (BrokenProcessPool, RuntimeError) as e:
+            self._terminar(job_id, 'FAILED', f"No se pudo encolar el análisis: {e}")
+            raise
+        futuro.add_done_callback(lambda f, job_id=job_id, executor=executor: self._al_terminar(job_id, executor, f))
+        return job_id
+
+    def estado(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            trabajo = self.trabajos.get(job_id)
+            return dict(trabajo) if trabajo else None
+
+    def _terminar(self, job_id: str, status: str, message: str, resultados: Optional[Dict] = None):
+        with self._lock:
+            trabajo = self.trabajos.get(job_id)
+            if trabajo is not None:
+                trabajo.update(status=status, message=message, resultados=resultados, terminado_en=time.time())
+
+    def _al_terminar(self, job_id: str, executor, futuro):
+        """Callback del futuro: registra el resultado o el error del trabajo."""
+        try:
+            resultados = futuro.result()
+        except BrokenProcessPool:
+            # Un proceso murió (ej: falta de memoria): todos sus trabajos fallan
+            # y el pool se recrea para los siguientes
+            with self._lock:
+                if self._executor is executor and not self._cerrado.is_set():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self._crear_executor()
+            self._terminar(job_id, 'FAILED', "El proceso del análisis terminó inesperadamente (posible falta de memoria).")
+        except concurrent.futures.CancelledError:
+            self._terminar(job_id, 'FAILED', "Análisis cancelado")
+        except Exception as e:
+            self._terminar(job_id, 'FAILED', str(e))
+        else:
+            self._terminar(job_id, 'COMPLETED', 'Análisis completado', resultados)
+
+    def _leer_avisos(self):
+        """Hilo: aplica los avisos de inicio y de etapas que envían los procesos."""
+        from src.pipeline import artefacto_de_etapa
+
+        while True:
+            aviso = self._avisos.get()
+            if aviso is None:
+                return
+            job_id, tipo, medicion = aviso
+            with self._lock:
+                trabajo = self.trabajos.get(job_id)
+                if trabajo is None:
+                    continue
+                # El futuro puede resolverse antes de leer los últimos avisos:
+                # las etapas se registran igual, pero un trabajo terminado no vuelve a RUNNING
+                if tipo == 'inicio':
+                    if trabajo['status'] == 'SUBMITTED':
+                        trabajo.update(status='RUNNING', message='Procesamiento en curso')
+                elif medicion['estado'] == 'OK':
+                    trabajo['etapas'] = trabajo['etapas'] + [medicion['etapa']]
+                    artefacto = artefacto_de_etapa(medicion['etapa'])
+                    if artefacto:
+                        trabajo['artefactos'] = trabajo['artefactos'] + [artefacto]
+
+    def ruta_artefacto(self, job_id: str, relativa: str) -> Optional[Path]:
+        """Ruta de un artefacto de un trabajo conocido (None si no existe o sale de su directorio)."""
+        with self._lock:
+            if job_id not in self.trabajos:
+                return None
+        base = (self.directorio_trabajos / job_id / "results").resolve()
+        ruta = (base / relativa).resolve()
+        if base not in ruta.parents or not ruta.is_file():
+            return None
+        return ruta
+
+    def tabla_metricas(self, job_id: str):
+        """
+        Tabla de métricas de un trabajo terminado para consultarla por páginas.
+
+        Se abre una vez por trabajo y se conserva (con su última selección)
+        entre peticiones, hasta MAX_TABLAS_ABIERTAS trabajos.
+
+        Retorna:
+        --------
+        src.tabla_columnar.TablaColumnar o None
+            None si el trabajo no existe, no ha terminado o no tiene la tabla
+        """
+        from src.tabla_columnar import TablaColumnar
+
+        with self._lock:
+            trabajo = self.trabajos.get(job_id)
+            if trabajo is None or trabajo['status'] != 'COMPLETED':
+                return None
+            if job_id in self._tablas:
+                self._tablas.move_to_end(job_id)
+                return self._tablas[job_id]
+            ruta = (trabajo['resultados'] or {}).get('resumen_parquet_path')
+        if not ruta or not Path(ruta).is_file():
+            return None
+        tabla = TablaColumnar(ruta)
+        with self._lock:
+            tabla = self._tablas.setdefault(job_id, tabla)
+            while len(self._tablas) > MAX_TABLAS_ABIERTAS:
+                self._tablas.popitem(last=False)
+        return tabla
+
+    # --- Expiración ---
+
+    def expirar(self, ahora: Optional[float] = None) -> Dict:
+        """
+        Borra los trabajos terminados hace más de ttl_resultados y las subidas sin uso.
+
+        Retorna:
+        --------
+        dict
+            {'trabajos': int, 'subidas': int} elementos borrados
+        """
+        ahora = time.time() if ahora is None else ahora
+        with self._lock:
+            expirados = [
+                job_id for job_id, t in self.trabajos.items()
+                if t['terminado_en'] is not None and ahora - t['terminado_en'] > self.ttl_resultados
+            ]
+            for job_id in expirados:
+                del self.trabajos[job_id]
+                self._tablas.pop(job_id, None)
+        for job_id in expirados:
+            shutil.rmtree(self.directorio_trabajos / job_id, ignore_errors=True)
+        subidas = self.almacen.expirar(self.ttl_subidas, ahora)
+        if expirados or subidas:
+            print(f" Expirados: {len(expirados)} trabajo(s), {subidas} archivo(s)/fragmento(s) subidos")
+        return {'trabajos': len(expirados), 'subidas': subidas}
+
+    def _expirar_periodicamente(self):
+        intervalo = max(1.0, min(self.ttl_resultados, self.ttl_subidas) / 4)
+        while not self._cerrado.wait(min(intervalo, 300)):
+            try:
+                self.expirar()
+            except Exception:
+                traceback.print_exc()
+
+    def resumen(self) -> Dict:
+        with self._lock:
+            por_estado = {}
+            for t in self.trabajos.values():
+                por_estado[t['status']] = por_estado.get(t['status'], 0) + 1
+        return {'trabajadores': self.trabajadores, 'trabajos': por_estado, **self.almacen.resumen()}
+
+    def cerrar(self):
+        self._cerrado.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._avisos.put(None)
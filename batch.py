@@ -0,0 +1,427 @@
+"""
+Procesamiento por lotes de muchos pares Salmonella/Gallus.
+
+Uso:
+    python batch.py --manifiesto trabajos.csv --salida resultados_lote --procesos 4
+
+El manifiesto (CSV o JSON) tiene una fila/objeto por trabajo:
+
+    id,salmonella,gallus,min_len,limpiar_ns,top_codons,politica_ns,fraccion_max_ns
+    muestra_01,data/s01.fasta.gz,data/g01.fasta.gz,300,true,20,descartar,0.05
+
+Solo 'salmonella' y 'gallus' son obligatorias. En JSON se acepta una lista de
+objetos o {"parametros": {...}, "trabajos": [...]}, donde "parametros" se
+aplica a todos los trabajos salvo que el trabajo los sobrescriba.
+
+Cada trabajo escribe en <salida>/<id>/ (results/, registro.log, etapas.jsonl)
+y su estado se guarda en <salida>/estado.json. Al relanzar el mismo lote se
+omiten los trabajos ya completados cuyas entradas y parámetros no cambiaron
+(misma suma SHA-256), de modo que se puede reanudar tras una caída.
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+
+from src.pipeline import PARAMETROS_POR_DEFECTO
+
+ESTADO_OK = "COMPLETED"
+ESTADO_ERROR = "FAILED"
+ARCHIVO_ESTADO = "estado.json"
+TAM_BLOQUE_HASH = 1024 * 1024
+_PATRON_ID = re.compile(r'^[A-Za-z0-9._-]+$')
+
+
+def _convertir_parametro(nombre, valor):
+    """Convierte un parámetro del manifiesto (texto en CSV) a su tipo."""
+    if valor is None or valor == "":
+        return PARAMETROS_POR_DEFECTO[nombre]
+    if nombre == 'limpiar_ns':
+        if isinstance(valor, bool):
+            return valor
+        texto = str(valor).strip().lower()
+        if texto in ('1', 'true', 'si', 'sí', 'yes'):
+            return True
+        if texto in ('0', 'false', 'no'):
+            return False
+        raise ValueError(f"Valor no válido para limpiar_ns: '{valor}'")
+    if nombre == 'politica_ns':
+        return str(valor).strip().lower()
+    if nombre == 'fraccion_max_ns':
+        return float(valor)
+    return int(valor)
+
+
+def leer_manifiesto(ruta):
+    """
+    Lee un manifiesto CSV o JSON y devuelve la lista de trabajos normalizada.
+
+    Retorna:
+    --------
+    list
+        Diccionarios {'id', 'salmonella', 'gallus', 'params'} con rutas absolutas
+
+    Lanza:
+    ------
+    ValueError: Si el manifiesto está mal formado, faltan columnas o hay ids repetidos
+    """
+    ruta = Path(ruta)
+    if not ruta.exists():
+        raise ValueError(f"No se encontró el manifiesto: {ruta}")
+
+    comunes = {}
+    if ruta.suffix.lower() == '.json':
+        with open(ruta, encoding='utf-8') as f:
+            datos = json.load(f)
+        if isinstance(datos, dict):
+            comunes = datos.get('parametros', {})
+            filas = datos.get('trabajos', [])
+        else:
+            filas = datos
+    else:
+        with open(ruta, newline='', encoding='utf-8') as f:
+            filas = list(csv.DictReader(f))
+
+    if not filas:
+        raise ValueError(f"El manifiesto no contiene trabajos: {ruta}")
+
+    # Las rutas relativas se resuelven respecto al manifiesto
+    base = ruta.parent.absolute()
+    trabajos = []
+    vistos = set()
+    for numero, fila in enumerate(filas, start=1):
+        faltantes = [c for c in ('salmonella', 'gallus') if not fila.get(c)]
+        if faltantes:
+            raise ValueError(f"Trabajo {numero} del manifiesto sin columna(s): {', '.join(faltantes)}")
+
+        id_trabajo = str(fila.get('id') or f"trabajo_{numero:04d}")
+        if not _PATRON_ID.match(id_trabajo) or id_trabajo in ('.', '..'):
+            raise ValueError(f"Id de trabajo no válido: '{id_trabajo}' (use letras, números, '.', '_' o '-'; no '.' ni '..')")
+        if id_trabajo in vistos:
+            raise ValueError(f"Id de trabajo repetido en el manifiesto: {id_trabajo}")
+        vistos.add(id_trabajo)
+
+        origen = {**comunes, **fila.get('params', {}), **fila}
+        try:
+            params = {n: _convertir_parametro(n, origen.get(n)) for n in PARAMETROS_POR_DEFECTO}
+        except ValueError as e:
+            raise ValueError(f"Parámetros no válidos en el trabajo {id_trabajo}: {e}")
+
+        trabajos.append({
+            'id': id_trabajo,
+            'salmonella': str(base / fila['salmonella']),
+            'gallus': str(base / fila['gallus']),
+            'params': params,
+        })
+    return trabajos
+
+
+def suma_sha256_archivo(ruta):
+    """SHA-256 de un archivo, leído por bloques."""
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(TAM_BLOQUE_HASH), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def suma_trabajo(trabajo):
+    """
+    Suma de control de un trabajo: contenido de ambas entradas y parámetros.
+
+    Un trabajo completado solo se omite si esta suma no cambió.
+    """
+    h = hashlib.sha256()
+    for especie in ('salmonella', 'gallus'):
+        h.update(suma_sha256_archivo(trabajo[especie]).encode())
+    h.update(json.dumps(trabajo['params'], sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def cargar_estado(directorio_salida):
+    ruta = Path(directorio_salida) / ARCHIVO_ESTADO
+    if not ruta.exists():
+        return {}
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def guardar_estado(directorio_salida, estado):
+    """Escribe estado.json de forma atómica (nunca queda a medias tras una caída)."""
+    ruta = Path(directorio_salida) / ARCHIVO_ESTADO
+    temporal = ruta.with_suffix('.json.tmp')
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=2, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+# Cola (SimpleQueue, escritura síncrona) por la que cada proceso del pool
+# avisa de qué trabajo empieza; ver ejecutar_lote
+_cola_inicios = None
+
+
+def _inicializar_trabajador(cola_inicios=None):
+    """
+    Inicializa cada proceso del pool: importa el pipeline (numpy, pandas,
+    matplotlib) para que no se repita en cada trabajo.
+    """
+    global _cola_inicios
+    _cola_inicios = cola_inicios
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import src.pipeline  # noqa: F401
+    import src.visualizacion  # noqa: F401
+
+
+def _aplicar_limites(memoria_max_mb, cpu_max_segundos):
+    """
+    Límites de recursos para el trabajo que empieza en este proceso.
+
+    El límite de CPU se cuenta desde ahora (RLIMIT_CPU acumula todo el tiempo
+    del proceso, incluida la importación del pipeline).
+    """
+    if not memoria_max_mb and not cpu_max_segundos:
+        return
+    try:
+        import resource
+    except ImportError:
+        print(" Advertencia: límites de recursos no disponibles en esta plataforma")
+        return
+    if memoria_max_mb:
+        limite = int(memoria_max_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+    if cpu_max_segundos:
+        uso = resource.getrusage(resource.RUSAGE_SELF)
+        consumidos = int(uso.ru_utime + uso.ru_stime)
+        resource.setrlimit(resource.RLIMIT_CPU,
+                           (consumidos + int(cpu_max_segundos), resource.getrlimit(resource.RLIMIT_CPU)[1]))
+
+
+def _ejecutar_trabajo(trabajo, directorio_trabajo, ramas_paralelas=None, memoria_max_mb=None,
+                      cpu_max_segundos=None):
+    """
+    Proceso del pool: ejecuta un trabajo y devuelve su resumen (nunca lanza,
+    salvo que el proceso muera, ej: por el límite de CPU).
+
+    ramas_paralelas se pasa a ejecutar_pipeline (False si el lote ya ocupa
+    varios procesos).
+    """
+    from src.instrumentacion import MedidorEtapas
+    from src.pipeline import ejecutar_pipeline
+
+    if _cola_inicios is not None:
+        _cola_inicios.put(trabajo['id'])
+    _aplicar_limites(memoria_max_mb, cpu_max_segundos)
+
+    directorio_trabajo = Path(directorio_trabajo)
+    directorio_trabajo.mkdir(parents=True, exist_ok=True)
+    medidor = MedidorEtapas(contexto={'trabajo': trabajo['id']},
+                            ruta_jsonl=str(directorio_trabajo / "etapas.jsonl"))
+    inicio = time.perf_counter()
+
+    # La salida de cada trabajo va a su propio registro para no mezclarla entre procesos
+    with open(directorio_trabajo / "registro.log", 'w', encoding='utf-8') as registro, \
+            contextlib.redirect_stdout(registro):
+        try:
+            resultados = ejecutar_pipeline(trabajo['salmonella'], trabajo['gallus'],
+                                           trabajo['params'], directorio_trabajo, medidor,
+                                           ramas_paralelas=ramas_paralelas)
+            estado, error = ESTADO_OK, None
+        except MemoryError:
+            resultados, estado, error = None, ESTADO_ERROR, "MemoryError: se superó el límite de memoria del trabajo"
+        except Exception as e:
+            resultados, estado, error = None, ESTADO_ERROR, f"{type(e).__name__}: {e}"
+            import traceback
+            traceback.print_exc(file=registro)
+
+    return {
+        'estado': estado,
+        'error': error,
+        'segundos': round(time.perf_counter() - inicio, 3),
+        'resultados': resultados,
+    }
+
+
+def ejecutar_lote(trabajos, directorio_salida, procesos=None, memoria_max_mb=None,
+                  cpu_max_segundos=None, trabajos_por_proceso=None, forzar=False):
+    """
+    Ejecuta los trabajos en un pool de procesos, guardando el estado tras cada uno.
+
+    Parámetros:
+    -----------
+    trabajos : list
+        Salida de leer_manifiesto
+    directorio_salida : str
+        Carpeta del lote (un subdirectorio por trabajo y estado.json)
+    procesos : int, optional
+        Procesos en paralelo (por defecto, núcleos disponibles)
+    memoria_max_mb : int, optional
+        Límite de memoria virtual por trabajo (RLIMIT_AS)
+    cpu_max_segundos : int, optional
+        Límite de tiempo de CPU por trabajo (RLIMIT_CPU)
+    trabajos_por_proceso : int, optional
+        Reciclar cada proceso tras N trabajos (libera memoria fragmentada);
+        con algún límite, cada trabajo usa un proceso nuevo
+
+    Si el proceso de un trabajo muere (límite de CPU, el sistema lo mata por
+    memoria...), solo ese trabajo queda como fallido: el pool se rehace y los
+    demás trabajos se vuelven a enviar.
+    forzar : bool
+        Si True, repite también los trabajos ya completados
+
+    Retorna:
+    --------
+    dict
+        Estado final por id de trabajo
+    """
+    directorio_salida = Path(directorio_salida).absolute()
+    directorio_salida.mkdir(parents=True, exist_ok=True)
+    estado = cargar_estado(directorio_salida)
+
+    pendientes = []
+    for trabajo in trabajos:
+        try:
+            suma = suma_trabajo(trabajo)
+        except OSError as e:
+            estado[trabajo['id']] = {'estado': ESTADO_ERROR, 'error': f"No se pudo leer la entrada: {e}"}
+            print(f" {trabajo['id']}: entrada no disponible ({e})")
+            continue
+        anterior = estado.get(trabajo['id'], {})
+        if not forzar and anterior.get('estado') == ESTADO_OK and anterior.get('suma') == suma:
+            continue
+        pendientes.append((trabajo, suma))
+    guardar_estado(directorio_salida, estado)
+
+    print(f"Trabajos: {len(trabajos)} en el manifiesto, {len(pendientes)} pendientes, "
+          f"{len(trabajos) - len(pendientes)} omitidos o sin entrada")
+    if not pendientes:
+        return estado
+
+    procesos = procesos or os.cpu_count() or 1
+    # Con un solo proceso, cada trabajo reparte sus dos especies en dos
+    # procesos; con varios, los núcleos ya están ocupados por otros trabajos
+    ramas_paralelas = None if procesos == 1 else False
+    opciones_pool = {}
+    if memoria_max_mb or cpu_max_segundos:
+        # Un proceso por trabajo: los límites no se arrastran de un trabajo a otro
+        opciones_pool['max_tasks_per_child'] = 1
+    elif trabajos_por_proceso:
+        opciones_pool['max_tasks_per_child'] = trabajos_por_proceso
+    limites = (memoria_max_mb, cpu_max_segundos)
+
+    total = len(pendientes)
+    completados = 0
+
+    def registrar(trabajo, suma, resumen):
+        nonlocal completados
+        completados += 1
+        estado[trabajo['id']] = {
+            **resumen,
+            'suma': suma,
+            'params': trabajo['params'],
+            'entradas': {'salmonella': trabajo['salmonella'], 'gallus': trabajo['gallus']},
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+        }
+        guardar_estado(directorio_salida, estado)
+        detalle = f"{resumen['segundos']} s" if resumen['estado'] == ESTADO_OK else resumen['error']
+        print(f"[{completados}/{total}] {trabajo['id']}: {resumen['estado']} ({detalle})")
+
+    # Rondas de pool: si un proceso muere, el pool entero queda roto y sus
+    # trabajos sin terminar fallan con BrokenProcessPool. Solo el trabajo que
+    # estaba en curso se da por fallido; los que no habían empezado se
+    # reenvían en un pool nuevo. Si había varios en curso no se sabe cuál
+    # murió: se repiten de uno en uno (aislados)
+    aislados = []
+    while pendientes or aislados:
+        if aislados:
+            ronda, aislados, trabajadores = aislados[:1], aislados[1:], 1
+        else:
+            ronda, pendientes, trabajadores = pendientes, [], procesos
+        contexto = multiprocessing.get_context('spawn' if 'max_tasks_per_child' in opciones_pool else None)
+        cola_inicios = contexto.SimpleQueue()
+        interrumpidos = []
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=trabajadores,
+            mp_context=contexto,
+            initializer=_inicializar_trabajador,
+            initargs=(cola_inicios,),
+            **opciones_pool
+        ) as pool:
+            futuros = {
+                pool.submit(_ejecutar_trabajo, trabajo, str(directorio_salida / trabajo['id']),
+                            ramas_paralelas, *limites): (trabajo, suma)
+                for trabajo, suma in ronda
+            }
+            for futuro in concurrent.futures.as_completed(futuros):
+                try:
+                    resumen = futuro.result()
+                except BrokenProcessPool:
+                    interrumpidos.append(futuros[futuro])
+                    continue
+                registrar(*futuros[futuro], resumen)
+
+        if not interrumpidos:
+            continue
+        iniciados = set()
+        while not cola_inicios.empty():
+            iniciados.add(cola_inicios.get())
+        en_curso = [t for t in interrumpidos if t[0]['id'] in iniciados]
+        sin_empezar = [t for t in interrumpidos if t[0]['id'] not in iniciados]
+        if len(en_curso) == 1 or not en_curso:
+            # El proceso murió con este trabajo (o antes de empezar ninguno,
+            # ej: un límite de memoria que no deja importar el pipeline)
+            fallidos = en_curso or sin_empezar
+            for trabajo, suma in fallidos:
+                # Queda como fallido y se reintentará al relanzar el lote
+                registrar(trabajo, suma, {'estado': ESTADO_ERROR,
+                                          'error': "El proceso del trabajo terminó inesperadamente",
+                                          'segundos': None, 'resultados': None})
+            if en_curso:
+                pendientes = sin_empezar + pendientes
+        else:
+            aislados.extend(en_curso)
+            pendientes = sin_empezar + pendientes
+
+    return estado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analisis por lotes de pares Salmonella/Gallus")
+    parser.add_argument("--manifiesto", required=True, help="Manifiesto CSV o JSON con los trabajos")
+    parser.add_argument("--salida", default="resultados_lote", help="Carpeta de resultados del lote")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos en paralelo (por defecto: núcleos)")
+    parser.add_argument("--memoria-max-mb", type=int, default=None, help="Límite de memoria por trabajo en MB")
+    parser.add_argument("--cpu-max-segundos", type=int, default=None, help="Límite de CPU por trabajo en segundos")
+    parser.add_argument("--trabajos-por-proceso", type=int, default=None,
+                        help="Reiniciar cada proceso tras N trabajos")
+    parser.add_argument("--forzar", action="store_true", help="Repetir también los trabajos ya completados")
+    args = parser.parse_args(argv)
+
+    try:
+        trabajos = leer_manifiesto(args.manifiesto)
+    except ValueError as e:
+        parser.error(str(e))
+
+    estado = ejecutar_lote(trabajos, args.salida, procesos=args.procesos,
+                           memoria_max_mb=args.memoria_max_mb, cpu_max_segundos=args.cpu_max_segundos,
+                           trabajos_por_proceso=args.trabajos_por_proceso, forzar=args.forzar)
+
+    fallidos = [t['id'] for t in trabajos if estado.get(t['id'], {}).get('estado') != ESTADO_OK]
+    print(f"\nLote terminado: {len(trabajos) - len(fallidos)} completados, {len(fallidos)} fallidos")
+    print(f"Estado guardado en: {Path(args.salida) / ARCHIVO_ESTADO}")
+    return 1 if fallidos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Benchmark de todas las etapas del pipeline sobre genomas sintéticos.
+
+Uso:
+    python -m benchmarks.ejecutar --tamanos 1MB,10MB,100MB --salida benchmark.json
+
+Para cada tamaño se genera (o reutiliza) un par Salmonella/Gallus sintético y
+se mide cada etapa en un proceso nuevo, de modo que el pico de RSS de un
+tamaño no contamina al siguiente. El resultado es un JSON con tiempo, tiempo
+de CPU, pico de RSS y bases/segundo por etapa, pensado para comparar versiones.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+# Permitir ejecutar desde la raíz del proyecto (python -m benchmarks.ejecutar)
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.generador import generar_par_especies, parsear_tamano
+from src.instrumentacion import MedidorEtapas
+
+TAMANOS_POR_DEFECTO = "1MB,10MB,100MB,1GB,2GB"
+
+ETAPAS = [
+    "cargar_secuencias",
+    "limpiar_y_normalizar_secuencias",
+    "calcular_metricas_basicas",
+    "calcular_uso_codones",
+    "cargar_secuencias_desde_buffer",
+    "codificar_secuencias",
+    "calcular_metricas_codificadas",
+    "calcular_uso_codones_codificadas",
+    "grafico_gc",
+    "distribucion_longitudes",
+    "distribucion_gc",
+    "relacion_longitud_gc",
+    "uso_codones_top20",
+    "correlacion_codones",
+    "heatmap_codones",
+    "distribucion_acumulativa_longitudes",
+    "generar_todos_los_graficos",
+    "crear_zip_resultados",
+]
+
+
+def _medir(medidor: MedidorEtapas, etapa: str, bases: int, funcion, *args):
+    """Ejecuta funcion(*args) dentro de una etapa del medidor."""
+    with medidor.etapa(etapa, bases=bases) as medicion:
+        valor = funcion(*args)
+    print(f"  {etapa:40s} {medicion['segundos']:10.3f} s")
+    return valor
+
+
+def _ejecutar_etapas(archivos: Dict, etapas: List[str], directorio_trabajo: str, cola):
+    """Proceso hijo: ejecuta las etapas pedidas y envía las mediciones por la cola."""
+    import pandas as pd
+    from src import procesamiento, analisis, visualizacion
+    from src.codificacion import SecuenciasCodificadas
+    from utils.zipper import crear_zip_resultados
+
+    medidor = MedidorEtapas(emitir=False)
+    bases = archivos["salmonella"]["bases"] + archivos["gallus"]["bases"]
+    os.makedirs(os.path.join(directorio_trabajo, "results", "graficos"), exist_ok=True)
+    os.chdir(directorio_trabajo)
+
+    try:
+        # La carga es obligatoria: el resto de etapas depende de ella
+        def cargar():
+            return (procesamiento.cargar_secuencias(archivos["salmonella"]["ruta"]),
+                    procesamiento.cargar_secuencias(archivos["gallus"]["ruta"]))
+        salmonella, gallus = _medir(medidor, "cargar_secuencias", bases, cargar)
+
+        if "limpiar_y_normalizar_secuencias" in etapas:
+            _medir(medidor, "limpiar_y_normalizar_secuencias", bases,
+                   procesamiento.limpiar_y_normalizar_secuencias, salmonella + gallus)
+
+        def metricas():
+            return procesamiento.calcular_metricas_basicas(salmonella), procesamiento.calcular_metricas_basicas(gallus)
+        df_salmonella, df_gallus = _medir(medidor, "calcular_metricas_basicas", bases, metricas)
+        df_metricas = pd.concat([df_salmonella, df_gallus], ignore_index=True)
+        df_metricas.to_csv("results/resumen_metricas.csv", index=False)
+
+        def codones():
+            return pd.merge(
+                analisis.calcular_uso_codones(salmonella, "salmonella"),
+                analisis.calcular_uso_codones(gallus, "gallus"),
+                on="codon", how="outer"
+            ).fillna(0).sort_values("codon").reset_index(drop=True)
+        df_codones = _medir(medidor, "calcular_uso_codones", bases, codones)
+        df_codones.to_csv("results/codon_usage.csv", index=False)
+
+        # Camino codificado de la app, batch y el backend (pipeline.procesar_especie):
+        # carga desde memoria, un buffer por especie y métricas/codones vectorizados
+        especies = [salmonella, gallus]
+        if "cargar_secuencias_desde_buffer" in etapas:
+            contenidos = [Path(archivos[e]["ruta"]).read_bytes() for e in ("salmonella", "gallus")]
+            def cargar_buffer():
+                return [procesamiento.cargar_secuencias_desde_buffer(contenido, especie)
+                        for contenido, especie in zip(contenidos, ("Salmonella", "Gallus"))]
+            especies = _medir(medidor, "cargar_secuencias_desde_buffer", bases, cargar_buffer)
+            del contenidos
+
+        codificadas_pedidas = {"calcular_metricas_codificadas", "calcular_uso_codones_codificadas"} & set(etapas)
+        if "codificar_secuencias" in etapas or codificadas_pedidas:
+            def codificar():
+                return [SecuenciasCodificadas.desde_secuencias(secuencias) for secuencias in especies]
+            if "codificar_secuencias" in etapas:
+                codificadas = _medir(medidor, "codificar_secuencias", bases, codificar)
+            else:
+                codificadas = codificar()
+            del especies
+
+            if "calcular_metricas_codificadas" in etapas:
+                _medir(medidor, "calcular_metricas_codificadas", bases,
+                       lambda: [procesamiento.calcular_metricas_codificadas(c) for c in codificadas])
+            if "calcular_uso_codones_codificadas" in etapas:
+                _medir(medidor, "calcular_uso_codones_codificadas", bases,
+                       lambda: [analisis.calcular_uso_codones_codificadas(c, especie)
+                                for c, especie in zip(codificadas, ("salmonella", "gallus"))])
+            del codificadas
+
+        graficos = {
+            "grafico_gc": lambda: (visualizacion.grafico_gc(df_salmonella, "salmonella"),
+                                   visualizacion.grafico_gc(df_gallus, "gallus")),
+            "distribucion_longitudes": lambda: visualizacion.distribucion_longitudes(df_metricas),
+            "distribucion_gc": lambda: visualizacion.distribucion_gc(df_metricas),
+            "relacion_longitud_gc": lambda: visualizacion.relacion_longitud_gc(df_metricas),
+            "uso_codones_top20": lambda: visualizacion.uso_codones_top20(df_codones.copy()),
+            "correlacion_codones": lambda: visualizacion.correlacion_codones(df_codones),
+            "heatmap_codones": lambda: visualizacion.heatmap_codones(df_codones),
+            "distribucion_acumulativa_longitudes": lambda: visualizacion.distribucion_acumulativa_longitudes(df_metricas),
+            "generar_todos_los_graficos": visualizacion.generar_todos_los_graficos,
+        }
+        for etapa, funcion in graficos.items():
+            if etapa in etapas:
+                _medir(medidor, etapa, bases, funcion)
+
+        if "crear_zip_resultados" in etapas:
+            _medir(medidor, "crear_zip_resultados", bases, crear_zip_resultados, "results")
+
+        cola.put({"estado": "OK", "etapas": medidor.etapas})
+    except Exception as e:
+        cola.put({"estado": "ERROR", "error": f"{type(e).__name__}: {e}", "etapas": medidor.etapas})
+
+
+def _esperar_resultado(proceso, cola, timeout):
+    """Espera la salida del proceso hijo, detectando timeouts y muertes (ej: OOM)."""
+    import queue
+    inicio = time.monotonic()
+    while True:
+        try:
+            return cola.get(timeout=1)
+        except queue.Empty:
+            pass
+        if not proceso.is_alive():
+            return {"estado": "ERROR", "error": f"El proceso terminó con código {proceso.exitcode}", "etapas": []}
+        if timeout is not None and time.monotonic() - inicio > timeout:
+            proceso.terminate()
+            return {"estado": "TIMEOUT", "etapas": []}
+
+
+def ejecutar_benchmark(tamanos: List[int], etapas: List[str], directorio_datos: str,
+                       semilla: int = 0, tasa_n: float = 0.0, distribucion: str = "lognormal",
+                       timeout: float = None) -> Dict:
+    """
+    Ejecuta el benchmark para cada tamaño y devuelve el informe completo.
+
+    Cada tamaño corre en un proceso 'spawn' nuevo con su propio directorio de
+    trabajo temporal (los gráficos se escriben en results/graficos relativo).
+    """
+    contexto = multiprocessing.get_context("spawn")
+    informe = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "plataforma": {
+            "python": platform.python_version(),
+            "sistema": platform.platform(),
+            "procesador": platform.processor() or platform.machine(),
+            "nucleos": os.cpu_count(),
+        },
+        "parametros": {"semilla": semilla, "tasa_n": tasa_n, "distribucion": distribucion, "etapas": etapas},
+        "resultados": [],
+    }
+
+    for tamano in tamanos:
+        print(f"\nTamaño objetivo: {tamano / 1024 ** 2:.1f} MB por especie")
+        archivos = generar_par_especies(directorio_datos, tamano, semilla=semilla,
+                                        tasa_n=tasa_n, distribucion=distribucion)
+        cola = contexto.Queue()
+        with tempfile.TemporaryDirectory(prefix="salmo_bench_") as directorio_trabajo:
+            proceso = contexto.Process(target=_ejecutar_etapas,
+                                       args=(archivos, etapas, directorio_trabajo, cola))
+            proceso.start()
+            salida = _esperar_resultado(proceso, cola, timeout)
+            proceso.join()
+
+        informe["resultados"].append({
+            "tamano_objetivo_bytes": tamano,
+            "bytes_fasta": archivos["salmonella"]["bytes"] + archivos["gallus"]["bytes"],
+            "genes": archivos["salmonella"]["genes"] + archivos["gallus"]["genes"],
+            "bases": archivos["salmonella"]["bases"] + archivos["gallus"]["bases"],
+            **salida,
+        })
+    return informe
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de SalmoAvianLight")
+    parser.add_argument("--tamanos", default=TAMANOS_POR_DEFECTO,
+                        help=f"Tamaños por especie separados por comas (por defecto: {TAMANOS_POR_DEFECTO})")
+    parser.add_argument("--etapas", default=",".join(ETAPAS),
+                        help="Etapas a medir, separadas por comas (la carga siempre se mide)")
+    parser.add_argument("--omitir", default="",
+                        help="Etapas a excluir, ej: relacion_longitud_gc (KDE cuadrática en genes)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--tasa-n", type=float, default=0.0, help="Proporción de bases N")
+    parser.add_argument("--distribucion", default="lognormal", choices=["lognormal", "uniforme", "fija"])
+    parser.add_argument("--directorio-datos", default=os.path.join(tempfile.gettempdir(), "salmo_benchmarks"),
+                        help="Dónde generar (y reutilizar) los FASTA sintéticos")
+    parser.add_argument("--timeout", type=float, default=None, help="Límite en segundos por tamaño")
+    parser.add_argument("--salida", default="benchmark_resultados.json", help="Archivo JSON de resultados")
+    args = parser.parse_args(argv)
+
+    omitir = {e.strip() for e in args.omitir.split(",") if e.strip()}
+    etapas = [e.strip() for e in args.etapas.split(",") if e.strip() and e.strip() not in omitir]
+    desconocidas = set(etapas) - set(ETAPAS)
+    if desconocidas:
+        parser.error(f"Etapas desconocidas: {', '.join(sorted(desconocidas))}")
+
+    tamanos = [parsear_tamano(t) for t in args.tamanos.split(",") if t.strip()]
+    informe = ejecutar_benchmark(tamanos, etapas, args.directorio_datos, semilla=args.semilla,
+                                 tasa_n=args.tasa_n, distribucion=args.distribucion, timeout=args.timeout)
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en: {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
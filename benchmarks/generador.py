@@ -0,0 +1,134 @@
+"""
+Generador de genomas sintéticos (FASTA) reproducibles para benchmarks.
+"""
+import json
+import os
+from typing import Dict
+
+import numpy as np
+
+_BASES = np.frombuffer(b'GCATN', dtype=np.uint8)
+
+
+def _longitudes(rng: np.random.Generator, n: int, media: int, distribucion: str) -> np.ndarray:
+    """Genera n longitudes de gen según la distribución indicada (mínimo 3 pb)."""
+    if distribucion == "fija":
+        longitudes = np.full(n, media)
+    elif distribucion == "uniforme":
+        longitudes = rng.integers(media // 2, media * 3 // 2 + 1, size=n)
+    elif distribucion == "lognormal":
+        # sigma 0.6 se parece a la distribución de longitudes de genes bacterianos
+        longitudes = rng.lognormal(np.log(media) - 0.18, 0.6, size=n)
+    else:
+        raise ValueError(f"Distribución de longitudes desconocida: {distribucion}")
+    return np.maximum(longitudes.astype(np.int64), 3)
+
+
+def generar_fasta_sintetico(
+    ruta_salida: str,
+    tamano_bytes: int,
+    semilla: int = 0,
+    longitud_media: int = 1000,
+    distribucion: str = "lognormal",
+    gc: float = 0.5,
+    tasa_n: float = 0.0,
+    ancho_linea: int = 60,
+    prefijo_id: str = "gen",
+) -> Dict:
+    """
+    Escribe un FASTA sintético de aproximadamente tamano_bytes bytes.
+
+    Parámetros:
+    -----------
+    ruta_salida : str
+        Ruta del archivo FASTA a crear
+    tamano_bytes : int
+        Tamaño objetivo del archivo (se detiene al superarlo)
+    semilla : int
+        Semilla del generador; la misma semilla produce el mismo archivo
+    longitud_media : int
+        Longitud media de los genes en pb
+    distribucion : str
+        'lognormal', 'uniforme' o 'fija'
+    gc : float
+        Proporción esperada de G+C (0-1)
+    tasa_n : float
+        Proporción de bases N (ambiguas)
+    ancho_linea : int
+        Bases por línea de secuencia
+
+    Retorna:
+    --------
+    dict
+        {'ruta', 'bytes', 'genes', 'bases'} del archivo generado
+    """
+    if not 0 <= gc <= 1 or not 0 <= tasa_n < 1:
+        raise ValueError("gc debe estar entre 0 y 1 y tasa_n entre 0 y 1 (excluido)")
+
+    rng = np.random.default_rng(semilla)
+    resto = 1.0 - tasa_n
+    probabilidades = [resto * gc / 2, resto * gc / 2, resto * (1 - gc) / 2, resto * (1 - gc) / 2, tasa_n]
+
+    escritos = 0
+    genes = 0
+    bases_totales = 0
+    os.makedirs(os.path.dirname(os.path.abspath(ruta_salida)), exist_ok=True)
+
+    with open(ruta_salida, "wb") as f:
+        while escritos < tamano_bytes:
+            # Generar por lotes para que el coste sea de numpy y no de Python
+            longitudes = _longitudes(rng, 1024, longitud_media, distribucion)
+            bases = _BASES[rng.choice(5, size=int(longitudes.sum()), p=probabilidades)].tobytes()
+
+            partes = []
+            inicio = 0
+            for longitud in longitudes.tolist():
+                secuencia = bases[inicio:inicio + longitud]
+                inicio += longitud
+                lineas = [secuencia[i:i + ancho_linea] for i in range(0, longitud, ancho_linea)]
+                registro = b">%s%d longitud=%d\n%s\n" % (prefijo_id.encode(), genes, longitud, b"\n".join(lineas))
+                partes.append(registro)
+                escritos += len(registro)
+                genes += 1
+                bases_totales += longitud
+                if escritos >= tamano_bytes:
+                    break
+            f.write(b"".join(partes))
+
+    return {"ruta": ruta_salida, "bytes": escritos, "genes": genes, "bases": bases_totales}
+
+
+def parsear_tamano(texto: str) -> int:
+    """Convierte '1MB', '500KB', '2GB' o '1048576' a bytes."""
+    texto = texto.strip().upper()
+    for sufijo, factor in (("GB", 1024 ** 3), ("MB", 1024 ** 2), ("KB", 1024), ("B", 1)):
+        if texto.endswith(sufijo):
+            return int(float(texto[:-len(sufijo)]) * factor)
+    return int(texto)
+
+
+def generar_par_especies(directorio: str, tamano_bytes: int, semilla: int = 0,
+                         tasa_n: float = 0.0, distribucion: str = "lognormal",
+                         reutilizar: bool = True) -> Dict:
+    """
+    Genera el par Salmonella/Gallus sintético usado por los benchmarks.
+
+    Salmonella con ~52% GC y genes de ~1000 pb; Gallus con ~42% GC y genes de
+    ~1500 pb. Si reutilizar es True y los archivos ya existen, no se regeneran
+    (los metadatos se guardan junto a cada FASTA en un .json).
+    """
+    resultado = {}
+    for especie, gc, longitud, desplazamiento in (("salmonella", 0.52, 1000, 0), ("gallus", 0.42, 1500, 1)):
+        ruta = os.path.join(directorio, f"{especie}_{tamano_bytes}_{semilla}_{tasa_n}_{distribucion}.fasta")
+        ruta_meta = ruta + ".json"
+        if reutilizar and os.path.exists(ruta) and os.path.exists(ruta_meta):
+            with open(ruta_meta, encoding="utf-8") as f:
+                resultado[especie] = json.load(f)
+            continue
+        resultado[especie] = generar_fasta_sintetico(
+            ruta, tamano_bytes, semilla=semilla + desplazamiento, longitud_media=longitud,
+            distribucion=distribucion, gc=gc, tasa_n=tasa_n, prefijo_id=especie[:3],
+        )
+        with open(ruta_meta, "w", encoding="utf-8") as f:
+            json.dump(resultado[especie], f)
+    return resultado
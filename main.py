@@ -1,15 +1,149 @@
 # Importaciones simplificadas gracias al __init__.py
+# (los gráficos se importan en el paso 4: matplotlib solo se carga al dibujar)
 from src import (
     cargar_secuencias, 
+    cargar_secuencias_seleccionadas,
     calcular_metricas_basicas, 
     calcular_uso_codones,
-    grafico_gc, 
-    generar_todos_los_graficos
+    calcular_metricas_codificadas,
+    calcular_uso_codones_codificadas,
+    resumir_fasta_por_bloques,
+    validar_fasta,
+    describir_invalidos
 )
+from src.paralelo import ejecutar_ramas
+from src.perfilado import MODOS_PERFIL, Perfilador, modo_perfil_desde_entorno
 import pandas as pd
+import argparse
 import os
+import re
 
-def main():
+def parsear_argumentos(argv=None):
+    """Lee los argumentos de la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Analisis comparativo de secuencias de Salmonella y Gallus"
+    )
+    parser.add_argument(
+        "--salmonella",
+        default="data/salmonella_genes.fasta",
+        help="FASTA de Salmonella; admite .gz, .bgz y .zst (por defecto: data/salmonella_genes.fasta)"
+    )
+    parser.add_argument(
+        "--gallus",
+        default="data/gallus_genes.fasta",
+        help="FASTA de Gallus; admite .gz, .bgz y .zst (por defecto: data/gallus_genes.fasta)"
+    )
+    parser.add_argument(
+        "--ids",
+        help="Analizar solo estos genes (identificadores separados por comas). Usa un índice .fai"
+    )
+    parser.add_argument(
+        "--ids-archivo",
+        help="Archivo de texto con un identificador de gen por línea (igual que --ids)"
+    )
+    parser.add_argument(
+        "--patron",
+        help="Analizar solo los genes cuyo identificador coincida con esta expresión regular"
+    )
+    parser.add_argument(
+        "--bloques",
+        nargs="?",
+        const=8,
+        type=int,
+        metavar="MIB",
+        help="Leer los FASTA por bloques de MIB MiB (8 por defecto) sin cargar registros enteros; "
+             "para cromosomas completos. Mismos resultados"
+    )
+    parser.add_argument(
+        "--secuencial",
+        action="store_true",
+        help="Procesar Salmonella y Gallus una tras otra en este proceso "
+             "(por defecto, en dos procesos si hay varios nucleos y los archivos son grandes)"
+    )
+    parser.add_argument(
+        "--perfil", "--profile",
+        nargs="?",
+        const="cprofile",
+        choices=MODOS_PERFIL,
+        help="Perfilar el analisis (cprofile por defecto, o tracemalloc) y guardar el perfil en results/perfiles/"
+    )
+    args = parser.parse_args(argv)
+    if args.patron:
+        try:
+            re.compile(args.patron)
+        except re.error as e:
+            parser.error("--patron no es una expresion regular valida: {}".format(e))
+    if args.bloques is not None:
+        if args.bloques <= 0:
+            parser.error("--bloques debe ser un número positivo de MiB")
+        if args.ids or args.ids_archivo or args.patron:
+            parser.error("--bloques no se puede combinar con --ids, --ids-archivo ni --patron")
+    return args
+
+def leer_ids_seleccionados(args):
+    """Reúne los identificadores de --ids y --ids-archivo (None si no se indicó ninguno)."""
+    if not args.ids and not args.ids_archivo:
+        return None
+    ids = set()
+    if args.ids:
+        ids.update(i.strip() for i in args.ids.split(",") if i.strip())
+    if args.ids_archivo:
+        with open(args.ids_archivo, encoding="utf-8") as f:
+            ids.update(linea.strip() for linea in f if linea.strip())
+    return ids
+
+def analizar_especie(ruta, especie, tam_bloque=None, ids=None, patron=None):
+    """
+    Rama de una especie: validar, cargar, metricas basicas y uso de codones.
+
+    Con una seleccion de genes (ids o patron) no se valida el archivo entero:
+    solo se leen los registros pedidos a traves del indice .fai.
+
+    Las dos especies son independientes hasta unir las tablas, asi que main
+    ejecuta una rama por especie (en paralelo si conviene, ver src/paralelo.py).
+
+    Retorna:
+    --------
+    dict
+        {'error': str} si el archivo no es un FASTA valido; si no,
+        {'metricas': DataFrame, 'codones': DataFrame, 'registros': int}
+    """
+    if ids is not None or patron:
+        # Acceso directo por índice .fai: solo se leen (y se revisan) los genes
+        # seleccionados; una pasada por todo el archivo anularía la selección
+        try:
+            secuencias = cargar_secuencias_seleccionadas(ruta, ids=ids, patron=patron)
+        except ValueError as e:
+            return {'error': str(e)}
+        df_metricas = calcular_metricas_basicas(secuencias)
+        df_codones = calcular_uso_codones(secuencias, especie)
+        return {'metricas': df_metricas, 'codones': df_codones, 'registros': len(secuencias)}
+    
+    # Una pasada rápida por el archivo: un FASTA corrupto se rechaza antes del análisis
+    try:
+        validacion = validar_fasta(ruta)
+    except ValueError as e:
+        return {'error': "{} no es un FASTA valido: {}".format(ruta, e)}
+    if validacion['bases'] == 0:
+        return {'error': "{} no es un FASTA valido: ninguna secuencia".format(ruta)}
+    print("  {}: {} secuencias, {} bases".format(ruta, validacion['registros'], validacion['bases']))
+    if validacion['invalidos']:
+        # La carga omite esos caracteres (como limpiar_y_normalizar_secuencias)
+        print("  Aviso: {}: {}".format(ruta, describir_invalidos(validacion)))
+    
+    if tam_bloque:
+        # Cada registro se resume al leerlo: la memoria no depende de su longitud
+        secuencias = resumir_fasta_por_bloques(ruta, tam_bloque=tam_bloque)
+        df_metricas = calcular_metricas_codificadas(secuencias)
+        df_codones = calcular_uso_codones_codificadas(secuencias, especie)
+    else:
+        secuencias = cargar_secuencias(ruta)
+        df_metricas = calcular_metricas_basicas(secuencias)
+        df_codones = calcular_uso_codones(secuencias, especie)
+    return {'metricas': df_metricas, 'codones': df_codones, 'registros': len(secuencias)}
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
     
     print("Iniciando analisis de secuencias de Salmonella y Gallus")
     print("=" * 60)
@@ -17,28 +151,39 @@ def main():
     # Crear carpetas necesarias si no existen
     os.makedirs('results/graficos', exist_ok=True)
     
+    # Perfilado opcional: --perfil o la variable de entorno SALMO_PERFIL
+    perfilador = Perfilador(args.perfil or modo_perfil_desde_entorno(), 'results/perfiles')
+    perfilador.iniciar()
+    
     try:
-        # === 1. CARGA DE SECUENCIAS ===
-        print("Paso 1: Cargando secuencias desde archivos FASTA...")
-        salmonella = cargar_secuencias("data/salmonella_genes.fasta")
-        gallus = cargar_secuencias("data/gallus_genes.fasta")
+        # === 0-3. VALIDACION, CARGA, METRICAS Y CODONES DE CADA ESPECIE ===
+        # Las especies son independientes hasta unir las tablas: una rama por especie
+        print("Pasos 0-3: Validando, cargando y analizando cada especie...")
+        ids = leer_ids_seleccionados(args)
+        if ids is not None or args.patron:
+            print("Seleccion de genes activa (indice .fai)")
+        opciones = (args.bloques * 1024 * 1024 if args.bloques else None, ids, args.patron)
+        ramas = [(args.salmonella, ("salmonella",) + opciones), (args.gallus, ("gallus",) + opciones)]
+        # Al perfilar, todo en este proceso: el perfil no ve a los procesos hijos
+        paralelo = False if args.secuencial or perfilador.modo else None
+        rama_salmonella, rama_gallus = ejecutar_ramas(analizar_especie, ramas, paralelo)
+        errores = [rama['error'] for rama in (rama_salmonella, rama_gallus) if 'error' in rama]
+        if errores:
+            for error in errores:
+                print("Error: {}".format(error))
+            return
         print("Secuencias cargadas: {} de Salmonella, {} de Gallus".format(
-            len(salmonella), len(gallus)))
-        
-        # === 2. CALCULO DE METRICAS BASICAS ===
-        print("\nPaso 2: Calculando metricas basicas...")
-        df_salmonella = calcular_metricas_basicas(salmonella)
-        df_gallus = calcular_metricas_basicas(gallus)
+            rama_salmonella['registros'], rama_gallus['registros']))
         
-        # Combinar resultados de ambas especies
+        # Combinar metricas de ambas especies
+        df_salmonella = rama_salmonella['metricas']
+        df_gallus = rama_gallus['metricas']
         df_metricas = pd.concat([df_salmonella, df_gallus], ignore_index=True)
         df_metricas.to_csv("results/resumen_metricas.csv", index=False)
         print("Metricas guardadas en: results/resumen_metricas.csv")
         
-        # === 3. ANALISIS DE USO DE CODONES ===
-        print("\nPaso 3: Analizando uso de codones...")
-        df_codones_salmonella = calcular_uso_codones(salmonella, "salmonella")
-        df_codones_gallus = calcular_uso_codones(gallus, "gallus")
+        df_codones_salmonella = rama_salmonella['codones']
+        df_codones_gallus = rama_gallus['codones']
         
         # Combinar datos de uso de codones
         df_codones = (pd.merge(df_codones_salmonella, df_codones_gallus, on="codon", how="outer")
@@ -51,6 +196,7 @@ def main():
         
         # === 4. GENERACION DE GRAFICOS BASICOS ===
         print("\nPaso 4: Generando graficos basicos de GC...")
+        from src import grafico_gc, generar_todos_los_graficos
         grafico_gc(df_salmonella, "salmonella")
         grafico_gc(df_gallus, "gallus")
         
@@ -73,6 +219,9 @@ def main():
         import traceback
         traceback.print_exc()
         print("Por favor, verifique la estructura del proyecto y los archivos de datos")
+    
+    finally:
+        perfilador.detener()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -3,62 +3,114 @@ Cliente de análisis que soporta dos modos:
 1. Local-Import Mode: ejecuta análisis localmente usando módulos Python
 2. API Mode: usa un backend HTTP para ejecutar análisis remotos
 """
+import hashlib
+import importlib.util
 import os
 import sys
 import tempfile
-import time
+import threading
+import uuid
+import zlib
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, List, Optional, Union
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from services import metricas
+from services.pool_analisis import PoolAnalisis, analizar_instrumentado
 
 # Detectar modo de operación
 BACKEND_BASE_URL = os.environ.get("BACKEND_BASE_URL")
 
-# Si estamos en modo local, importar módulos
+# En modo local el análisis se importa al ejecutarse (ver _start_analysis_local):
+# cargar src aquí añadiría pandas/numpy/matplotlib al arranque de la app
 if not BACKEND_BASE_URL:
     # Agregar el directorio raíz al path para importar src
     project_root = Path(__file__).parent.parent
     sys.path.insert(0, str(project_root))
-    
-    try:
-        from src import (
-            cargar_secuencias,
-            calcular_metricas_basicas,
-            validar_secuencias,
-            calcular_uso_codones,
-            generar_todos_los_graficos,
-            grafico_gc,
-        )
-        from src.visualizacion import (
-            distribucion_longitudes,
-            distribucion_gc,
-            relacion_longitud_gc,
-            uso_codones_top20,
-            correlacion_codones,
-            heatmap_codones,
-            distribucion_acumulativa_longitudes,
-        )
-        LOCAL_MODE = True
-    except ImportError as e:
-        print(f"Error al importar módulos locales: {e}")
-        LOCAL_MODE = False
+    LOCAL_MODE = importlib.util.find_spec("src") is not None
+    if not LOCAL_MODE:
+        print("Error al importar módulos locales: no se encontró el paquete src")
 else:
     LOCAL_MODE = False
 
 
+# Contenido FASTA: bytes en memoria o un archivo binario (ej: UploadedFile de Streamlit)
+FastaInput = Union[bytes, memoryview, BinaryIO]
+
+# Conexiones HTTP reutilizadas por host (keep-alive) y descargas simultáneas
+CONEXIONES_POR_HOST = 16
+DESCARGAS_SIMULTANEAS = 8
+
+# Subida por fragmentos: tamaño de fragmento y fragmentos enviados a la vez
+TAM_FRAGMENTO_SUBIDA = 8 * 1024 * 1024
+SUBIDAS_SIMULTANEAS = 4
+
+# Estado de get_status cuando el backend no responde (red caída, 5xx tras
+# los reintentos): el trabajo puede seguir en curso, hay que volver a consultar
+ESTADO_NO_DISPONIBLE = "UNREACHABLE"
+
+# Firmas de gzip/BGZF y zstd: esos archivos se envían sin volver a comprimir
+_FIRMAS_COMPRIMIDO = (b'\x1f\x8b', b'\x28\xb5\x2f\xfd')
+
+
+def crear_sesion_http(reintentos: int = 3, espera_base: float = 0.5) -> requests.Session:
+    """
+    Crea una sesión HTTP con pool de conexiones y reintentos.
+    
+    Solo se reintentan las peticiones idempotentes (GET/HEAD y el PUT de un
+    fragmento, direccionado por su SHA-256) ante errores de conexión o
+    respuestas 429/502/503/504, con espera exponencial (espera_base,
+    2·espera_base, 4·espera_base...). El envío de análisis (POST) nunca se
+    reintenta para no crear trabajos duplicados.
+    """
+    reintento = Retry(
+        total=reintentos,
+        backoff_factor=espera_base,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "PUT"}),
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    adaptador = HTTPAdapter(
+        pool_connections=CONEXIONES_POR_HOST,
+        pool_maxsize=CONEXIONES_POR_HOST,
+        max_retries=reintento,
+    )
+    sesion = requests.Session()
+    sesion.mount("http://", adaptador)
+    sesion.mount("https://", adaptador)
+    return sesion
+
+
 class AnalysisClient:
     """Cliente para ejecutar análisis genéticos en modo local o API."""
     
-    def __init__(self):
+    def __init__(self, pool: Optional[PoolAnalisis] = None):
+        """
+        Parámetros:
+        -----------
+        pool : PoolAnalisis, optional
+            Pool de procesos precalentados para el modo local. Sin pool, el
+            análisis se ejecuta en el proceso actual.
+        """
         self.mode = "LOCAL" if LOCAL_MODE else "API"
+        self.pool = pool if LOCAL_MODE else None
+        self.session = crear_sesion_http() if self.mode == "API" else None
         self.base_url = BACKEND_BASE_URL.rstrip('/') if BACKEND_BASE_URL else None
         self.temp_dir = None
+        # Trabajos enviados al backend cuyo estado final aún no se ha visto
+        self._trabajos_pendientes = set()
+        # Los hilos de subida comparten el cursor de los archivos subidos
+        self._lock_lectura = threading.Lock()
+        metricas.configurar_exportadores_desde_entorno()
     
     def start_analysis(
         self,
-        salmonella_fasta: bytes,
-        gallus_fasta: bytes,
+        salmonella_fasta: FastaInput,
+        gallus_fasta: FastaInput,
         params: Dict
     ) -> Dict:
         """
@@ -66,54 +118,111 @@ class AnalysisClient:
         
         Parámetros:
         -----------
-        salmonella_fasta : bytes
-            Contenido del archivo FASTA de Salmonella
-        gallus_fasta : bytes
+        salmonella_fasta : bytes o archivo binario
+            Contenido del archivo FASTA de Salmonella. Se recomienda pasar el
+            archivo subido tal cual: se lee en flujo, sin copiarlo entero.
+        gallus_fasta : bytes o archivo binario
             Contenido del archivo FASTA de Gallus
         params : dict
             Parámetros del análisis:
             - min_len: int (longitud mínima de secuencias)
             - limpiar_ns: bool (normalizar/limpiar Ns)
+            - politica_ns: str, optional (tratamiento de Ns; ver src.codificacion.POLITICAS_NS)
+            - fraccion_max_ns: float (con politica_ns='descartar')
             - top_codons: int (número de codones para gráfico comparativo)
         
         Retorna:
         --------
         dict
             {'jobId': str} en modo API
-            {'status': 'COMPLETED', 'results': {...}} en modo LOCAL
+            {'jobId': str, 'status': 'COMPLETED', 'results': {...}} en modo LOCAL
         """
+        metricas.ANALISIS_INICIADOS.incrementar(modo=self.mode)
+        for fuente in (salmonella_fasta, gallus_fasta):
+            metricas.BYTES_PROCESADOS.incrementar(metricas.tamano_fuente(fuente) or 0, modo=self.mode)
+        
         if self.mode == "API":
-            return self._start_analysis_api(salmonella_fasta, gallus_fasta, params)
+            try:
+                respuesta = self._start_analysis_api(salmonella_fasta, gallus_fasta, params)
+            except Exception:
+                metricas.ANALISIS_FALLIDOS.incrementar(modo=self.mode, error="envio")
+                raise
+            job_id = respuesta.get('jobId')
+            if job_id and job_id not in self._trabajos_pendientes:
+                self._trabajos_pendientes.add(job_id)
+                metricas.ANALISIS_ACTIVOS.incrementar(modo=self.mode)
+            return respuesta
+        
+        metricas.ANALISIS_ACTIVOS.incrementar(modo=self.mode)
+        try:
+            resultado = self._start_analysis_local(salmonella_fasta, gallus_fasta, params)
+        except Exception as e:
+            metricas.ANALISIS_FALLIDOS.incrementar(modo=self.mode, error=type(e).__name__)
+            raise
         else:
-            return self._start_analysis_local(salmonella_fasta, gallus_fasta, params)
+            metricas.ANALISIS_COMPLETADOS.incrementar(modo=self.mode)
+            return resultado
+        finally:
+            metricas.ANALISIS_ACTIVOS.decrementar(modo=self.mode)
+            metricas.escribir_textfile()
     
     def _start_analysis_api(
         self,
-        salmonella_fasta: bytes,
-        gallus_fasta: bytes,
+        salmonella_fasta: FastaInput,
+        gallus_fasta: FastaInput,
         params: Dict
     ) -> Dict:
-        """Inicia análisis en modo API."""
+        """
+        Inicia análisis en modo API.
+        
+        Los FASTA se suben por fragmentos direccionados por contenido (ver
+        _subir_fasta): solo viajan los fragmentos que el servidor no tiene, y
+        un archivo ya subido no se reenvía. Si el backend no implementa
+        /uploads, se usa el formulario multipart clásico.
+        """
         url = f"{self.base_url}/start-analysis"
         
-        files = {
-            'salmonella_fasta': ('salmonella.fasta', salmonella_fasta, 'text/plain'),
-            'gallus_fasta': ('gallus.fasta', gallus_fasta, 'text/plain'),
-        }
+        # Los archivos subidos pueden haberse leído ya (validación): rebobinar
+        for fuente in (salmonella_fasta, gallus_fasta):
+            if hasattr(fuente, 'seek'):
+                fuente.seek(0)
         
         data = {
             'min_len': params.get('min_len', 0),
             'limpiar_ns': params.get('limpiar_ns', True),
             'top_codons': params.get('top_codons', 20),
         }
+        if params.get('politica_ns'):
+            # Solo si se eligió: un backend anterior sigue recibiendo lo de siempre
+            data['politica_ns'] = params['politica_ns']
+            data['fraccion_max_ns'] = params.get('fraccion_max_ns', 0.1)
         
+        response = None
         try:
-            response = requests.post(url, files=files, data=data, timeout=30)
+            sha_salmonella = self._subir_fasta(salmonella_fasta)
+            sha_gallus = self._subir_fasta(gallus_fasta) if sha_salmonella else None
+            
+            if sha_salmonella and sha_gallus:
+                response = self.session.post(
+                    url, json={'salmonella': sha_salmonella, 'gallus': sha_gallus, **data}, timeout=30
+                )
+            else:
+                # Backend sin subida por fragmentos: enviar los archivos completos
+                for fuente in (salmonella_fasta, gallus_fasta):
+                    if hasattr(fuente, 'seek'):
+                        fuente.seek(0)
+                files = {
+                    'salmonella_fasta': ('salmonella.fasta', salmonella_fasta, 'text/plain'),
+                    'gallus_fasta': ('gallus.fasta', gallus_fasta, 'text/plain'),
+                }
+                response = self.session.post(url, files=files, data=data, timeout=30)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.Timeout:
             raise Exception("❌ Tiempo de espera agotado al comunicarse con el servidor. El archivo puede ser demasiado grande o el servidor está ocupado.")
         except requests.exceptions.HTTPError as e:
+            # La respuesta con error puede venir de la subida o del inicio del análisis
+            response = e.response if e.response is not None else response
             # Intentar obtener mensaje de error del servidor si está disponible
             try:
                 error_data = response.json()
@@ -124,14 +233,106 @@ class AnalysisClient:
         except requests.exceptions.RequestException as e:
             raise Exception(f"❌ Error de conexión con el backend: {str(e)}. Verifique que el servidor esté disponible.")
     
+    def _subir_fasta(self, fuente: FastaInput) -> Optional[str]:
+        """
+        Sube un FASTA por fragmentos y devuelve su SHA-256.
+        
+        1. Calcula el SHA-256 de cada fragmento de TAM_FRAGMENTO_SUBIDA bytes
+           y del archivo completo (una lectura secuencial).
+        2. POST /uploads con la lista: el servidor responde qué fragmentos faltan.
+        3. PUT /fragmentos/<sha256> de los que faltan, SUBIDAS_SIMULTANEAS a la
+           vez, comprimidos con deflate (nivel 1) salvo que el archivo ya venga
+           comprimido. Un PUT fallido se reintenta sin riesgo, y una subida
+           interrumpida se reanuda enviando solo lo que no llegó.
+        4. POST /uploads/<sha256>/completar: el servidor ensambla y verifica.
+        
+        Retorna:
+        --------
+        str o None
+            SHA-256 del archivo, o None si el backend no soporta /uploads
+        """
+        fragmentos, sha256, tamano = self._sumas_fragmentos(fuente)
+        
+        response = self.session.post(
+            f"{self.base_url}/uploads",
+            json={'sha256': sha256, 'tamano': tamano, 'fragmentos': fragmentos},
+            timeout=30,
+        )
+        if response.status_code in (404, 405):
+            return None
+        response.raise_for_status()
+        faltantes = set(response.json().get('faltantes', []))
+        
+        if faltantes:
+            primeros = self._leer_fragmento(fuente, 0, min(tamano, 4))
+            comprimir = not primeros.startswith(_FIRMAS_COMPRIMIDO)
+            # Un fragmento repetido dentro del archivo se envía una sola vez
+            pendientes = {}
+            for i, h in enumerate(fragmentos):
+                if h in faltantes:
+                    pendientes.setdefault(h, i)
+            # Cada hilo lee su fragmento al enviarlo: en memoria hay como mucho
+            # SUBIDAS_SIMULTANEAS fragmentos, no el archivo completo
+            with ThreadPoolExecutor(max_workers=SUBIDAS_SIMULTANEAS) as executor:
+                futuros = [
+                    executor.submit(self._enviar_fragmento, fuente, i, h, comprimir)
+                    for h, i in pendientes.items()
+                ]
+                for futuro in futuros:
+                    futuro.result()
+        
+        response = self.session.post(f"{self.base_url}/uploads/{sha256}/completar", timeout=60)
+        response.raise_for_status()
+        return sha256
+    
+    def _sumas_fragmentos(self, fuente: FastaInput):
+        """Retorna (lista de SHA-256 por fragmento, SHA-256 total, tamaño) en una lectura."""
+        suma_total = hashlib.sha256()
+        fragmentos = []
+        tamano = 0
+        if isinstance(fuente, (bytes, bytearray, memoryview)):
+            vista = memoryview(fuente).cast('B')
+            bloques = (vista[i:i + TAM_FRAGMENTO_SUBIDA] for i in range(0, vista.nbytes, TAM_FRAGMENTO_SUBIDA))
+        else:
+            fuente.seek(0)
+            bloques = iter(lambda: fuente.read(TAM_FRAGMENTO_SUBIDA), b'')
+        for bloque in bloques:
+            suma_total.update(bloque)
+            fragmentos.append(hashlib.sha256(bloque).hexdigest())
+            tamano += len(bloque)
+        return fragmentos, suma_total.hexdigest(), tamano
+    
+    def _leer_fragmento(self, fuente: FastaInput, posicion: int, tamano: int) -> bytes:
+        """Lee tamano bytes desde posicion (los archivos se leen bajo lock: comparten el cursor)."""
+        if isinstance(fuente, (bytes, bytearray, memoryview)):
+            return bytes(memoryview(fuente).cast('B')[posicion:posicion + tamano])
+        with self._lock_lectura:
+            fuente.seek(posicion)
+            return fuente.read(tamano)
+    
+    def _enviar_fragmento(self, fuente: FastaInput, indice: int, sha256: str, comprimir: bool):
+        """Envía el fragmento indice (PUT idempotente: se reintenta con la sesión)."""
+        datos = self._leer_fragmento(fuente, indice * TAM_FRAGMENTO_SUBIDA, TAM_FRAGMENTO_SUBIDA)
+        cabeceras = {'Content-Type': 'application/octet-stream'}
+        if comprimir:
+            # Nivel 1: la mayor parte de la ganancia en FASTA (alfabeto de 4
+            # letras) a una fracción del coste de CPU de niveles altos
+            comprimido = zlib.compress(datos, 1)
+            if len(comprimido) < len(datos):
+                datos = comprimido
+                cabeceras['Content-Encoding'] = 'deflate'
+        response = self.session.put(f"{self.base_url}/fragmentos/{sha256}", data=datos, headers=cabeceras, timeout=60)
+        response.raise_for_status()
+    
     def _start_analysis_local(
         self,
-        salmonella_fasta: bytes,
-        gallus_fasta: bytes,
+        salmonella_fasta: FastaInput,
+        gallus_fasta: FastaInput,
         params: Dict
     ) -> Dict:
-        """Ejecuta análisis localmente."""
+        """Ejecuta análisis localmente (en este proceso o en el pool precalentado)."""
         import shutil
+        from src.perfilado import modo_perfil_desde_entorno
         
         # Limpiar directorio temporal anterior si existe
         if self.temp_dir and os.path.exists(self.temp_dir):
@@ -142,160 +343,37 @@ class AnalysisClient:
         
         # Crear directorio temporal nuevo para archivos
         self.temp_dir = tempfile.mkdtemp(prefix="bioinfo_analysis_")
-        results_dir = Path(self.temp_dir) / "results"
-        graficos_dir = results_dir / "graficos"
-        graficos_dir.mkdir(parents=True, exist_ok=True)
         
-        # Guardar archivos FASTA temporales
-        salmonella_path = Path(self.temp_dir) / "salmonella.fasta"
-        gallus_path = Path(self.temp_dir) / "gallus.fasta"
+        # Instrumentación por etapa (tiempo, CPU, RSS, registros/bases) y
+        # perfilado opcional (SALMO_PERFIL=cprofile|tracemalloc) en results/perfiles
+        contexto = {'analisis_id': uuid.uuid4().hex, 'modo': 'LOCAL'}
+        modo_perfil = modo_perfil_desde_entorno()
         
-        # Escribir archivos con manejo de errores de memoria y codificación
         try:
-            # Función auxiliar para guardar archivos detectando automáticamente la codificación
-            def guardar_archivo_con_codificacion(contenido_bytes, ruta_archivo):
-                """Guarda un archivo detectando automáticamente la codificación."""
-                if not isinstance(contenido_bytes, bytes):
-                    # Si no es bytes, convertir a string y luego a bytes UTF-8
-                    contenido_str = str(contenido_bytes)
-                    ruta_archivo.write_text(contenido_str, encoding='utf-8')
-                    return True
-                
-                # Intentar diferentes codificaciones
-                codificaciones = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1', 'utf-8-sig']
-                
-                for encoding in codificaciones:
-                    try:
-                        # Intentar decodificar con esta codificación
-                        contenido_texto = contenido_bytes.decode(encoding)
-                        # Guardar como texto UTF-8 (normalizado)
-                        ruta_archivo.write_text(contenido_texto, encoding='utf-8')
-                        return True
-                    except (UnicodeDecodeError, UnicodeError):
-                        continue
-                
-                # Si ninguna codificación funciona, guardar como bytes (último recurso)
-                # Esto puede causar problemas después, pero al menos no falla aquí
-                ruta_archivo.write_bytes(contenido_bytes)
-                return False
-            
-            # Guardar archivos con detección automática de codificación
-            if not guardar_archivo_con_codificacion(salmonella_fasta, salmonella_path):
-                print("[DEBUG] Advertencia: No se pudo detectar la codificación del archivo Salmonella, guardado como bytes")
-            
-            if not guardar_archivo_con_codificacion(gallus_fasta, gallus_path):
-                print("[DEBUG] Advertencia: No se pudo detectar la codificación del archivo Gallus, guardado como bytes")
-                
-        except MemoryError:
-            raise MemoryError("No hay suficiente memoria para guardar los archivos. Los archivos son demasiado grandes.")
-        except Exception as e:
-            # Capturar cualquier otro error y proporcionar mensaje claro
-            error_msg = str(e).lower()
-            if "codec" in error_msg or "decode" in error_msg or "encode" in error_msg or "ascii" in error_msg:
-                raise ValueError(
-                    "Error de codificación al procesar el archivo. El archivo contiene caracteres especiales que no se pueden leer. "
-                    "Por favor, guarde el archivo en formato UTF-8 o ASCII antes de subirlo. "
-                    "Puede hacer esto abriendo el archivo en un editor de texto y guardándolo como 'UTF-8' o 'ASCII'."
-                )
+            # Cargar, validar, filtrar, limpiar, métricas, codones y gráficos
+            if self.pool is not None:
+                salida = self.pool.ejecutar(salmonella_fasta, gallus_fasta, params, self.temp_dir, contexto, modo_perfil)
             else:
-                raise Exception(f"Error al guardar archivos temporales: {str(e)}")
-        
-        try:
-            # 1. Cargar secuencias usando paths absolutos
-            # Mostrar progreso para archivos grandes
-            import sys
-            sys.stdout.write("[DEBUG] Cargando secuencias de Salmonella...\n")
-            sys.stdout.flush()
-            try:
-                salmonella = cargar_secuencias(str(salmonella_path.absolute()))
-                sys.stdout.write(f"[DEBUG] Cargadas {len(salmonella)} secuencias de Salmonella\n")
-                sys.stdout.flush()
-            except (ValueError, FileNotFoundError) as e:
-                raise ValueError(f"Error al cargar el archivo FASTA de Salmonella: {str(e)}")
-            
-            sys.stdout.write("[DEBUG] Cargando secuencias de Gallus...\n")
-            sys.stdout.flush()
-            try:
-                gallus = cargar_secuencias(str(gallus_path.absolute()))
-                sys.stdout.write(f"[DEBUG] Cargadas {len(gallus)} secuencias de Gallus\n")
-                sys.stdout.flush()
-            except (ValueError, FileNotFoundError) as e:
-                raise ValueError(f"Error al cargar el archivo FASTA de Gallus: {str(e)}")
+                salida = analizar_instrumentado(salmonella_fasta, gallus_fasta, params, self.temp_dir, contexto, modo_perfil)
             
-            # 2. Validar secuencias
-            if not validar_secuencias(salmonella):
-                raise ValueError("Las secuencias de Salmonella contienen caracteres inválidos. Solo se permiten A, T, C, G y N.")
-            if not validar_secuencias(gallus):
-                raise ValueError("Las secuencias de Gallus contienen caracteres inválidos. Solo se permiten A, T, C, G y N.")
+            resumen_instrumentacion = salida['instrumentacion']
+            metricas.observar_etapas(resumen_instrumentacion['etapas'])
+            if salida['error'] is not None:
+                raise salida['error']
             
-            # 3. Filtrar por longitud mínima
-            min_len = params.get('min_len', 0)
-            print(f"[DEBUG] Parámetros recibidos: min_len={min_len}, limpiar_ns={params.get('limpiar_ns')}, top_codons={params.get('top_codons')}")
-            print(f"[DEBUG] Secuencias antes del filtro: Salmonella={len(salmonella)}, Gallus={len(gallus)}")
-            
-            if min_len > 0:
-                salmonella = [(id_seq, seq) for id_seq, seq in salmonella if len(seq) >= min_len]
-                gallus = [(id_seq, seq) for id_seq, seq in gallus if len(seq) >= min_len]
-                print(f"[DEBUG] Secuencias después del filtro (min_len={min_len}): Salmonella={len(salmonella)}, Gallus={len(gallus)}")
-            
-            # 4. Limpiar Ns si está habilitado
-            limpiar_ns = params.get('limpiar_ns', True)
-            if limpiar_ns:
-                print(f"[DEBUG] Limpiando caracteres N de las secuencias")
-                salmonella = self._limpiar_ns(salmonella)
-                gallus = self._limpiar_ns(gallus)
-            
-            # 5. Calcular métricas básicas
-            df_salmonella = calcular_metricas_basicas(salmonella)
-            df_gallus = calcular_metricas_basicas(gallus)
-            
-            # Combinar métricas
-            df_metricas = pd.concat([df_salmonella, df_gallus], ignore_index=True)
-            metricas_path = results_dir / "resumen_metricas.csv"
-            df_metricas.to_csv(str(metricas_path.absolute()), index=False)
-            
-            # 6. Calcular uso de codones
-            df_codones_salmonella = calcular_uso_codones(salmonella, "salmonella")
-            df_codones_gallus = calcular_uso_codones(gallus, "gallus")
-            
-            # Combinar datos de codones
-            df_codones = pd.merge(
-                df_codones_salmonella,
-                df_codones_gallus,
-                on="codon",
-                how="outer"
-            ).fillna(0).sort_values("codon").reset_index(drop=True)
-            
-            codon_path = results_dir / "codon_usage.csv"
-            df_codones.to_csv(str(codon_path.absolute()), index=False)
-            
-            # 7. Generar gráficos básicos de GC (necesitan que results/graficos exista)
-            # Guardar el directorio de trabajo original y cambiar temporalmente
-            original_cwd = os.getcwd()
-            try:
-                # Cambiar al directorio temporal solo para los gráficos
-                os.chdir(self.temp_dir)
-                grafico_gc(df_salmonella, "salmonella")
-                grafico_gc(df_gallus, "gallus")
-                
-                # 8. Generar gráficos avanzados (adaptando uso_codones_top20 para top_codons)
-                top_codons_param = params.get('top_codons', 20)
-                print(f"[DEBUG] Llamando a _generar_graficos_avanzados con top_codons={top_codons_param}")
-                self._generar_graficos_avanzados(df_metricas, df_codones, top_codons_param)
-            finally:
-                # Siempre restaurar el directorio original
-                os.chdir(original_cwd)
-            
-            # Preparar resultados con paths absolutos
-            images = list(graficos_dir.glob("*.png"))
-            images_paths = [str(img.absolute()) for img in images]
+            bases_cargadas = resumen_instrumentacion['etapas'][0]['bases'] or 0
+            metricas.BASES_PROCESADAS.incrementar(bases_cargadas)
+            metricas.DURACION_ANALISIS.observar(resumen_instrumentacion['total_segundos'])
+            if resumen_instrumentacion['total_segundos'] > 0:
+                metricas.BASES_POR_SEGUNDO.observar(bases_cargadas / resumen_instrumentacion['total_segundos'])
             
             return {
+                'jobId': contexto['analisis_id'],
                 'status': 'COMPLETED',
                 'results': {
-                    'resumen_csv_path': str(metricas_path.absolute()),
-                    'codon_csv_path': str(codon_path.absolute()),
-                    'images': images_paths,
+                    **salida['resultados'],
+                    'instrumentacion': resumen_instrumentacion,
+                    'perfiles': salida['perfiles'],
                 }
             }
             
@@ -313,68 +391,6 @@ class AnalysisClient:
             else:
                 raise Exception(f"Error durante el análisis local: {error_msg}")
     
-    def _limpiar_ns(self, secuencias: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
-        """Elimina o reemplaza caracteres N en secuencias."""
-        cleaned = []
-        for id_seq, seq in secuencias:
-            # Reemplazar Ns con la base más común en la secuencia (o simplemente eliminarlas)
-            # Por simplicidad, reemplazamos N con A
-            cleaned_seq = seq.replace('N', 'A')
-            cleaned.append((id_seq, cleaned_seq))
-        return cleaned
-    
-    def _generar_graficos_avanzados(
-        self,
-        df_metricas: pd.DataFrame,
-        df_codones: pd.DataFrame,
-        top_codons: int = 20
-    ):
-        """Genera todos los gráficos avanzados, adaptando top_codons."""
-        import matplotlib.pyplot as plt
-        import numpy as np
-        
-        print(f"[DEBUG] _generar_graficos_avanzados: top_codons recibido = {top_codons}")
-        
-        # Cargar funciones de visualización (asumen que estamos en el directorio correcto)
-        distribucion_longitudes(df_metricas)
-        distribucion_gc(df_metricas)
-        relacion_longitud_gc(df_metricas)
-        correlacion_codones(df_codones)
-        heatmap_codones(df_codones)
-        distribucion_acumulativa_longitudes(df_metricas)
-        
-        # Gráfico de uso de codones con top_codons configurable
-        df_codones_copy = df_codones.copy()
-        df_codones_copy['promedio'] = (
-            df_codones_copy['frecuencia_salmonella'] + 
-            df_codones_copy['frecuencia_gallus']
-        ) / 2
-        top_codones_df = df_codones_copy.nlargest(top_codons, 'promedio')
-        
-        print(f"[DEBUG] Generando gráfico con {len(top_codones_df)} codones (solicitados: {top_codons})")
-        
-        plt.figure(figsize=(12, 8))
-        x = np.arange(len(top_codones_df))
-        width = 0.35
-        
-        plt.bar(x - width/2, top_codones_df['frecuencia_salmonella'], width, 
-                label='Salmonella', alpha=0.8)
-        plt.bar(x + width/2, top_codones_df['frecuencia_gallus'], width, 
-                label='Gallus', alpha=0.8)
-        
-        plt.xlabel('Codones')
-        plt.ylabel('Frecuencia de Uso')
-        plt.title(f'Top {top_codons} Codones Más Frecuentes - Comparación entre Especies')
-        plt.xticks(x, top_codones_df['codon'], rotation=45)
-        plt.legend()
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        # Usar path relativo porque ya estamos en el directorio temporal
-        plt.savefig('results/graficos/uso_codones_top20.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        print(f"[DEBUG] Gráfico de top {top_codons} codones guardado correctamente")
-    
     def get_status(self, job_id: str) -> Dict:
         """
         Obtiene el estado de un trabajo en modo API.
@@ -387,19 +403,57 @@ class AnalysisClient:
         Retorna:
         --------
         dict
-            {'status': str, 'message': str}
+            {'status': str, 'message': str} y, si el backend los publica,
+            'progreso' (0-1), 'etapa' (última etapa terminada) y 'parciales'
+            (URLs de tablas y gráficos ya disponibles, mismo formato que
+            get_results). status es ESTADO_NO_DISPONIBLE si el backend no
+            respondió tras los reintentos: el trabajo puede seguir en curso
         """
         if self.mode == "LOCAL":
             return {'status': 'COMPLETED', 'message': 'Análisis completado'}
         
         url = f"{self.base_url}/status/{job_id}"
         
+        estado = {'status': ESTADO_NO_DISPONIBLE, 'message': "Sin respuesta del backend"}
         try:
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            return {'status': 'FAILED', 'message': f"Error al obtener estado: {e}"}
+            estado = response.json()
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and 400 <= e.response.status_code < 500:
+                # El backend no conoce el trabajo (ej: se reinició): no va a terminar
+                estado = {'status': 'FAILED', 'message': f"Error al obtener estado: {e}"}
+            else:
+                estado = {'status': ESTADO_NO_DISPONIBLE, 'message': f"Error al obtener estado: {e}"}
+        except (requests.exceptions.RequestException, ValueError) as e:
+            estado = {'status': ESTADO_NO_DISPONIBLE, 'message': f"Error al obtener estado: {e}"}
+        finally:
+            # Contabilizar el final del trabajo una sola vez (el estado se consulta en bucle)
+            if estado.get('status') in ('COMPLETED', 'FAILED'):
+                self._registrar_fin_trabajo(job_id, estado['status'] == 'COMPLETED', error="backend")
+        return estado
+    
+    def abandonar_trabajo(self, job_id: str):
+        """
+        Deja de seguir un trabajo del backend (ej: sin respuesta durante demasiado tiempo).
+        
+        Cuenta como fallido en las métricas; el trabajo puede seguir en el backend.
+        """
+        self._registrar_fin_trabajo(job_id, False, error="sin_respuesta")
+    
+    def _registrar_fin_trabajo(self, job_id: str, completado: bool, error: str):
+        """Métricas del final de un trabajo del backend (solo la primera vez)."""
+        if job_id not in self._trabajos_pendientes:
+            return
+        self._trabajos_pendientes.discard(job_id)
+        try:
+            if completado:
+                metricas.ANALISIS_COMPLETADOS.incrementar(modo=self.mode)
+            else:
+                metricas.ANALISIS_FALLIDOS.incrementar(modo=self.mode, error=error)
+        finally:
+            metricas.ANALISIS_ACTIVOS.decrementar(modo=self.mode)
+            metricas.escribir_textfile()
     
     def get_results(self, job_id: Optional[str] = None) -> Dict:
         """
@@ -418,7 +472,7 @@ class AnalysisClient:
         if self.mode == "API":
             url = f"{self.base_url}/results/{job_id}"
             try:
-                response = requests.get(url, timeout=30)
+                response = self.session.get(url, timeout=30)
                 response.raise_for_status()
                 return response.json()
             except requests.exceptions.RequestException as e:
@@ -428,6 +482,84 @@ class AnalysisClient:
             # Esta función se usa después de start_analysis
             pass
     
+    def descargar_artefacto(self, url: str, timeout: float = 10) -> bytes:
+        """
+        Descarga un artefacto del backend (CSV o imagen) por la sesión compartida.
+        
+        Lanza:
+        ------
+        requests.exceptions.RequestException: Si la descarga falla tras los reintentos
+        """
+        sesion = self.session or requests
+        response = sesion.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.content
+    
+    def consultar_metricas(self, url: str, consulta: Dict, timeout: float = 10) -> Dict:
+        """
+        Pide al backend una página de la tabla de métricas (GET /metricas/<jobId>).
+
+        Parámetros:
+        -----------
+        url : str
+            metricas_url de los resultados
+        consulta : dict
+            Argumentos de src.tabla_columnar.TablaColumnar.consultar
+
+        Retorna:
+        --------
+        dict
+            {'filas': DataFrame, 'total', 'pagina', 'paginas', 'num_filas', 'rangos'}
+
+        Lanza:
+        ------
+        requests.exceptions.RequestException: Si la petición falla
+        """
+        import pandas as pd
+
+        rango_gc = consulta.get('rango_gc') or (None, None)
+        rango_longitud = consulta.get('rango_longitud') or (None, None)
+        parametros = {
+            'id': consulta.get('filtro_id'),
+            'gc_min': rango_gc[0],
+            'gc_max': rango_gc[1],
+            'longitud_min': rango_longitud[0],
+            'longitud_max': rango_longitud[1],
+            'orden': consulta.get('orden'),
+            'descendente': '1' if consulta.get('descendente') else None,
+            'pagina': consulta.get('pagina'),
+            'tam_pagina': consulta.get('tam_pagina'),
+        }
+        sesion = self.session or requests
+        response = sesion.get(url, params={k: v for k, v in parametros.items() if v is not None}, timeout=timeout)
+        response.raise_for_status()
+        datos = response.json()
+        datos['filas'] = pd.DataFrame(datos['filas'], columns=datos.pop('columnas'))
+        datos['rangos'] = {columna: tuple(rango) if rango else None for columna, rango in datos['rangos'].items()}
+        return datos
+
+    def descargar_artefactos(self, urls: List[str], timeout: float = 10) -> Dict[str, Union[bytes, Exception]]:
+        """
+        Descarga varios artefactos a la vez (hilos sobre la misma sesión).
+        
+        Retorna:
+        --------
+        dict
+            url -> contenido en bytes, o la excepción si esa descarga falló
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+        resultados: Dict[str, Union[bytes, Exception]] = {}
+        with ThreadPoolExecutor(max_workers=min(DESCARGAS_SIMULTANEAS, len(urls))) as hilos:
+            futuros = {hilos.submit(self.descargar_artefacto, url, timeout): url for url in urls}
+            for futuro, url in futuros.items():
+                try:
+                    resultados[url] = futuro.result()
+                except Exception as e:
+                    resultados[url] = e
+        return resultados
+    
     def cleanup(self):
         """Limpia archivos temporales."""
         if self.temp_dir and os.path.exists(self.temp_dir):
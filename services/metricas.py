@@ -0,0 +1,300 @@
+"""
+Métricas de operación en formato de texto de Prometheus.
+
+Contadores, indicadores (gauges) e histogramas en memoria del proceso, sin
+dependencias externas. Se exponen de dos formas, configurables por entorno:
+
+- SALMO_METRICAS_PUERTO: servidor HTTP local (hilo daemon) que sirve /metrics
+- SALMO_METRICAS_TEXTFILE: archivo .prom reescrito tras cada análisis, para
+  el textfile collector de node_exporter
+"""
+import contextlib
+import io
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Optional, Tuple
+
+VARIABLE_ENTORNO_PUERTO = "SALMO_METRICAS_PUERTO"
+VARIABLE_ENTORNO_DIRECCION = "SALMO_METRICAS_DIRECCION"
+VARIABLE_ENTORNO_TEXTFILE = "SALMO_METRICAS_TEXTFILE"
+
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+# Límites superiores (le) de los histogramas
+BUCKETS_SEGUNDOS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BUCKETS_BASES_POR_SEGUNDO = (1e5, 5e5, 1e6, 5e6, 1e7, 5e7, 1e8, 5e8, 1e9)
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear_etiquetas(nombres: Tuple[str, ...], valores: Tuple[str, ...], extra: str = "") -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _formatear_numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class _Metrica:
+    """Base común: nombre, ayuda, etiquetas y un lock por métrica."""
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Iterable[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _clave(self, etiquetas: Dict[str, str]) -> Tuple[str, ...]:
+        if set(etiquetas) != set(self.etiquetas):
+            raise ValueError(
+                f"La métrica {self.nombre} espera las etiquetas {self.etiquetas}, recibió {tuple(etiquetas)}"
+            )
+        return tuple(str(etiquetas[n]) for n in self.etiquetas)
+
+    def exponer(self) -> str:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        with self._lock:
+            elementos = list(self._valores.items())
+        for clave, valor in sorted(elementos):
+            lineas.extend(self._lineas(clave, valor))
+        return "\n".join(lineas)
+
+    def _lineas(self, clave, valor):
+        yield f"{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {_formatear_numero(valor)}"
+
+
+class Contador(_Metrica):
+    """Valor que solo crece (ej: análisis completados)."""
+    tipo = "counter"
+
+    def incrementar(self, cantidad: float = 1, **etiquetas):
+        if cantidad < 0:
+            raise ValueError(f"Un contador no puede decrecer ({self.nombre})")
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def valor(self, **etiquetas) -> float:
+        with self._lock:
+            return self._valores.get(self._clave(etiquetas), 0)
+
+
+class Indicador(_Metrica):
+    """Valor que sube y baja (ej: análisis en curso)."""
+    tipo = "gauge"
+
+    def incrementar(self, cantidad: float = 1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def decrementar(self, cantidad: float = 1, **etiquetas):
+        self.incrementar(-cantidad, **etiquetas)
+
+    def fijar(self, valor: float, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = valor
+
+    def valor(self, **etiquetas) -> float:
+        with self._lock:
+            return self._valores.get(self._clave(etiquetas), 0)
+
+
+class Histograma(_Metrica):
+    """Distribución de observaciones en buckets acumulativos."""
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Iterable[str] = (),
+                 buckets: Iterable[float] = BUCKETS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observar(self, valor: float, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            conteos, suma = self._valores.get(clave, ([0] * len(self.buckets), 0.0))
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    conteos[i] += 1
+            self._valores[clave] = (conteos, suma + valor)
+
+    def _lineas(self, clave, valor):
+        conteos, suma = valor
+        for limite, conteo in zip(self.buckets, conteos):
+            le = 'le="' + _formatear_numero(limite) + '"'
+            yield f"{self.nombre}_bucket{_formatear_etiquetas(self.etiquetas, clave, le)} {conteo}"
+        etiquetas = _formatear_etiquetas(self.etiquetas, clave)
+        yield f"{self.nombre}_sum{etiquetas} {_formatear_numero(suma)}"
+        yield f"{self.nombre}_count{etiquetas} {conteos[-1]}"
+
+
+class RegistroMetricas:
+    """Conjunto de métricas del proceso, expuesto como un único documento de texto."""
+
+    def __init__(self):
+        self._metricas: Dict[str, _Metrica] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, metrica: _Metrica) -> _Metrica:
+        with self._lock:
+            if metrica.nombre in self._metricas:
+                raise ValueError(f"Métrica duplicada: {metrica.nombre}")
+            self._metricas[metrica.nombre] = metrica
+        return metrica
+
+    def exponer(self) -> str:
+        with self._lock:
+            metricas = list(self._metricas.values())
+        return "\n".join(m.exponer() for m in metricas) + "\n"
+
+
+# Registro global del proceso (la app de Streamlit comparte un único proceso entre sesiones)
+REGISTRO = RegistroMetricas()
+
+ANALISIS_INICIADOS = REGISTRO.registrar(Contador(
+    "salmo_analisis_iniciados_total", "Análisis iniciados", ["modo"]))
+ANALISIS_COMPLETADOS = REGISTRO.registrar(Contador(
+    "salmo_analisis_completados_total", "Análisis completados correctamente", ["modo"]))
+ANALISIS_FALLIDOS = REGISTRO.registrar(Contador(
+    "salmo_analisis_fallidos_total", "Análisis terminados con error", ["modo", "error"]))
+ANALISIS_ACTIVOS = REGISTRO.registrar(Indicador(
+    "salmo_analisis_activos", "Análisis en curso (locales o enviados al backend sin terminar)", ["modo"]))
+DURACION_ANALISIS = REGISTRO.registrar(Histograma(
+    "salmo_analisis_duracion_segundos", "Duración total de los análisis locales", []))
+BYTES_PROCESADOS = REGISTRO.registrar(Contador(
+    "salmo_bytes_procesados_total", "Bytes de FASTA recibidos (comprimidos o no)", ["modo"]))
+BASES_PROCESADAS = REGISTRO.registrar(Contador(
+    "salmo_bases_procesadas_total", "Bases cargadas en análisis locales", []))
+BASES_POR_SEGUNDO = REGISTRO.registrar(Histograma(
+    "salmo_bases_por_segundo", "Rendimiento de los análisis locales (bases cargadas / duración total)",
+    [], buckets=BUCKETS_BASES_POR_SEGUNDO))
+DURACION_ETAPA = REGISTRO.registrar(Histograma(
+    "salmo_etapa_duracion_segundos", "Duración de cada etapa del análisis local", ["etapa"]))
+CONSULTAS_CACHE = REGISTRO.registrar(Contador(
+    "salmo_cache_consultas_total", "Consultas a cachés de la app", ["cache"]))
+FALLOS_CACHE = REGISTRO.registrar(Contador(
+    "salmo_cache_fallos_total", "Consultas a cachés que tuvieron que recalcularse "
+    "(tasa de acierto = 1 - fallos / consultas)", ["cache"]))
+
+
+def registrar_consulta_cache(cache: str):
+    """Cuenta una consulta a una caché (llamar en el punto de uso)."""
+    CONSULTAS_CACHE.incrementar(cache=cache)
+
+
+def registrar_fallo_cache(cache: str):
+    """Cuenta un fallo de caché (llamar dentro de la función cacheada: solo corre si no hubo acierto)."""
+    FALLOS_CACHE.incrementar(cache=cache)
+
+
+def observar_etapas(etapas: Iterable[Dict]):
+    """Vuelca en el histograma de etapas las mediciones de un MedidorEtapas."""
+    for medicion in etapas:
+        DURACION_ETAPA.observar(medicion['segundos'], etapa=medicion['etapa'])
+
+
+def tamano_fuente(fuente) -> Optional[int]:
+    """Tamaño en bytes de un contenido FASTA (bytes, memoryview o archivo), o None si no se conoce."""
+    if isinstance(fuente, (bytes, bytearray)):
+        return len(fuente)
+    if isinstance(fuente, memoryview):
+        return fuente.nbytes
+    tamano = getattr(fuente, 'size', None)  # UploadedFile de Streamlit
+    if isinstance(tamano, int):
+        return tamano
+    try:
+        return os.fstat(fuente.fileno()).st_size
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        return None
+
+
+# --- Exportadores ---
+
+_servidor: Optional[ThreadingHTTPServer] = None
+_lock_exportadores = threading.Lock()
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        cuerpo = REGISTRO.exponer().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", TIPO_CONTENIDO)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        # Sin log por petición: el balanceador consulta cada pocos segundos
+        pass
+
+
+def iniciar_servidor_metricas(puerto: int, direccion: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    Sirve /metrics en un hilo daemon. Solo se inicia una vez por proceso
+    (Streamlit re-ejecuta el script en cada interacción).
+
+    Lanza:
+    ------
+    ValueError: Si el puerto no está disponible
+    """
+    global _servidor
+    with _lock_exportadores:
+        if _servidor is None:
+            try:
+                _servidor = ThreadingHTTPServer((direccion, puerto), _ManejadorMetricas)
+            except OSError as e:
+                raise ValueError(f"No se pudo abrir el puerto de métricas {direccion}:{puerto}: {e}")
+            _servidor.daemon_threads = True
+            hilo = threading.Thread(target=_servidor.serve_forever, name="servidor-metricas", daemon=True)
+            hilo.start()
+            print(f" Métricas disponibles en http://{direccion}:{_servidor.server_address[1]}/metrics")
+        return _servidor
+
+
+def escribir_textfile(ruta: Optional[str] = None):
+    """
+    Escribe las métricas en un archivo .prom (textfile collector de node_exporter).
+
+    La escritura es atómica (archivo temporal + os.replace) para que el
+    colector nunca lea un archivo a medias. Un error de escritura solo se
+    informa: se llama desde bloques finally y no debe cambiar el resultado
+    del análisis.
+    """
+    ruta = ruta or os.environ.get(VARIABLE_ENTORNO_TEXTFILE)
+    if not ruta:
+        return
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write(REGISTRO.exponer())
+        os.replace(temporal, ruta)
+    except OSError as e:
+        print(f" No se pudieron escribir las métricas en {ruta}: {e}")
+        with contextlib.suppress(OSError):
+            os.remove(temporal)
+
+
+def configurar_exportadores_desde_entorno():
+    """Arranca el servidor de métricas si SALMO_METRICAS_PUERTO está definido (idempotente)."""
+    puerto = os.environ.get(VARIABLE_ENTORNO_PUERTO)
+    if not puerto:
+        return
+    try:
+        numero = int(puerto)
+    except ValueError:
+        raise ValueError(f"{VARIABLE_ENTORNO_PUERTO} debe ser un número de puerto, no '{puerto}'")
+    iniciar_servidor_metricas(numero, os.environ.get(VARIABLE_ENTORNO_DIRECCION, "0.0.0.0"))
@@ -0,0 +1,199 @@
+"""
+Pool de procesos precalentados para los análisis locales.
+
+Con SALMO_POOL_TRABAJADORES=N, la app crea N procesos al arrancar que
+importan src y dejan listos matplotlib (backend Agg, caché de fuentes y
+primera figura), seaborn y scipy. AnalysisClient les envía cada análisis, de
+modo que el primer análisis tras un despliegue no paga esa inicialización.
+
+Los archivos subidos se pasan a los procesos por memoria compartida (una
+copia) en lugar de serializarlos por la tubería del pool.
+"""
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.paralelo import copiar_a_memoria_compartida
+
+VARIABLE_ENTORNO_TRABAJADORES = "SALMO_POOL_TRABAJADORES"
+
+
+def analizar_instrumentado(
+    salmonella_fasta,
+    gallus_fasta,
+    params: Dict,
+    directorio_trabajo: str,
+    contexto: Dict,
+    modo_perfil: Optional[str] = None
+) -> Dict:
+    """
+    Ejecuta el pipeline con instrumentación y perfilado opcional.
+
+    Se usa igual en el proceso de la app y en los trabajadores del pool, por
+    eso nunca lanza: el error (si lo hay) se devuelve junto a las etapas
+    medidas hasta el fallo.
+
+    Retorna:
+    --------
+    dict
+        {'resultados': dict o None, 'instrumentacion': dict, 'perfiles': list,
+        'error': Exception o None}
+    """
+    from src.instrumentacion import MedidorEtapas
+    from src.perfilado import Perfilador
+    from src.pipeline import ejecutar_pipeline
+
+    medidor = MedidorEtapas(contexto=contexto)
+    perfilador = Perfilador(modo_perfil, Path(directorio_trabajo) / "results" / "perfiles")
+    perfilador.iniciar()
+    resultados, error = None, None
+    try:
+        # Al perfilar, las dos especies en este proceso: el perfil no ve a los procesos hijos
+        resultados = ejecutar_pipeline(salmonella_fasta, gallus_fasta, params, directorio_trabajo, medidor,
+                                       ramas_paralelas=False if perfilador.modo else None)
+    except Exception as e:
+        error = e
+    finally:
+        # Un análisis fallido también deja su perfil (es cuando más interesa)
+        perfiles = perfilador.detener()
+
+    return {
+        'resultados': resultados,
+        'instrumentacion': medidor.resumen(),
+        'perfiles': perfiles,
+        'error': error,
+    }
+
+
+def _precalentar_trabajador():
+    """Inicializador de cada proceso: importa y ejercita las librerías de gráficos una vez."""
+    import io
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    import scipy.stats  # noqa: F401
+
+    import src.pipeline  # noqa: F401
+    import src.visualizacion  # noqa: F401
+
+    # Primera figura: carga la caché de fuentes y el renderizador Agg
+    plt.figure(figsize=(2, 2))
+    sns.histplot([0.0, 1.0, 1.0, 2.0], kde=True)
+    plt.title("precalentamiento")
+    plt.savefig(io.BytesIO(), format='png')
+    plt.close('all')
+
+
+def _listo():
+    """Tarea vacía usada para forzar el arranque de los procesos."""
+    return os.getpid()
+
+
+def _analizar_en_trabajador(nombres_memoria, tamanos, params, directorio_trabajo, contexto, modo_perfil):
+    """Proceso del pool: abre la memoria compartida y ejecuta analizar_instrumentado."""
+    bloques = [shared_memory.SharedMemory(name=n) if n else None for n in nombres_memoria]
+    vistas = [b.buf[:t] if b is not None else b'' for b, t in zip(bloques, tamanos)]
+    try:
+        return analizar_instrumentado(vistas[0], vistas[1], params, directorio_trabajo, contexto, modo_perfil)
+    finally:
+        for vista in vistas:
+            if isinstance(vista, memoryview):
+                vista.release()
+        for bloque in bloques:
+            if bloque is not None:
+                bloque.close()
+
+
+class PoolAnalisis:
+    """
+    Pool de procesos precalentados al que AnalysisClient envía los análisis.
+
+    Si un proceso muere (ej: el sistema lo mata por memoria), el pool se
+    recrea en el siguiente análisis.
+    """
+
+    def __init__(self, trabajadores: int):
+        if trabajadores < 1:
+            raise ValueError(f"El pool necesita al menos un trabajador (recibido: {trabajadores})")
+        self.trabajadores = trabajadores
+        self._lock = threading.Lock()
+        self._executor = None
+        self._crear_executor()
+
+    def _crear_executor(self):
+        # 'spawn': el servidor de Streamlit tiene hilos y fork no es seguro con ellos
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.trabajadores,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_precalentar_trabajador,
+        )
+        # Arrancar (y precalentar) todos los procesos ya, sin esperar al primer análisis
+        for _ in range(self.trabajadores):
+            self._executor.submit(_listo)
+        print(f" Pool de análisis: {self.trabajadores} proceso(s) precalentándose")
+
+    def ejecutar(self, salmonella_fasta, gallus_fasta, params, directorio_trabajo, contexto, modo_perfil=None) -> Dict:
+        """
+        Ejecuta analizar_instrumentado en un proceso del pool.
+
+        Lanza:
+        ------
+        MemoryError: Si el proceso del análisis terminó inesperadamente
+        """
+        bloques, tamanos = [], []
+        try:
+            for fuente in (salmonella_fasta, gallus_fasta):
+                bloque, tamano = copiar_a_memoria_compartida(fuente)
+                bloques.append(bloque)
+                tamanos.append(tamano)
+            with self._lock:
+                executor = self._executor
+            futuro = executor.submit(
+                _analizar_en_trabajador,
+                [b.name if b is not None else None for b in bloques],
+                tamanos,
+                params, str(directorio_trabajo), contexto, modo_perfil,
+            )
+            try:
+                return futuro.result()
+            except BrokenProcessPool:
+                with self._lock:
+                    if self._executor is executor:
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        self._crear_executor()
+                raise MemoryError(
+                    "El proceso del análisis terminó inesperadamente (posible falta de memoria)."
+                )
+        finally:
+            for bloque in bloques:
+                if bloque is not None:
+                    bloque.close()
+                    bloque.unlink()
+
+    def cerrar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def crear_pool_desde_entorno() -> Optional[PoolAnalisis]:
+    """
+    Crea el pool si SALMO_POOL_TRABAJADORES está definido (>0).
+
+    Lanza:
+    ------
+    ValueError: Si la variable no es un número entero
+    """
+    valor = os.environ.get(VARIABLE_ENTORNO_TRABAJADORES, "").strip()
+    if not valor:
+        return None
+    try:
+        trabajadores = int(valor)
+    except ValueError:
+        raise ValueError(f"{VARIABLE_ENTORNO_TRABAJADORES} debe ser un número entero, no '{valor}'")
+    return PoolAnalisis(trabajadores) if trabajadores > 0 else None
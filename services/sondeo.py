@@ -0,0 +1,70 @@
+"""
+Intervalo de consulta del estado de un trabajo en modo API.
+
+El intervalo empieza corto (las tablas suelen estar listas en pocos
+segundos), crece de forma geométrica mientras el estado no cambia y vuelve
+al mínimo en cuanto el backend informa de progreso. Cada espera lleva un
+desfase aleatorio para que muchas sesiones abiertas a la vez no consulten
+el backend sincronizadas.
+"""
+import random
+from typing import Optional
+
+
+class PlanificadorSondeo:
+    """
+    Calcula la espera antes de la siguiente consulta de estado.
+
+    Uso:
+        planificador = PlanificadorSondeo()
+        estado = cliente.get_status(job_id)
+        time.sleep(planificador.siguiente_espera(estado))
+    """
+
+    def __init__(
+        self,
+        intervalo_min: float = 0.5,
+        intervalo_max: float = 5.0,
+        factor: float = 1.6,
+        jitter: float = 0.25,
+        semilla: Optional[int] = None
+    ):
+        """
+        Parámetros:
+        -----------
+        intervalo_min, intervalo_max : float
+            Límites de la espera en segundos
+        factor : float
+            Multiplicador de la espera mientras el estado no cambia
+        jitter : float
+            Desfase aleatorio relativo (0.25 = ±25%)
+        semilla : int, optional
+            Semilla del generador aleatorio (reproducibilidad)
+        """
+        if not 0 < intervalo_min <= intervalo_max:
+            raise ValueError(
+                f"Intervalos de sondeo no válidos: mínimo={intervalo_min}, máximo={intervalo_max}"
+            )
+        self.intervalo_min = intervalo_min
+        self.intervalo_max = intervalo_max
+        self.factor = factor
+        self.jitter = jitter
+        self.intervalo = intervalo_min
+        self._ultimo = None
+        self._aleatorio = random.Random(semilla)
+
+    def siguiente_espera(self, estado: dict) -> float:
+        """
+        Segundos a esperar antes de volver a consultar, dado el último estado.
+
+        Se considera progreso un cambio de status o de última etapa terminada
+        (cada resultado parcial corresponde a una etapa).
+        """
+        huella = (estado.get('status'), estado.get('etapa'))
+        if huella != self._ultimo:
+            self.intervalo = self.intervalo_min
+        else:
+            self.intervalo = min(self.intervalo * self.factor, self.intervalo_max)
+        self._ultimo = huella
+        desfase = self._aleatorio.uniform(-self.jitter, self.jitter)
+        return max(0.0, self.intervalo * (1 + desfase))
@@ -0,0 +1,173 @@
+"""
+Tablas de resultados de un análisis, leídas una sola vez por trabajo.
+
+La app guarda un TablasResultados por trabajo en una caché (ver
+app.obtener_tablas_resultados): cada rerun de Streamlit (un checkbox, un
+slider) reutiliza los DataFrames ya interpretados, los bytes de las
+descargas y los agregados de los gráficos interactivos en lugar de volver a
+leer y serializar los CSV.
+
+Cada tabla se lee la primera vez que se necesita. La tabla de métricas se
+consulta además por páginas (filtro, orden y paginación en el servidor, ver
+src/tabla_columnar.py): mostrarla no obliga a cargarla entera.
+"""
+import io
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple, Union
+
+import pandas as pd
+
+from src.tabla_columnar import COLUMNA_GC, COLUMNA_LONGITUD, TablaColumnar
+
+# Tablas de un análisis: nombre -> archivo en el directorio de resultados
+ARCHIVOS_TABLAS = {
+    'metricas': 'resumen_metricas.csv',
+    'codones': 'codon_usage.csv',
+}
+
+# Tabla de métricas en Parquet (la escribe el pipeline junto al CSV)
+ARCHIVO_METRICAS_COLUMNAR = 'resumen_metricas.parquet'
+
+# Valores derivados (rangos, agregados por zoom, páginas) que se guardan por
+# trabajo; al superarlo se descartan los más antiguos
+MAX_MEMORIZADOS = 256
+
+# Contenido CSV de una tabla: bytes, ruta en disco o función que lo obtiene
+FuenteTabla = Union[bytes, str, Path, Callable[[], bytes]]
+
+
+def consultor_local(ruta: str) -> Callable[[Dict], Dict]:
+    """
+    Consultas por páginas sobre un Parquet local (ver TablaColumnar.consultar).
+
+    El resultado incluye además num_filas y los rangos de longitud y GC, igual
+    que la respuesta de GET /metricas/<jobId> del backend.
+    """
+    tabla = TablaColumnar(ruta)
+
+    def consultar(consulta: Dict) -> Dict:
+        return {
+            **tabla.consultar(**consulta),
+            'num_filas': tabla.num_filas,
+            'rangos': {columna: tabla.rango(columna) for columna in (COLUMNA_LONGITUD, COLUMNA_GC)},
+        }
+    return consultar
+
+
+class TablasResultados:
+    """
+    Tablas CSV de un análisis con sus DataFrames y valores derivados memorizados.
+
+    Parámetros:
+    -----------
+    fuentes : dict
+        Nombre de la tabla -> contenido CSV (bytes, ruta o función sin
+        argumentos que lo devuelve). Se lee la primera vez que se pide y se
+        sirve tal cual en las descargas: no se vuelve a serializar con to_csv.
+    consultar_metricas : callable, optional
+        Función consulta -> página de la tabla de métricas (ver
+        consultor_local y AnalysisClient.consultar_metricas). Sin ella, la
+        tabla de métricas solo se puede cargar entera.
+    """
+
+    def __init__(self, fuentes: Dict[str, FuenteTabla], consultar_metricas: Optional[Callable[[Dict], Dict]] = None):
+        self._fuentes = dict(fuentes)
+        self._contenidos: Dict[str, bytes] = {}
+        self._tablas: Dict[str, pd.DataFrame] = {}
+        self._memo: Dict[Tuple, object] = {}
+        self._consultar_metricas = consultar_metricas
+        # Varias sesiones pueden compartir el mismo objeto (caché de recursos)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_directorio(cls, directorio: str) -> "TablasResultados":
+        """
+        Tablas de ARCHIVOS_TABLAS de un directorio de resultados (se leen al usarlas).
+
+        Si el directorio tiene ARCHIVO_METRICAS_COLUMNAR, la tabla de métricas
+        se consulta por páginas sobre él.
+        """
+        directorio = Path(directorio)
+        columnar = directorio / ARCHIVO_METRICAS_COLUMNAR
+        return cls(
+            {nombre: directorio / archivo for nombre, archivo in ARCHIVOS_TABLAS.items()},
+            consultor_local(str(columnar)) if columnar.is_file() else None,
+        )
+
+    def csv(self, nombre: str) -> bytes:
+        """Contenido CSV de la tabla, listo para st.download_button."""
+        with self._lock:
+            if nombre in self._contenidos:
+                return self._contenidos[nombre]
+        fuente = self._fuentes[nombre]
+        if isinstance(fuente, (str, Path)):
+            contenido = Path(fuente).read_bytes()
+        elif callable(fuente):
+            contenido = fuente()
+        else:
+            contenido = fuente
+        with self._lock:
+            return self._contenidos.setdefault(nombre, contenido)
+
+    def tabla(self, nombre: str) -> pd.DataFrame:
+        """DataFrame de la tabla (se interpreta la primera vez y se reutiliza; no modificarlo)."""
+        with self._lock:
+            if nombre in self._tablas:
+                return self._tablas[nombre]
+        df = pd.read_csv(io.BytesIO(self.csv(nombre)))
+        with self._lock:
+            return self._tablas.setdefault(nombre, df)
+
+    def memorizar(self, clave: Tuple, calcular: Callable[[], object]) -> object:
+        """
+        Devuelve el valor guardado para clave o lo calcula una vez.
+
+        Los valores se comparten entre reruns y sesiones: no deben modificarse.
+        """
+        with self._lock:
+            if clave in self._memo:
+                return self._memo[clave]
+        valor = calcular()
+        with self._lock:
+            valor = self._memo.setdefault(clave, valor)
+            while len(self._memo) > MAX_MEMORIZADOS:
+                del self._memo[next(iter(self._memo))]
+            return valor
+
+    def rango(self, nombre: str, columna: str) -> Optional[Tuple[float, float]]:
+        """(mínimo, máximo) de una columna, o None si la tabla está vacía."""
+        def calcular():
+            serie = self.tabla(nombre)[columna]
+            if serie.empty:
+                return None
+            return float(serie.min()), float(serie.max())
+        return self.memorizar(('rango', nombre, columna), calcular)
+
+    @property
+    def consulta_metricas_disponible(self) -> bool:
+        return self._consultar_metricas is not None
+
+    def pagina_metricas(self, consulta: Dict) -> Dict:
+        """
+        Página de la tabla de métricas (memorizada por consulta).
+
+        Parámetros:
+        -----------
+        consulta : dict
+            Argumentos de TablaColumnar.consultar (filtro_id, rango_gc,
+            rango_longitud, orden, descendente, pagina, tam_pagina)
+
+        Retorna:
+        --------
+        dict
+            {'filas': DataFrame, 'total', 'pagina', 'paginas', 'num_filas', 'rangos'}
+
+        Lanza:
+        ------
+        ValueError: Si no hay consulta por páginas (consulta_metricas_disponible)
+        """
+        if self._consultar_metricas is None:
+            raise ValueError("La tabla de métricas de este análisis no admite consultas por páginas")
+        clave = ('pagina_metricas',) + tuple(sorted(consulta.items()))
+        return self.memorizar(clave, lambda: self._consultar_metricas(consulta))
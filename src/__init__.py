@@ -1,60 +1,82 @@
-# Importaciones desde el módulo de procesamiento
-from .procesamiento import (
-    cargar_secuencias, 
-    calcular_metricas_basicas, 
-    validar_secuencias
-)
-
-# Importaciones desde el módulo de análisis
-from .analisis import (
-    calcular_uso_codones, 
-    analizar_bias_codones, 
-    comparar_uso_codones_especies, 
-    generar_tabla_codones_aminoacidos
-)
-
-# Importaciones desde el módulo de visualización
-from .visualizacion import (
-    grafico_gc,
-    distribucion_longitudes,
-    distribucion_gc,
-    relacion_longitud_gc,
-    uso_codones_top20,
-    correlacion_codones,
-    heatmap_codones,
-    distribucion_acumulativa_longitudes,
-    generar_todos_los_graficos
-)
+# Paquete de análisis de secuencias.
+#
+# Las funciones se importan bajo demanda (PEP 562): `from src import X` solo
+# carga el módulo que define X. Así el núcleo numérico (carga, métricas,
+# codones) no arrastra matplotlib, seaborn ni scipy, que solo se cargan al
+# dibujar un gráfico.
+import importlib
 
 # Metadatos del paquete
 __version__ = "1.0.0"
 __author__ = "Analista de Secuencias"
 
-# Lista de funciones disponibles para importación con wildcard
-__all__ = [
+# Nombre público -> módulo que lo define
+_EXPORTACIONES = {
     # Funciones de procesamiento
-    'cargar_secuencias',
-    'calcular_metricas_basicas',
-    'validar_secuencias',
-    
+    'cargar_secuencias': 'procesamiento',
+    'cargar_secuencias_desde_buffer': 'procesamiento',
+    'calcular_metricas_basicas': 'procesamiento',
+    'calcular_metricas_codificadas': 'procesamiento',
+    'validar_secuencias': 'procesamiento',
+    'iterar_registros_mmap': 'lector_mmap',
+    'construir_indice_fai': 'indice_fasta',
+    'cargar_secuencias_seleccionadas': 'indice_fasta',
+    'validar_fasta': 'validacion',
+    'describir_invalidos': 'validacion',
+
+    # Secuencias codificadas y políticas de Ns
+    'SecuenciasCodificadas': 'codificacion',
+    'POLITICAS_NS': 'codificacion',
+    'resumir_fasta_por_bloques': 'bloques',
+    'ResumenRegistros': 'bloques',
+
     # Funciones de análisis
-    'calcular_uso_codones',
-    'analizar_bias_codones',
-    'comparar_uso_codones_especies',
-    'generar_tabla_codones_aminoacidos',
-    
-    # Funciones de visualización
-    'grafico_gc',
-    'distribucion_longitudes',
-    'distribucion_gc',
-    'relacion_longitud_gc',
-    'uso_codones_top20',
-    'correlacion_codones',
-    'heatmap_codones',
-    'distribucion_acumulativa_longitudes',
-    'generar_todos_los_graficos'
-]
-
-# Mensaje informativo al importar el paquete
-print("Paquete src version {} cargado correctamente".format(__version__))
-print("Modulos disponibles: procesamiento, analisis, visualizacion")
\ No newline at end of file
+    'calcular_uso_codones': 'analisis',
+    'calcular_uso_codones_codificadas': 'analisis',
+    'analizar_bias_codones': 'analisis',
+    'comparar_uso_codones_especies': 'analisis',
+    'generar_tabla_codones_aminoacidos': 'analisis',
+    'comparar_uso_codones_remuestreo': 'remuestreo',
+    'frecuencias_bootstrap': 'remuestreo',
+    'diferencias_permutacion': 'remuestreo',
+
+    # Funciones de visualización (cargan matplotlib/seaborn/scipy)
+    'grafico_gc': 'visualizacion',
+    'distribucion_longitudes': 'visualizacion',
+    'distribucion_gc': 'visualizacion',
+    'relacion_longitud_gc': 'visualizacion',
+    'uso_codones_top20': 'visualizacion',
+    'correlacion_codones': 'visualizacion',
+    'heatmap_codones': 'visualizacion',
+    'distribucion_acumulativa_longitudes': 'visualizacion',
+    'generar_todos_los_graficos': 'visualizacion',
+
+    # Funciones de agregación
+    'agregar_histograma': 'agregacion',
+    'agregar_densidad_2d': 'agregacion',
+
+    # Pipeline completo
+    'ejecutar_pipeline': 'pipeline',
+    'TablaColumnar': 'tabla_columnar',
+
+    # Instrumentación
+    'MedidorEtapas': 'instrumentacion',
+    'perfilar': 'perfilado',
+}
+
+# Lista de funciones disponibles para importación con wildcard
+__all__ = list(_EXPORTACIONES)
+
+
+def __getattr__(nombre):
+    modulo = _EXPORTACIONES.get(nombre)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    valor = getattr(importlib.import_module(f".{modulo}", __name__), nombre)
+    # Guardar en el paquete: las siguientes consultas no pasan por __getattr__
+    globals()[nombre] = valor
+    return valor
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+# Límite de celdas que se envían al navegador por gráfico interactivo.
+# Con 80 x 50 celdas el payload queda acotado sin importar cuántos genes haya.
+MAX_BINS_HISTOGRAMA = 200
+MAX_BINS_DENSIDAD = (80, 50)
+
+
+def _valores_en_rango(valores, rango):
+    """Convierte a array float y descarta NaN/inf y valores fuera del rango."""
+    arr = np.asarray(valores, dtype=float)
+    mascara = np.isfinite(arr)
+    if rango is not None:
+        mascara &= (arr >= rango[0]) & (arr <= rango[1])
+    return arr, mascara
+
+
+def _rango_efectivo(arr, rango):
+    """Devuelve el rango a agregar, usando min/max de los datos si no se indica."""
+    if rango is not None:
+        inicio, fin = float(rango[0]), float(rango[1])
+    elif arr.size:
+        inicio, fin = float(arr.min()), float(arr.max())
+    else:
+        inicio, fin = 0.0, 1.0
+    if fin <= inicio:
+        # Rango degenerado (todos los valores iguales): ensanchar medio punto
+        inicio, fin = inicio - 0.5, fin + 0.5
+    return inicio, fin
+
+
+def agregar_histograma(valores, bins=50, rango=None):
+    """
+    Agrega una serie de valores en un histograma de tamaño fijo.
+
+    Parámetros:
+    -----------
+    valores : array-like
+        Valores a agregar (ej: columna 'longitud' o 'porcentaje_GC')
+    bins : int
+        Número de intervalos (se limita a MAX_BINS_HISTOGRAMA)
+    rango : tuple, optional
+        (mínimo, máximo) visible. Si se indica, solo se agregan los valores
+        dentro del rango, lo que permite hacer zoom re-agregando.
+
+    Retorna:
+    --------
+    pandas.DataFrame
+        DataFrame con las columnas:
+        - inicio: límite inferior del intervalo
+        - fin: límite superior del intervalo
+        - conteo: número de valores en el intervalo
+    """
+    bins = int(max(1, min(bins, MAX_BINS_HISTOGRAMA)))
+    arr, mascara = _valores_en_rango(valores, rango)
+    arr = arr[mascara]
+
+    inicio, fin = _rango_efectivo(arr, rango)
+    conteos, bordes = np.histogram(arr, bins=bins, range=(inicio, fin))
+
+    return pd.DataFrame({
+        'inicio': bordes[:-1],
+        'fin': bordes[1:],
+        'conteo': conteos,
+    })
+
+
+def agregar_densidad_2d(x, y, bins=MAX_BINS_DENSIDAD, rango_x=None, rango_y=None):
+    """
+    Agrega pares (x, y) en una rejilla de densidad (teselas) de tamaño fijo.
+
+    Sustituye al scatter punto a punto: el navegador recibe como máximo
+    bins_x * bins_y celdas en lugar de un punto por gen.
+
+    Parámetros:
+    -----------
+    x, y : array-like
+        Coordenadas de cada gen (ej: 'longitud' y 'porcentaje_GC')
+    bins : tuple
+        (bins_x, bins_y), se limita a MAX_BINS_DENSIDAD
+    rango_x, rango_y : tuple, optional
+        Rango visible en cada eje; los puntos fuera se descartan antes de agregar
+
+    Retorna:
+    --------
+    pandas.DataFrame
+        DataFrame con una fila por celda no vacía y las columnas
+        x_inicio, x_fin, y_inicio, y_fin y conteo
+    """
+    bins_x = int(max(1, min(bins[0], MAX_BINS_DENSIDAD[0])))
+    bins_y = int(max(1, min(bins[1], MAX_BINS_DENSIDAD[1])))
+
+    arr_x, mascara_x = _valores_en_rango(x, rango_x)
+    arr_y, mascara_y = _valores_en_rango(y, rango_y)
+    mascara = mascara_x & mascara_y
+    arr_x = arr_x[mascara]
+    arr_y = arr_y[mascara]
+
+    rx = _rango_efectivo(arr_x, rango_x)
+    ry = _rango_efectivo(arr_y, rango_y)
+    conteos, bordes_x, bordes_y = np.histogram2d(
+        arr_x, arr_y, bins=(bins_x, bins_y), range=(rx, ry)
+    )
+
+    # Enviar solo las celdas con datos
+    ix, iy = np.nonzero(conteos)
+    return pd.DataFrame({
+        'x_inicio': bordes_x[ix],
+        'x_fin': bordes_x[ix + 1],
+        'y_inicio': bordes_y[iy],
+        'y_fin': bordes_y[iy + 1],
+        'conteo': conteos[ix, iy].astype(np.int64),
+    })
@@ -2,6 +2,14 @@ import pandas as pd
 import numpy as np
 from collections import Counter
 
+from .codificacion import (
+    CODIGO_INVALIDO,
+    CODONES,
+    NUM_CODONES,
+    codificar,
+    contar_codones_codificados,
+)
+
 def calcular_uso_codones(secuencias, etiqueta):
     """
     Calcula la frecuencia de uso de codones para una lista de secuencias.
@@ -9,7 +17,8 @@ def calcular_uso_codones(secuencias, etiqueta):
     Parámetros:
     -----------
     secuencias : list
-        Lista de tuplas (id_secuencia, secuencia) cargada desde FASTA
+        Lista de tuplas (id_secuencia, secuencia) cargada desde FASTA.
+        La secuencia puede ser str o bytes (ej: la salida de iterar_registros_mmap)
     etiqueta : str
         Etiqueta para identificar el conjunto de secuencias ('salmonella' o 'gallus')
         
@@ -24,21 +33,34 @@ def calcular_uso_codones(secuencias, etiqueta):
     -------
     results/codon_usage.csv (cuando se combina con los datos de la otra especie)
     """
-    # Contador para todos los codones
+    # Contador vectorial para secuencias normalizadas (solo A, C, G, T, N)
+    conteo_vectorial = np.zeros(NUM_CODONES, dtype=np.int64)
+    # Contador para secuencias con otros caracteres (ej: sin normalizar)
     contador_codones = Counter()
     total_codones = 0
     
     for _, sec in secuencias:
-        # Dividir la secuencia en codones (triplets)
         # Asumimos que la secuencia está en frame correcto
-        codones = [sec[i:i+3] for i in range(0, len(sec) - 2, 3)]
-        
-        # Filtrar solo codones completos (de 3 bases)
-        codones_completos = [c for c in codones if len(c) == 3]
+        codigos = codificar(sec)
         
-        # Actualizar contadores
-        contador_codones.update(codones_completos)
-        total_codones += len(codones_completos)
+        if codigos.size and codigos.max() >= CODIGO_INVALIDO:
+            # Dividir la secuencia en codones (triplets) como texto
+            if not isinstance(sec, str):
+                sec = bytes(sec).decode('ascii', errors='replace')
+            codones = [sec[i:i+3] for i in range(0, len(sec) - 2, 3)]
+            
+            # Filtrar solo codones completos (de 3 bases)
+            codones_completos = [c for c in codones if len(c) == 3]
+            
+            # Actualizar contadores
+            contador_codones.update(codones_completos)
+            total_codones += len(codones_completos)
+        else:
+            conteo_vectorial += contar_codones_codificados(codigos)
+            total_codones += len(codigos) // 3
+    
+    for indice in np.flatnonzero(conteo_vectorial):
+        contador_codones[CODONES[indice]] += int(conteo_vectorial[indice])
     
     # Calcular frecuencias relativas
     frecuencias = {}
@@ -53,6 +75,39 @@ def calcular_uso_codones(secuencias, etiqueta):
     
     return df
 
+def calcular_uso_codones_codificadas(codificadas, etiqueta):
+    """
+    Versión vectorizada de calcular_uso_codones sobre un SecuenciasCodificadas.
+
+    Con las políticas de Ns 'omitir_codones', 'enmascarar' y 'descartar',
+    los codones que contienen N no aparecen ni cuentan en el total.
+
+    Parámetros:
+    -----------
+    codificadas : SecuenciasCodificadas o bloques.ResumenRegistros
+        Secuencias ya filtradas y con la política de Ns aplicada
+    etiqueta : str
+        Etiqueta para identificar el conjunto de secuencias ('salmonella' o 'gallus')
+
+    Retorna:
+    --------
+    pandas.DataFrame
+        Mismas columnas que calcular_uso_codones: codon, frecuencia_{etiqueta}
+    """
+    conteo, total_codones = codificadas.conteo_codones()
+    indices = np.flatnonzero(conteo)
+    frecuencias = conteo[indices] / total_codones if total_codones > 0 else np.zeros(len(indices))
+
+    df = pd.DataFrame({
+        'codon': [CODONES[i] for i in indices],
+        f'frecuencia_{etiqueta}': frecuencias,
+    })
+    df = df.sort_values('codon').reset_index(drop=True)
+
+    print(f" Calculado uso de codones para {etiqueta}: {total_codones} codones analizados")
+
+    return df
+
 def analizar_bias_codones(df_codones, especie):
     """
     Analiza el bias de uso de codones para una especie usando codon_usage.csv.
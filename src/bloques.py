@@ -0,0 +1,336 @@
+"""
+Procesamiento por bloques de registros muy largos (cromosomas completos).
+
+El FASTA se lee en bloques de tam_bloque bytes y cada registro se resume
+al vuelo (longitud, bases GC, N y conteo de codones) sin construir nunca
+su secuencia completa: la memoria queda acotada por el bloque, no por el
+registro. Los 0-2 códigos finales de un bloque que no completan un codón
+pasan al siguiente, de modo que la fase de lectura se conserva y el
+resultado es idéntico al de procesar el registro entero.
+
+Uso:
+    resumen = resumir_fasta_por_bloques("data/cromosomas.fasta.gz", "Gallus")
+    resumen = resumen.filtrar_longitud(300).aplicar_politica_ns('omitir_codones')
+    df = calcular_metricas_codificadas(resumen)
+"""
+import contextlib
+import os
+
+import numpy as np
+
+from .codificacion import (
+    CODONES_CON_N,
+    NUM_CODONES,
+    codificar,
+    contar_codones_codificados,
+    contar_gc,
+    indices_imputados,
+    validar_politica_ns,
+)
+from .compresion import abrir_descomprimido
+from .lector_mmap import normalizar_bytes
+from .procesamiento import (
+    TAM_PREFIJO_CODIFICACION,
+    _abrir_flujo_binario,
+    _traducir_error_carga,
+    detectar_codificacion,
+)
+
+# Bytes leídos del archivo (descomprimido) en cada bloque
+TAM_BLOQUE_POR_DEFECTO = 8 * 1024 * 1024
+
+_SALTO = 0x0A      # b'\n'
+_CABECERA = 0x3E   # b'>'
+
+
+def _identificador(cabecera, codificacion):
+    """Primer campo de la línea de cabecera (igual que iterar_registros_mmap)."""
+    partes = bytes(cabecera).decode(codificacion, errors='replace').strip().split(None, 1)
+    if not partes:
+        raise ValueError("El archivo FASTA contiene secuencias sin identificador válido. Verifique el formato del archivo.")
+    return partes[0]
+
+
+def iterar_bloques_fasta(flujo, tam_bloque=TAM_BLOQUE_POR_DEFECTO):
+    """
+    Recorre un FASTA en bloques de tamaño fijo, sin leer ningún registro entero.
+
+    Parámetros:
+    -----------
+    flujo : archivo binario
+        FASTA sin comprimir (ver compresion.abrir_descomprimido)
+    tam_bloque : int
+        Bytes leídos en cada iteración
+
+    Retorna:
+    --------
+    generator
+        Eventos ('registro', id) al empezar cada registro y ('bases', bytes)
+        con trozos de su secuencia ya normalizados (mayúsculas, solo A, C,
+        G, T y N, como iterar_registros_mmap). El texto anterior a la
+        primera cabecera se ignora.
+
+    Lanza:
+    ------
+    ValueError: Si un registro no tiene identificador válido
+    """
+    if tam_bloque <= 0:
+        raise ValueError(f"El tamaño de bloque debe ser positivo (recibido: {tam_bloque})")
+    codificacion = None
+    cabecera = None          # bytearray mientras se lee una línea de cabecera
+    inicio_linea = True      # el byte anterior fue un salto de línea (o es el inicio)
+    en_registro = False
+
+    while True:
+        bloque = flujo.read(tam_bloque)
+        if not bloque:
+            break
+        if codificacion is None:
+            codificacion = detectar_codificacion(bloque[:TAM_PREFIJO_CODIFICACION])
+        vista = memoryview(bloque)
+        pos, total = 0, len(bloque)
+        while pos < total:
+            if cabecera is not None:
+                fin = bloque.find(b'\n', pos)
+                if fin == -1:
+                    # La cabecera sigue en el próximo bloque
+                    cabecera += vista[pos:]
+                    break
+                cabecera += vista[pos:fin]
+                yield ('registro', _identificador(cabecera, codificacion))
+                cabecera, en_registro, inicio_linea = None, True, True
+                pos = fin + 1
+            elif inicio_linea and bloque[pos] == _CABECERA:
+                cabecera = bytearray()
+                pos += 1
+            else:
+                siguiente = bloque.find(b'\n>', pos)
+                fin = total if siguiente == -1 else siguiente + 1
+                if en_registro:
+                    bases = normalizar_bytes(vista[pos:fin])
+                    if bases:
+                        yield ('bases', bases)
+                inicio_linea = bloque[fin - 1] == _SALTO
+                pos = fin
+
+    # Cabecera en la última línea, sin salto final (registro vacío)
+    if cabecera is not None:
+        yield ('registro', _identificador(cabecera, codificacion))
+
+
+class ResumenRegistros:
+    """
+    Resumen por registro de un FASTA leído por bloques.
+
+    Ofrece la misma interfaz que SecuenciasCodificadas (filtrar_longitud,
+    aplicar_politica_ns, contar_gc, contar_ns, conteo_codones,
+    conteos_por_secuencia), así que
+    calcular_metricas_codificadas y calcular_uso_codones_codificadas
+    aceptan cualquiera de los dos. Por registro se guardan longitud, bases
+    GC, N y el conteo de sus NUM_CODONES codones.
+    """
+
+    def __init__(self, ids, longitudes, gc, ns, conteos, politica_ns='conservar', base_imputacion='A'):
+        self.ids = list(ids)
+        self.longitudes = np.asarray(longitudes, dtype=np.int64)
+        self.gc = np.asarray(gc, dtype=np.int64)
+        self.ns = np.asarray(ns, dtype=np.int64)
+        self.conteos = np.asarray(conteos, dtype=np.int64).reshape(len(self.ids), NUM_CODONES)
+        self.politica_ns = politica_ns
+        self.base_imputacion = base_imputacion
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def total_bases(self):
+        return int(self.longitudes.sum())
+
+    def _seleccionar(self, mascara):
+        ids = [id_seq for id_seq, conservar in zip(self.ids, mascara) if conservar]
+        return ResumenRegistros(
+            ids, self.longitudes[mascara], self.gc[mascara], self.ns[mascara], self.conteos[mascara],
+            self.politica_ns, self.base_imputacion
+        )
+
+    def filtrar_longitud(self, min_len):
+        """Conserva los registros de longitud >= min_len."""
+        if min_len <= 0:
+            return self
+        return self._seleccionar(self.longitudes >= min_len)
+
+    def contar_ns(self):
+        """Número de N de cada registro (0 tras imputarlas)."""
+        if self.politica_ns == 'imputar':
+            return np.zeros(len(self), dtype=np.int64)
+        return self.ns
+
+    def contar_gc(self):
+        """Número de bases G y C de cada registro (incluye las N imputadas como G o C)."""
+        if self.politica_ns == 'imputar' and self.base_imputacion in 'GC':
+            return self.gc + self.ns
+        return self.gc
+
+    def aplicar_politica_ns(self, politica, fraccion_max_ns=0.0, base_imputacion='A'):
+        """
+        Aplica una política de POLITICAS_NS (ver SecuenciasCodificadas.aplicar_politica_ns).
+
+        La imputación no recorre bases: se aplica a los conteos al calcular
+        GC y codones.
+
+        Lanza:
+        ------
+        ValueError: Si la política o sus parámetros no son válidos
+        """
+        validar_politica_ns(politica, fraccion_max_ns, base_imputacion)
+        resultado = self
+        if politica == 'descartar':
+            resultado = self._seleccionar(self.contar_ns() <= fraccion_max_ns * self.longitudes)
+        resultado.politica_ns = politica
+        resultado.base_imputacion = base_imputacion
+        return resultado
+
+    def conteo_codones(self):
+        """
+        Conteo total de codones (ver SecuenciasCodificadas.conteo_codones).
+
+        Retorna:
+        --------
+        tuple
+            (array int64 de longitud NUM_CODONES, total de codones contados)
+        """
+        conteo = self.conteos.sum(axis=0)
+        if self.politica_ns == 'imputar':
+            imputado = np.zeros(NUM_CODONES, dtype=np.int64)
+            np.add.at(imputado, indices_imputados(self.base_imputacion), conteo)
+            conteo = imputado
+        elif self.politica_ns in ('omitir_codones', 'enmascarar', 'descartar'):
+            conteo[CODONES_CON_N] = 0
+        return conteo, int(conteo.sum())
+
+    def conteos_por_secuencia(self):
+        """
+        Conteo de codones de cada registro (ver SecuenciasCodificadas.conteos_por_secuencia).
+
+        Retorna:
+        --------
+        numpy.ndarray
+            Array int64 de forma (len(self), NUM_CODONES) con la política de Ns aplicada
+        """
+        if self.politica_ns == 'imputar':
+            conteos = np.zeros_like(self.conteos)
+            np.add.at(conteos, (slice(None), indices_imputados(self.base_imputacion)), self.conteos)
+            return conteos
+        conteos = self.conteos.copy()
+        if self.politica_ns in ('omitir_codones', 'enmascarar', 'descartar'):
+            conteos[:, CODONES_CON_N] = 0
+        return conteos
+
+
+def resumir_registros(eventos):
+    """
+    Resume los eventos de iterar_bloques_fasta en un ResumenRegistros.
+
+    Cada bloque se codifica y se cuenta por separado; los códigos que no
+    completan un codón al final de un bloque se anteponen al siguiente.
+    """
+    ids, longitudes, gc, ns, conteos = [], [], [], [], []
+    resto = np.empty(0, dtype=np.uint8)
+    for tipo, valor in eventos:
+        if tipo == 'registro':
+            ids.append(valor)
+            longitudes.append(0)
+            gc.append(0)
+            ns.append(0)
+            conteos.append(np.zeros(NUM_CODONES, dtype=np.int64))
+            # Un codón incompleto al final del registro anterior no se cuenta
+            resto = resto[:0]
+            continue
+        longitudes[-1] += len(valor)
+        gc[-1] += contar_gc(valor)
+        ns[-1] += valor.count(b'N')
+        codigos = codificar(valor)
+        if resto.size:
+            codigos = np.concatenate([resto, codigos])
+        completos = (len(codigos) // 3) * 3
+        conteos[-1] += contar_codones_codificados(codigos[:completos])
+        # Copia: no retener el bloque entero por 0-2 códigos
+        resto = codigos[completos:].copy()
+
+    matriz = np.stack(conteos) if conteos else np.zeros((0, NUM_CODONES), dtype=np.int64)
+    return ResumenRegistros(ids, longitudes, gc, ns, matriz)
+
+
+@contextlib.contextmanager
+def abrir_fasta_en_flujo(fuente, nombre=None):
+    """
+    Abre una ruta, un contenido en memoria o un archivo binario como flujo descomprimido.
+
+    Los archivos del llamador (ej: el UploadedFile de Streamlit) se sueltan
+    al terminar sin cerrarlos.
+
+    Lanza:
+    ------
+    FileNotFoundError: Si la ruta no existe
+    ValueError: Si el contenido está vacío
+    """
+    es_ruta = isinstance(fuente, (str, os.PathLike))
+    nombre = nombre or (str(fuente) if es_ruta else "buffer")
+    if es_ruta and not os.path.exists(fuente):
+        error = FileNotFoundError(f"No se encontró el archivo: {fuente}")
+        error.filename = str(fuente)
+        raise error
+
+    archivo = open(fuente, 'rb') if es_ruta else None
+    flujo = archivo or _abrir_flujo_binario(fuente)
+    try:
+        if not flujo.peek(1):
+            raise ValueError(f"El archivo FASTA está vacío: {nombre}")
+        descomprimido = abrir_descomprimido(flujo)
+        try:
+            yield descomprimido
+        finally:
+            if descomprimido is not flujo:
+                descomprimido.close()
+    finally:
+        if archivo is not None:
+            archivo.close()
+        elif flujo is not fuente and not isinstance(fuente, (bytes, bytearray, memoryview)):
+            flujo.detach()
+
+
+def resumir_fasta_por_bloques(fuente, nombre=None, tam_bloque=TAM_BLOQUE_POR_DEFECTO):
+    """
+    Lee un FASTA por bloques y resume cada registro.
+
+    Parámetros:
+    -----------
+    fuente : str, Path, bytes o archivo binario
+        Ruta o contenido del FASTA (plano o comprimido con gzip/BGZF/zstd)
+    nombre : str, optional
+        Nombre para los mensajes (por defecto, la ruta)
+    tam_bloque : int
+        Bytes por bloque; acota la memoria usada por registro
+
+    Retorna:
+    --------
+    ResumenRegistros
+
+    Lanza:
+    ------
+    FileNotFoundError: Si la ruta no existe
+    ValueError: Si el archivo está vacío, corrupto o no contiene registros
+    """
+    nombre = nombre or (str(fuente) if isinstance(fuente, (str, os.PathLike)) else "buffer")
+    try:
+        with abrir_fasta_en_flujo(fuente, nombre) as flujo:
+            resumen = resumir_registros(iterar_bloques_fasta(flujo, tam_bloque))
+    except FileNotFoundError:
+        raise
+    except Exception as e:
+        raise _traducir_error_carga(e, nombre) from e
+
+    if len(resumen) == 0:
+        raise ValueError(f"El archivo FASTA no contiene secuencias válidas: {nombre}. Verifique que el archivo tenga el formato correcto.")
+    print(f" Resumidas {len(resumen)} secuencias ({resumen.total_bases} bases) desde {nombre} en bloques de {tam_bloque} bytes")
+    return resumen
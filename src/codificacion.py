@@ -0,0 +1,317 @@
+import numpy as np
+
+# Código numérico de cada base: A=0, C=1, G=2, T=3, N=4 y 5 para cualquier otro byte
+BASES = 'ACGTN'
+CODIGO_INVALIDO = 5
+TABLA_CODIGOS = np.full(256, CODIGO_INVALIDO, dtype=np.uint8)
+for _codigo, _base in enumerate(BASES):
+    TABLA_CODIGOS[ord(_base)] = _codigo
+
+# Índice de codón en base 5 (A,C,G,T,N): 25*b1 + 5*b2 + b3
+NUM_CODONES = len(BASES) ** 3
+CODONES = [a + b + c for a in BASES for b in BASES for c in BASES]
+
+
+def a_bytes(secuencia):
+    """Devuelve la secuencia como bytes (sin copiar si ya lo es)."""
+    if isinstance(secuencia, str):
+        return secuencia.encode('ascii', errors='replace')
+    return secuencia
+
+
+def codificar(secuencia):
+    """
+    Convierte una secuencia en un array uint8 de códigos (ver TABLA_CODIGOS).
+
+    Parámetros:
+    -----------
+    secuencia : str, bytes o memoryview
+
+    Retorna:
+    --------
+    numpy.ndarray
+        Array uint8 con un código por base
+    """
+    return TABLA_CODIGOS[np.frombuffer(a_bytes(secuencia), dtype=np.uint8)]
+
+
+def contar_gc(secuencia):
+    """Número de bases G y C de la secuencia (conteo en C, sin bucle Python)."""
+    if isinstance(secuencia, str):
+        return secuencia.count('G') + secuencia.count('C')
+    datos = bytes(secuencia) if isinstance(secuencia, memoryview) else secuencia
+    return datos.count(b'G') + datos.count(b'C')
+
+
+def contar_codones_codificados(codigos):
+    """
+    Cuenta los codones completos (en marco 0) de una secuencia codificada.
+
+    Parámetros:
+    -----------
+    codigos : numpy.ndarray
+        Array uint8 devuelto por codificar(); no debe contener CODIGO_INVALIDO
+
+    Retorna:
+    --------
+    numpy.ndarray
+        Array int64 de longitud NUM_CODONES con el conteo de cada codón de CODONES
+    """
+    n = (len(codigos) // 3) * 3
+    if n == 0:
+        return np.zeros(NUM_CODONES, dtype=np.int64)
+    # El índice máximo (124) cabe en uint8: se calcula sin ampliar el tipo
+    indices = codigos[0:n:3] * np.uint8(25) + codigos[1:n:3] * np.uint8(5) + codigos[2:n:3]
+    return np.bincount(indices, minlength=NUM_CODONES)
+
+
+# Tratamiento de las N (bases ambiguas) antes de calcular métricas y codones:
+# - 'conservar': se dejan tal cual; los codones con N se cuentan como codones propios
+# - 'imputar': cada N se sustituye por base_imputacion (comportamiento de limpiar_ns=True con 'A')
+# - 'omitir_codones': los codones que contienen N no se cuentan (ni en el total)
+# - 'enmascarar': como 'omitir_codones' y además el %GC se calcula sin contar las N
+# - 'descartar': se eliminan las secuencias con más de fraccion_max_ns de N;
+#   en las que quedan, los codones con N no se cuentan
+POLITICAS_NS = ('conservar', 'imputar', 'omitir_codones', 'enmascarar', 'descartar')
+
+CODIGO_N = BASES.index('N')
+
+# Codones (índices de CODONES) que contienen al menos una N
+CODONES_CON_N = np.array(['N' in codon for codon in CODONES])
+
+
+def validar_politica_ns(politica, fraccion_max_ns=0.0, base_imputacion='A'):
+    """
+    Comprueba una política de POLITICAS_NS y sus parámetros.
+
+    Lanza:
+    ------
+    ValueError: Si la política, la fracción o la base de imputación no son válidas
+    """
+    if politica not in POLITICAS_NS:
+        raise ValueError(f"Política de Ns no válida: '{politica}'. Opciones: {', '.join(POLITICAS_NS)}")
+    if politica == 'imputar' and (len(base_imputacion) != 1 or base_imputacion not in 'ACGT'):
+        raise ValueError(f"Base de imputación no válida: '{base_imputacion}' (use A, C, G o T)")
+    if politica == 'descartar' and not 0.0 <= fraccion_max_ns <= 1.0:
+        raise ValueError(f"fraccion_max_ns debe estar entre 0 y 1 (recibido: {fraccion_max_ns})")
+
+
+def indices_imputados(base_imputacion):
+    """Índice de cada codón de CODONES tras sustituir sus N por base_imputacion."""
+    return np.array([
+        CODONES.index(codon.replace('N', base_imputacion)) for codon in CODONES
+    ])
+
+
+_TABLA_SIN_MAYUSCULAS = TABLA_CODIGOS.copy()
+for _codigo, _base in enumerate(BASES.lower()):
+    _TABLA_SIN_MAYUSCULAS[ord(_base)] = _codigo
+
+# Codones procesados por lote en conteo_codones (acota la memoria de los índices)
+CODONES_POR_LOTE = 4 * 1024 * 1024
+
+
+class SecuenciasCodificadas:
+    """
+    Conjunto de secuencias codificadas en un único buffer contiguo.
+
+    Todas las bases se guardan concatenadas en un array uint8 (ver
+    TABLA_CODIGOS) y cada secuencia es un tramo [inicio, inicio + longitud).
+    Filtrar solo cambia los índices de tramos y las políticas de N modifican
+    el buffer en su sitio: no hay copias de texto por secuencia.
+
+    Uso:
+        codificadas = SecuenciasCodificadas.desde_secuencias(secuencias)
+        codificadas = codificadas.filtrar_longitud(300)
+        codificadas.aplicar_politica_ns('omitir_codones')
+        conteo, total = codificadas.conteo_codones()
+    """
+
+    def __init__(self, ids, codigos, inicios, longitudes, politica_ns='conservar'):
+        self.ids = list(ids)
+        self.codigos = codigos
+        self.inicios = np.asarray(inicios, dtype=np.int64)
+        self.longitudes = np.asarray(longitudes, dtype=np.int64)
+        self.politica_ns = politica_ns
+
+    @classmethod
+    def desde_secuencias(cls, secuencias):
+        """
+        Codifica una lista de tuplas (id, secuencia) con str o bytes.
+
+        Lanza:
+        ------
+        ValueError: Si alguna secuencia contiene caracteres distintos de A, C, G, T y N
+        """
+        ids = [id_seq for id_seq, _ in secuencias]
+        longitudes = np.fromiter((len(seq) for _, seq in secuencias), dtype=np.int64, count=len(ids))
+        inicios = np.zeros(len(ids), dtype=np.int64)
+        if len(ids) > 1:
+            np.cumsum(longitudes[:-1], out=inicios[1:])
+        # Una sola concatenación y una sola conversión a bytes para todo el conjunto
+        # (con str, 'replace' deja un byte por carácter no ASCII: las longitudes se mantienen)
+        if all(isinstance(seq, str) for _, seq in secuencias):
+            unidas = ''.join(seq for _, seq in secuencias).encode('ascii', errors='replace')
+        else:
+            unidas = b''.join(a_bytes(seq) for _, seq in secuencias)
+        # Las bases en minúscula (regiones enmascaradas) cuentan como su mayúscula
+        codigos = _TABLA_SIN_MAYUSCULAS[np.frombuffer(unidas, dtype=np.uint8)]
+        del unidas
+        if codigos.size and codigos.max() >= CODIGO_INVALIDO:
+            posicion = int(np.argmax(codigos >= CODIGO_INVALIDO))
+            registro = int(np.searchsorted(inicios, posicion, side='right')) - 1
+            raise ValueError(
+                f"La secuencia {ids[registro]} contiene caracteres inválidos. Solo se permiten A, T, C, G y N."
+            )
+        return cls(ids, codigos, inicios, longitudes)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def total_bases(self):
+        return int(self.longitudes.sum())
+
+    def _seleccionar(self, mascara):
+        """Nuevo conjunto con los tramos de mascara (comparte el buffer)."""
+        ids = [id_seq for id_seq, conservar in zip(self.ids, mascara) if conservar]
+        return SecuenciasCodificadas(
+            ids, self.codigos, self.inicios[mascara], self.longitudes[mascara], self.politica_ns
+        )
+
+    def filtrar_longitud(self, min_len):
+        """Conserva las secuencias de longitud >= min_len (sin copiar el buffer)."""
+        if min_len <= 0:
+            return self
+        return self._seleccionar(self.longitudes >= min_len)
+
+    def _sumar_por_secuencia(self, valores):
+        """Suma de un array booleano/uint8 del tamaño del buffer dentro de cada tramo."""
+        resultado = np.zeros(len(self), dtype=np.int64)
+        con_bases = self.longitudes > 0
+        if con_bases.any():
+            # reduceat suma de cada inicio al siguiente: con tramos no
+            # contiguos (tras filtrar) se suman tramo a tramo desde sus límites
+            limites = np.stack([self.inicios[con_bases], self.inicios[con_bases] + self.longitudes[con_bases]], axis=1).ravel()
+            extendido = np.append(valores, np.zeros(1, dtype=valores.dtype))
+            resultado[con_bases] = np.add.reduceat(extendido, limites, dtype=np.int64)[0::2]
+        return resultado
+
+    def contar_ns(self):
+        """Número de N de cada secuencia."""
+        return self._sumar_por_secuencia(self.codigos == CODIGO_N)
+
+    def contar_gc(self):
+        """Número de bases G y C de cada secuencia."""
+        return self._sumar_por_secuencia((self.codigos == 1) | (self.codigos == 2))
+
+    def aplicar_politica_ns(self, politica, fraccion_max_ns=0.0, base_imputacion='A'):
+        """
+        Aplica una política de POLITICAS_NS (modifica el buffer en su sitio con 'imputar').
+
+        Parámetros:
+        -----------
+        politica : str
+            Una de POLITICAS_NS
+        fraccion_max_ns : float
+            Con 'descartar', fracción máxima de N admitida por secuencia
+        base_imputacion : str
+            Con 'imputar', base que sustituye a cada N
+
+        Retorna:
+        --------
+        SecuenciasCodificadas
+            El mismo conjunto, o uno nuevo sin las secuencias descartadas
+
+        Lanza:
+        ------
+        ValueError: Si la política o sus parámetros no son válidos
+        """
+        validar_politica_ns(politica, fraccion_max_ns, base_imputacion)
+        resultado = self
+        if politica == 'imputar':
+            # Todo el buffer a la vez: también las bases de secuencias filtradas, que ya no se usan
+            self.codigos[self.codigos == CODIGO_N] = BASES.index(base_imputacion)
+        elif politica == 'descartar':
+            ns = self.contar_ns()
+            conservar = ns <= fraccion_max_ns * self.longitudes
+            resultado = self._seleccionar(conservar)
+        resultado.politica_ns = politica
+        return resultado
+
+    def _indices_codones_por_lote(self):
+        """
+        Índices de codón (ver CODONES) de los codones completos, por lotes de secuencias.
+
+        Genera (primero, ultimo, codones_por_secuencia, indices) para las
+        secuencias [primero, ultimo): unos CODONES_POR_LOTE codones por lote
+        (al menos una secuencia), calculados sobre el buffer concatenado sin
+        recorrer las secuencias en Python.
+        """
+        codones_por_secuencia = self.longitudes // 3
+        acumulado = np.concatenate([[0], np.cumsum(codones_por_secuencia)])
+        primero = 0
+        while primero < len(self):
+            # Tantas secuencias como quepan en el lote (al menos una)
+            ultimo = int(np.searchsorted(acumulado, acumulado[primero] + CODONES_POR_LOTE, side='right')) - 1
+            ultimo = max(ultimo, primero + 1)
+            n_codones = codones_por_secuencia[primero:ultimo]
+            total_lote = int(n_codones.sum())
+            if total_lote:
+                # Posición de cada codón: inicio de su secuencia + 3 * índice dentro de ella
+                desplazamiento = np.arange(total_lote, dtype=np.int64) - np.repeat(acumulado[primero:ultimo] - acumulado[primero], n_codones)
+                posiciones = np.repeat(self.inicios[primero:ultimo], n_codones) + 3 * desplazamiento
+                indices = (
+                    self.codigos[posiciones] * np.uint8(25)
+                    + self.codigos[posiciones + 1] * np.uint8(5)
+                    + self.codigos[posiciones + 2]
+                )
+                yield primero, ultimo, n_codones, indices
+            primero = ultimo
+
+    def conteo_codones(self):
+        """
+        Cuenta los codones completos (marco 0 de cada secuencia) de todo el conjunto.
+
+        Los índices de codón se calculan por lotes de CODONES_POR_LOTE sobre
+        el buffer concatenado, sin recorrer las secuencias en Python.
+
+        Retorna:
+        --------
+        tuple
+            (array int64 de longitud NUM_CODONES con el conteo de cada codón de
+            CODONES, total de codones contados). Con las políticas que omiten
+            codones con N, esos codones valen 0 y no entran en el total.
+        """
+        conteo = np.zeros(NUM_CODONES, dtype=np.int64)
+        for _, _, _, indices in self._indices_codones_por_lote():
+            conteo += np.bincount(indices, minlength=NUM_CODONES)
+
+        if self.politica_ns in ('omitir_codones', 'enmascarar', 'descartar'):
+            conteo[CODONES_CON_N] = 0
+        return conteo, int(conteo.sum())
+
+    def conteos_por_secuencia(self):
+        """
+        Conteo de codones de cada secuencia (matriz secuencias x codones).
+
+        Es la entrada de src/remuestreo.py: remuestrear genes es combinar
+        filas de esta matriz, sin volver a recorrer las secuencias.
+
+        Retorna:
+        --------
+        numpy.ndarray
+            Array int64 de forma (len(self), NUM_CODONES); con las políticas
+            que omiten codones con N, sus columnas valen 0
+        """
+        conteos = np.zeros((len(self), NUM_CODONES), dtype=np.int64)
+        for primero, ultimo, n_codones, indices in self._indices_codones_por_lote():
+            # Un solo bincount por lote: cada secuencia ocupa NUM_CODONES casillas
+            filas = np.repeat(np.arange(ultimo - primero, dtype=np.int64), n_codones)
+            conteos[primero:ultimo] = np.bincount(
+                filas * NUM_CODONES + indices, minlength=(ultimo - primero) * NUM_CODONES
+            ).reshape(ultimo - primero, NUM_CODONES)
+
+        if self.politica_ns in ('omitir_codones', 'enmascarar', 'descartar'):
+            conteos[:, CODONES_CON_N] = 0
+        return conteos
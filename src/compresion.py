@@ -0,0 +1,251 @@
+import io
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Firmas (magic bytes) de los formatos comprimidos soportados
+MAGIC_GZIP = b'\x1f\x8b'
+MAGIC_ZSTD = b'\x28\xb5\x2f\xfd'
+
+# Extensiones aceptadas para archivos FASTA y sus variantes comprimidas
+EXTENSIONES_FASTA = ('.fa', '.fasta')
+EXTENSIONES_COMPRESION = ('.gz', '.bgz', '.zst')
+
+# Bloques BGZF que se descomprimen en paralelo por lote (cada bloque <= 64 KiB)
+BLOQUES_POR_LOTE = 64
+
+
+def es_nombre_fasta_valido(nombre):
+    """
+    Comprueba que un nombre de archivo sea .fa/.fasta, opcionalmente comprimido.
+
+    Ejemplos válidos: genes.fasta, genes.fa.gz, genes.fasta.bgz, genes.fasta.zst
+    """
+    nombre = nombre.lower()
+    for extension in EXTENSIONES_COMPRESION:
+        if nombre.endswith(extension):
+            nombre = nombre[:-len(extension)]
+            break
+    return nombre.endswith(EXTENSIONES_FASTA)
+
+
+def detectar_compresion(prefijo):
+    """
+    Identifica el formato de compresión a partir de los primeros bytes.
+
+    Parámetros:
+    -----------
+    prefijo : bytes
+        Al menos los primeros 18 bytes del archivo
+
+    Retorna:
+    --------
+    str o None
+        'bgzf', 'gzip', 'zstd' o None si el contenido no está comprimido
+    """
+    if prefijo.startswith(MAGIC_ZSTD):
+        return 'zstd'
+    if not prefijo.startswith(MAGIC_GZIP):
+        return None
+    # BGZF: gzip con FEXTRA y subcampo 'BC' de longitud 2 (tamaño del bloque)
+    if len(prefijo) >= 16 and prefijo[3] & 4 and prefijo[12:14] == b'BC' and prefijo[14:16] == b'\x02\x00':
+        return 'bgzf'
+    return 'gzip'
+
+
+def _descomprimir_bloque_bgzf(bloque):
+    """Descomprime un bloque BGZF completo (miembro gzip) verificando su CRC."""
+    return zlib.decompress(bloque, 31)
+
+
+class LectorBGZFParalelo(io.RawIOBase):
+    """
+    Flujo de lectura que descomprime un archivo BGZF en paralelo.
+
+    BGZF es una serie de miembros gzip independientes de hasta 64 KiB. Se leen
+    lotes de bloques y se descomprimen en un pool de hilos (zlib libera el GIL),
+    manteniendo un lote por adelantado para solapar E/S y descompresión. Los
+    datos se entregan en orden, listos para el parser en flujo.
+    """
+
+    def __init__(self, flujo, hilos=None):
+        self._flujo = flujo
+        self._hilos = hilos or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self._hilos)
+        self._pendientes = deque()
+        self._actual = memoryview(b'')
+        self._agotado = False
+
+    def readable(self):
+        return True
+
+    def _leer_bloque(self):
+        """Lee el siguiente bloque BGZF crudo del flujo, o None al final."""
+        cabecera = self._flujo.read(12)
+        if not cabecera:
+            return None
+        if len(cabecera) < 12 or not cabecera.startswith(MAGIC_GZIP):
+            raise ValueError("El archivo BGZF está corrupto: cabecera de bloque inválida")
+        xlen = struct.unpack('<H', cabecera[10:12])[0]
+        extra = self._flujo.read(xlen)
+
+        # Buscar el subcampo BC con el tamaño total del bloque (BSIZE + 1)
+        bsize = None
+        pos = 0
+        while pos + 4 <= len(extra):
+            slen = struct.unpack('<H', extra[pos + 2:pos + 4])[0]
+            if extra[pos:pos + 2] == b'BC' and slen == 2:
+                bsize = struct.unpack('<H', extra[pos + 4:pos + 6])[0]
+                break
+            pos += 4 + slen
+        if bsize is None:
+            raise ValueError("El archivo BGZF está corrupto: falta el tamaño de bloque")
+
+        resto = self._flujo.read(bsize + 1 - 12 - xlen)
+        return cabecera + extra + resto
+
+    def _encolar_lote(self):
+        """Lee un lote de bloques y lo envía a descomprimir al pool."""
+        bloques = []
+        while len(bloques) < BLOQUES_POR_LOTE:
+            bloque = self._leer_bloque()
+            if bloque is None:
+                self._agotado = True
+                break
+            bloques.append(bloque)
+        if bloques:
+            self._pendientes.append(self._executor.map(_descomprimir_bloque_bgzf, bloques))
+
+    def _siguiente_fragmento(self):
+        """Devuelve el siguiente fragmento descomprimido, o None al final."""
+        # Mantener al menos dos lotes en vuelo
+        while not self._agotado and len(self._pendientes) < 2:
+            self._encolar_lote()
+        while self._pendientes:
+            try:
+                return next(self._pendientes[0])
+            except StopIteration:
+                self._pendientes.popleft()
+                if not self._agotado:
+                    self._encolar_lote()
+        return None
+
+    def readinto(self, destino):
+        while not self._actual:
+            fragmento = self._siguiente_fragmento()
+            if fragmento is None:
+                return 0
+            self._actual = memoryview(fragmento)
+        n = min(len(destino), len(self._actual))
+        destino[:n] = self._actual[:n]
+        self._actual = self._actual[n:]
+        return n
+
+    def close(self):
+        # No se cierra el flujo de origen: pertenece al llamador
+        if not self.closed:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        super().close()
+
+
+class _LectorGzip(io.RawIOBase):
+    """Adaptador de gzip.GzipFile que no cierra el flujo de origen al cerrarse."""
+
+    def __init__(self, flujo):
+        import gzip
+        self._gzip = gzip.GzipFile(fileobj=flujo, mode='rb')
+
+    def readable(self):
+        return True
+
+    def readinto(self, destino):
+        return self._gzip.readinto(destino)
+
+    def close(self):
+        # GzipFile no cierra un fileobj ajeno, solo su estado interno
+        if not self.closed:
+            self._gzip.close()
+        super().close()
+
+
+def _importar_zstandard():
+    """Importa el paquete opcional 'zstandard' con un mensaje claro si falta."""
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError(
+            "El archivo está comprimido con zstd (.zst) pero el paquete 'zstandard' no está instalado. "
+            "Instálelo con 'pip install zstandard' o descomprima el archivo antes de usarlo."
+        )
+    return zstandard
+
+
+def _abrir_zstd(flujo):
+    """Abre un flujo zstd en modo lectura sin cerrar el origen."""
+    zstandard = _importar_zstandard()
+    lector = zstandard.ZstdDecompressor().stream_reader(flujo, read_across_frames=True, closefd=False)
+    return io.BufferedReader(lector)
+
+
+def abrir_descomprimido(flujo, hilos=None):
+    """
+    Devuelve un flujo binario con el contenido descomprimido de forma transparente.
+
+    Parámetros:
+    -----------
+    flujo : archivo binario con peek()
+        Flujo de entrada (ej: open(ruta, 'rb') o un io.BufferedReader)
+    hilos : int, optional
+        Hilos para descomprimir BGZF en paralelo (por defecto, todos los núcleos)
+
+    Retorna:
+    --------
+    archivo binario
+        El mismo flujo si no está comprimido; si no, un lector en flujo que
+        descomprime gzip, BGZF o zstd. Cerrar el lector no cierra el origen.
+    """
+    formato = detectar_compresion(flujo.peek(18)[:18])
+    if formato is None:
+        return flujo
+    if formato == 'bgzf':
+        return io.BufferedReader(LectorBGZFParalelo(flujo, hilos=hilos), buffer_size=1024 * 1024)
+    if formato == 'gzip':
+        return io.BufferedReader(_LectorGzip(flujo), buffer_size=1024 * 1024)
+    return _abrir_zstd(flujo)
+
+
+def leer_prefijo_descomprimido(datos, n):
+    """
+    Descomprime solo los primeros n bytes de un contenido, si está comprimido.
+
+    Útil para validar rápidamente la cabecera de un archivo subido sin
+    descomprimirlo entero.
+
+    Parámetros:
+    -----------
+    datos : bytes
+        Primeros bytes (comprimidos o no) del archivo
+    n : int
+        Número máximo de bytes descomprimidos a devolver
+
+    Retorna:
+    --------
+    bytes
+        Hasta n bytes del contenido descomprimido
+    """
+    formato = detectar_compresion(datos[:18])
+    if formato is None:
+        return datos[:n]
+    if formato in ('gzip', 'bgzf'):
+        try:
+            return zlib.decompressobj(31).decompress(datos, n)
+        except zlib.error:
+            raise ValueError("El archivo comprimido (gzip) está corrupto")
+    zstandard = _importar_zstandard()
+    try:
+        # decompressobj tolera un prefijo truncado y devuelve lo que pueda decodificar
+        return zstandard.ZstdDecompressor().decompressobj().decompress(datos)[:n]
+    except zstandard.ZstdError:
+        raise ValueError("El archivo comprimido (zstd) está corrupto")
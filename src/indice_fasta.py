@@ -0,0 +1,232 @@
+import contextlib
+import mmap
+import os
+import re
+from collections import namedtuple
+
+from .compresion import detectar_compresion
+from .lector_mmap import normalizar_bytes
+
+# Una línea del índice .fai (mismo orden de columnas que samtools faidx)
+EntradaFai = namedtuple('EntradaFai', ['nombre', 'longitud', 'offset', 'bases_linea', 'ancho_linea'])
+
+
+def construir_indice_fai(ruta_fasta, ruta_indice=None):
+    """
+    Construye un índice .fai (formato samtools faidx) para un archivo FASTA.
+
+    Para cada registro se guarda: nombre, longitud en bases, offset en bytes
+    de la primera base, bases por línea y bytes por línea (con el salto).
+
+    Parámetros:
+    -----------
+    ruta_fasta : str
+        Ruta al archivo FASTA sin comprimir
+    ruta_indice : str, optional
+        Ruta del índice. Por defecto, ruta_fasta + '.fai'. Si no se puede
+        escribir (ej: carpeta de solo lectura), el índice se usa solo en memoria
+
+    Retorna:
+    --------
+    dict
+        Diccionario nombre -> EntradaFai, en el orden del archivo
+
+    Lanza:
+    ------
+    ValueError: Si el archivo está comprimido, tiene nombres repetidos o
+    líneas de longitud irregular dentro de un registro
+    """
+    if ruta_indice is None:
+        ruta_indice = ruta_fasta + '.fai'
+
+    with open(ruta_fasta, 'rb') as f:
+        if detectar_compresion(f.read(18)) is not None:
+            raise ValueError(
+                f"No se puede indexar un archivo comprimido: {ruta_fasta}. "
+                "Descomprímalo antes de usar la selección de genes."
+            )
+        f.seek(0)
+
+        indice = {}
+        actual = None  # [nombre, longitud, offset, bases_linea, ancho_linea]
+        linea_corta = False  # Se vio una línea más corta (solo válida al final)
+        posicion = 0
+
+        def cerrar_registro():
+            if actual is None:
+                return
+            if actual[0] in indice:
+                raise ValueError(f"Nombre de secuencia repetido en {ruta_fasta}: {actual[0]}")
+            indice[actual[0]] = EntradaFai(*actual)
+
+        for linea in f:
+            inicio_linea = posicion
+            posicion += len(linea)
+
+            if linea.startswith(b'>'):
+                cerrar_registro()
+                partes = linea[1:].split(None, 1)
+                nombre = partes[0].decode('utf-8', errors='replace') if partes else ''
+                if not nombre:
+                    raise ValueError(f"El archivo FASTA contiene secuencias sin identificador válido: {ruta_fasta}")
+                actual = [nombre, 0, posicion, 0, 0]
+                linea_corta = False
+                continue
+
+            if actual is None:
+                if linea.strip():
+                    raise ValueError(f"Formato FASTA inválido: hay datos antes de la primera cabecera en {ruta_fasta}")
+                continue
+
+            bases = len(linea.rstrip(b'\r\n'))
+            if bases == 0:
+                # Línea en blanco: solo se admite al final del registro
+                linea_corta = True
+                continue
+            if actual[3] == 0:
+                actual[2] = inicio_linea
+                actual[3] = bases
+                actual[4] = len(linea)
+            # La última línea del archivo puede no tener salto (len(linea) == bases)
+            elif linea_corta or bases > actual[3] or (bases == actual[3] and len(linea) not in (actual[4], bases)):
+                raise ValueError(
+                    f"Longitud de línea irregular en la secuencia {actual[0]} de {ruta_fasta}: "
+                    "el índice requiere que todas las líneas (salvo la última) tengan la misma longitud"
+                )
+            if bases < actual[3]:
+                linea_corta = True
+            actual[1] += bases
+
+        cerrar_registro()
+
+    try:
+        with open(ruta_indice, 'w', encoding='utf-8') as salida:
+            for e in indice.values():
+                salida.write(f"{e.nombre}\t{e.longitud}\t{e.offset}\t{e.bases_linea}\t{e.ancho_linea}\n")
+    except OSError as e:
+        print(f" Aviso: no se pudo guardar el índice {ruta_indice} ({e}); se usa solo en memoria")
+        with contextlib.suppress(OSError):
+            os.remove(ruta_indice)
+        return indice
+
+    print(f" Índice creado: {ruta_indice} ({len(indice)} secuencias)")
+    return indice
+
+
+def cargar_indice_fai(ruta_indice):
+    """
+    Lee un índice .fai existente.
+
+    Retorna:
+    --------
+    dict
+        Diccionario nombre -> EntradaFai, en el orden del archivo
+    """
+    indice = {}
+    with open(ruta_indice, 'r', encoding='utf-8') as f:
+        for linea in f:
+            campos = linea.rstrip('\n').split('\t')
+            if len(campos) < 5:
+                continue
+            indice[campos[0]] = EntradaFai(campos[0], *(int(c) for c in campos[1:5]))
+    return indice
+
+
+def obtener_indice_fai(ruta_fasta):
+    """
+    Devuelve el índice del FASTA, reutilizando el .fai si está al día.
+
+    Si no existe, es más antiguo que el FASTA o no se puede leer, se reconstruye.
+    """
+    ruta_indice = ruta_fasta + '.fai'
+    if os.path.exists(ruta_indice) and os.path.getmtime(ruta_indice) >= os.path.getmtime(ruta_fasta):
+        try:
+            return cargar_indice_fai(ruta_indice)
+        except OSError:
+            pass
+    return construir_indice_fai(ruta_fasta, ruta_indice)
+
+
+def extraer_secuencia(datos, entrada):
+    """
+    Extrae la secuencia de un registro a partir de su entrada del índice.
+
+    Parámetros:
+    -----------
+    datos : mmap.mmap o bytes
+        Contenido del FASTA (normalmente un mmap del archivo)
+    entrada : EntradaFai
+        Entrada del registro en el índice
+
+    Retorna:
+    --------
+    bytes
+        Secuencia normalizada como en cargar_secuencias (mayúsculas, solo A,
+        C, G, T y N, sin saltos de línea)
+    """
+    if entrada.longitud == 0:
+        return b''
+    lineas_completas, resto = divmod(entrada.longitud, entrada.bases_linea)
+    fin = entrada.offset + lineas_completas * entrada.ancho_linea + resto
+    return normalizar_bytes(datos[entrada.offset:fin])
+
+
+def cargar_secuencias_seleccionadas(ruta_fasta, ids=None, patron=None):
+    """
+    Carga solo las secuencias pedidas usando el índice .fai.
+
+    Cada secuencia se obtiene con un acceso directo (mmap) a su posición, de
+    modo que el coste es proporcional al subconjunto y no al archivo.
+
+    Parámetros:
+    -----------
+    ruta_fasta : str
+        Ruta al archivo FASTA sin comprimir
+    ids : iterable de str, optional
+        Identificadores a cargar
+    patron : str, optional
+        Expresión regular; se cargan los identificadores que la contengan (re.search)
+
+    Retorna:
+    --------
+    list
+        Lista de tuplas (id_secuencia, secuencia) normalizadas (bytes), en el
+        orden del archivo, igual que cargar_secuencias
+
+    Lanza:
+    ------
+    FileNotFoundError: Si el archivo no existe
+    ValueError: Si el archivo no se puede indexar, el patrón no es una
+    expresión regular válida o ninguna secuencia coincide
+    """
+    if not os.path.exists(ruta_fasta):
+        raise FileNotFoundError(f"No se encontró el archivo: {ruta_fasta}")
+    if os.path.getsize(ruta_fasta) == 0:
+        raise ValueError(f"El archivo FASTA está vacío: {ruta_fasta}")
+
+    indice = obtener_indice_fai(ruta_fasta)
+
+    if ids is None and patron is None:
+        seleccion = list(indice.values())
+    else:
+        ids = set(ids or ())
+        try:
+            regex = re.compile(patron) if patron else None
+        except re.error as e:
+            raise ValueError(f"Patrón de identificadores no válido '{patron}': {e}")
+        seleccion = [
+            e for nombre, e in indice.items()
+            if nombre in ids or (regex is not None and regex.search(nombre))
+        ]
+        no_encontrados = ids.difference(indice)
+        if no_encontrados:
+            print(f" Advertencia: {len(no_encontrados)} identificador(es) no están en {ruta_fasta}")
+        if not seleccion:
+            raise ValueError(f"Ninguna secuencia de {ruta_fasta} coincide con la selección de genes indicada.")
+
+    with open(ruta_fasta, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+        secuencias = [(e.nombre, extraer_secuencia(datos, e)) for e in seleccion]
+
+    print(f" Seleccionadas {len(secuencias)} de {len(indice)} secuencias desde {ruta_fasta}")
+    print(f" Secuencias normalizadas: {len(secuencias)} secuencias procesadas correctamente")
+    return secuencias
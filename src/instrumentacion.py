@@ -0,0 +1,144 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# Si se define, cada etapa medida se añade como una línea JSON a este archivo
+VARIABLE_ENTORNO_JSONL = "SALMO_INSTRUMENTACION_JSONL"
+
+
+def rss_pico_mb():
+    """
+    Pico de memoria residente (RSS) del proceso en MB.
+
+    Retorna:
+    --------
+    float o None
+        None en plataformas sin el módulo resource (ej: Windows)
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa en KB y macOS en bytes
+    return pico / (1024 ** 2) if sys.platform == "darwin" else pico / 1024
+
+
+def contar_bases(*listas_secuencias):
+    """Total de registros y de bases de una o varias listas de tuplas (id, secuencia)."""
+    registros = 0
+    bases = 0
+    for secuencias in listas_secuencias:
+        registros += len(secuencias)
+        bases += sum(len(sec) for _, sec in secuencias)
+    return registros, bases
+
+
+class MedidorEtapas:
+    """
+    Mide cada etapa del pipeline: tiempo real, tiempo de CPU, variación del
+    pico de RSS y registros/bases procesados.
+
+    Uso:
+        medidor = MedidorEtapas(contexto={'analisis_id': '...'})
+        with medidor.etapa('cargar') as m:
+            secuencias = cargar_secuencias(ruta)
+            m['registros'], m['bases'] = contar_bases(secuencias)
+        medidor.resumen()
+
+    Cada etapa terminada se emite como una línea JSON: a la ruta indicada en
+    ruta_jsonl (o en la variable de entorno SALMO_INSTRUMENTACION_JSONL) o,
+    si no hay ninguna, a la salida estándar. Si se pasa al_terminar, se llama
+    con cada medición (ej: para publicar el progreso de un trabajo).
+    """
+
+    def __init__(self, contexto=None, ruta_jsonl=None, emitir=True, al_terminar=None):
+        self.contexto = dict(contexto or {})
+        self.ruta_jsonl = ruta_jsonl or os.environ.get(VARIABLE_ENTORNO_JSONL)
+        self.emitir = emitir
+        self.al_terminar = al_terminar
+        self.etapas = []
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nombre, registros=None, bases=None, ramas=(), simultaneas=False):
+        """
+        Context manager que mide una etapa.
+
+        Devuelve un dict mutable: se pueden fijar 'registros' y 'bases' dentro
+        del bloque cuando solo se conocen al terminar la etapa.
+
+        ramas son mediciones de la misma etapa hechas en otros medidores (ej:
+        una por especie, ver pipeline.procesar_especie) que se suman a la del
+        bloque: sus segundos se suman, o se toma el mayor si las ramas se
+        ejecutaron a la vez (simultaneas); el tiempo de CPU, los registros y
+        las bases se suman, y del RSS se toma el mayor.
+        """
+        medicion = {'etapa': nombre, 'registros': registros, 'bases': bases}
+        if ramas:
+            for clave in ('registros', 'bases'):
+                if medicion[clave] is None:
+                    medicion[clave] = sum(rama[clave] or 0 for rama in ramas)
+        rss_antes = rss_pico_mb()
+        cpu_inicio = time.process_time()
+        inicio = time.perf_counter()
+        estado = 'OK'
+        try:
+            yield medicion
+        except BaseException:
+            estado = 'ERROR'
+            raise
+        finally:
+            segundos = time.perf_counter() - inicio
+            cpu_segundos = time.process_time() - cpu_inicio
+            rss_despues = rss_pico_mb()
+            delta_rss = rss_despues - rss_antes if rss_despues is not None else None
+            if ramas:
+                segundos_ramas = [rama['segundos'] for rama in ramas]
+                segundos += max(segundos_ramas) if simultaneas else sum(segundos_ramas)
+                cpu_segundos += sum(rama['cpu_segundos'] for rama in ramas)
+                if rss_despues is not None:
+                    rss_despues = max([rss_despues] + [rama['rss_pico_mb'] for rama in ramas if rama['rss_pico_mb'] is not None])
+                    delta_rss = max([delta_rss] + [rama['delta_rss_pico_mb'] for rama in ramas if rama['delta_rss_pico_mb'] is not None])
+            medicion.update({
+                'estado': estado,
+                'segundos': round(segundos, 6),
+                'cpu_segundos': round(cpu_segundos, 6),
+                'rss_pico_mb': round(rss_despues, 1) if rss_despues is not None else None,
+                'delta_rss_pico_mb': round(delta_rss, 1) if delta_rss is not None else None,
+                'bases_por_segundo': round(medicion['bases'] / segundos) if medicion['bases'] and segundos > 0 else None,
+            })
+            self.etapas.append(medicion)
+            if self.emitir:
+                self._emitir(medicion)
+            if self.al_terminar is not None:
+                self.al_terminar(medicion)
+
+    def _emitir(self, medicion):
+        """Escribe la medición como una línea JSON."""
+        linea = json.dumps({**self.contexto, **medicion}, ensure_ascii=False)
+        if self.ruta_jsonl:
+            try:
+                with open(self.ruta_jsonl, 'a', encoding='utf-8') as f:
+                    f.write(linea + '\n')
+                return
+            except OSError:
+                pass
+        print(linea)
+
+    def resumen(self):
+        """
+        Devuelve todas las mediciones.
+
+        Retorna:
+        --------
+        dict
+            {'contexto': {...}, 'total_segundos': float, 'etapas': [dict, ...]}
+        """
+        return {
+            'contexto': self.contexto,
+            'total_segundos': round(time.perf_counter() - self._inicio, 6),
+            'etapas': list(self.etapas),
+        }
@@ -0,0 +1,105 @@
+import mmap
+import os
+
+# Tabla para bytes.translate: pasa a mayúsculas y borra todo lo que no sea A, C, G, T o N.
+# Equivale a la normalización de limpiar_y_normalizar_secuencias, pero en una sola
+# pasada en C (incluye la eliminación de saltos de línea, espacios y tabs).
+_TABLA_MAYUSCULAS = bytes.maketrans(b'acgtn', b'ACGTN')
+_BYTES_NO_VALIDOS = bytes(b for b in range(256) if b not in b'ACGTNacgtn')
+
+
+def normalizar_bytes(region):
+    """
+    Normaliza una región de secuencia en bruto (con saltos de línea).
+
+    Parámetros:
+    -----------
+    region : bytes o memoryview
+        Bytes de la secuencia tal como están en el archivo
+
+    Retorna:
+    --------
+    bytes
+        Secuencia en mayúsculas con solo A, C, G, T y N
+    """
+    return bytes(region).translate(_TABLA_MAYUSCULAS, _BYTES_NO_VALIDOS)
+
+
+def es_compatible_mmap(datos):
+    """
+    Indica si el contenido puede leerse con el parser rápido.
+
+    El parser rápido cubre el FASTA habitual: el contenido empieza directamente
+    por una cabecera '>'. Cualquier otra cosa (texto previo, comentarios, BOM)
+    se deja a Biopython.
+    """
+    return len(datos) > 0 and datos[:1] == b'>'
+
+
+def iterar_registros_mmap(datos, codificacion='utf-8'):
+    """
+    Recorre los registros de un FASTA en memoria sin crear objetos SeqRecord.
+
+    Los límites de registro se localizan con bytes.find sobre el buffer (por
+    ejemplo un mmap del archivo) y cada secuencia se normaliza con una única
+    llamada a bytes.translate.
+
+    Parámetros:
+    -----------
+    datos : mmap.mmap o bytes
+        Contenido completo del FASTA (sin comprimir)
+    codificacion : str
+        Codificación usada para decodificar las cabeceras
+
+    Retorna:
+    --------
+    generator
+        Tuplas (id_secuencia, secuencia) donde secuencia son bytes en mayúsculas
+        con solo A, C, G, T y N. Se pueden pasar directamente a numpy con
+        np.frombuffer o a los núcleos de src.codificacion.
+
+    Lanza:
+    ------
+    ValueError: Si un registro no tiene identificador válido
+    """
+    total = len(datos)
+    inicio = 0
+    while inicio < total:
+        fin_cabecera = datos.find(b'\n', inicio)
+        if fin_cabecera == -1:
+            fin_cabecera = total
+        siguiente = datos.find(b'\n>', fin_cabecera)
+        fin_registro = total if siguiente == -1 else siguiente + 1
+
+        titulo = datos[inicio + 1:fin_cabecera].decode(codificacion, errors='replace').strip()
+        partes = titulo.split(None, 1)
+        if not partes:
+            raise ValueError("El archivo FASTA contiene secuencias sin identificador válido. Verifique el formato del archivo.")
+
+        yield partes[0], normalizar_bytes(datos[fin_cabecera:fin_registro])
+        inicio = fin_registro
+
+
+def abrir_mmap(ruta_archivo):
+    """
+    Mapea un archivo en memoria en modo solo lectura.
+
+    Retorna:
+    --------
+    tuple
+        (archivo abierto, mmap). El llamador debe cerrar ambos.
+    """
+    f = open(ruta_archivo, 'rb')
+    try:
+        return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        f.close()
+        raise
+
+
+def puede_usar_mmap(ruta_archivo):
+    """Indica si un archivo en disco es apto para el parser rápido (no vacío ni comprimido)."""
+    if not os.path.isfile(ruta_archivo) or os.path.getsize(ruta_archivo) == 0:
+        return False
+    with open(ruta_archivo, 'rb') as f:
+        return es_compatible_mmap(f.read(1))
@@ -0,0 +1,241 @@
+"""
+Ejecución en paralelo de las ramas por especie de un análisis.
+
+Salmonella y Gallus son independientes hasta unir el uso de codones y
+dibujar los gráficos: cada especie se carga, valida, filtra, limpia y cuenta
+en su propio proceso (ejecutar_ramas) y el proceso principal solo une los
+resultados.
+
+Las rutas se pasan tal cual a cada proceso; los contenidos en memoria
+(bytes o archivos subidos) se copian una vez a memoria compartida en lugar
+de serializarlos por la tubería del pool.
+
+Con SALMO_RAMAS_PARALELAS=0 las ramas se ejecutan siempre una tras otra en
+el proceso actual.
+"""
+import concurrent.futures
+import contextlib
+import io
+import multiprocessing
+import os
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+VARIABLE_ENTORNO_RAMAS = "SALMO_RAMAS_PARALELAS"
+
+# Por debajo de este tamaño total de las entradas, arrancar procesos cuesta
+# más de lo que se gana
+MIN_BYTES_PARALELO = 8 * 1024 * 1024
+
+TAM_BLOQUE_COPIA = 8 * 1024 * 1024
+
+# Módulos que el servidor de procesos (forkserver) importa una sola vez
+_MODULOS_PRECARGADOS = ['src.pipeline']
+
+
+def copiar_a_memoria_compartida(fuente):
+    """
+    Copia un contenido FASTA (bytes o archivo binario) a un bloque de memoria compartida.
+
+    Retorna:
+    --------
+    tuple
+        (bloque, tamaño): el bloque puede ser mayor que el contenido (algunas
+        plataformas redondean a páginas) y es None si el contenido está vacío
+    """
+    if isinstance(fuente, (bytes, bytearray, memoryview)):
+        datos = memoryview(fuente).cast('B')
+        tamano = datos.nbytes
+    else:
+        fuente.seek(0, os.SEEK_END)
+        tamano = fuente.tell()
+        fuente.seek(0)
+        datos = None
+
+    # SharedMemory no admite tamaño 0: un archivo vacío se pasa como b''
+    if tamano == 0:
+        return None, 0
+    bloque = shared_memory.SharedMemory(create=True, size=tamano)
+    try:
+        if datos is not None:
+            bloque.buf[:tamano] = datos
+        else:
+            posicion = 0
+            while posicion < tamano:
+                leido = fuente.readinto(bloque.buf[posicion:min(posicion + TAM_BLOQUE_COPIA, tamano)])
+                if not leido:
+                    raise ValueError("El archivo subido cambió de tamaño durante la lectura")
+                posicion += leido
+            fuente.seek(0)
+    except BaseException:
+        bloque.close()
+        bloque.unlink()
+        raise
+    return bloque, tamano
+
+
+@contextlib.contextmanager
+def abrir_memoria_compartida(nombre, tamano):
+    """Vista (memoryview) de tamano bytes de un bloque creado con copiar_a_memoria_compartida."""
+    if nombre is None:
+        yield b''
+        return
+    bloque = shared_memory.SharedMemory(name=nombre)
+    vista = bloque.buf[:tamano]
+    try:
+        yield vista
+    finally:
+        vista.release()
+        bloque.close()
+
+
+def _es_ruta(fuente):
+    return isinstance(fuente, (str, os.PathLike))
+
+
+def tamano_entrada(fuente):
+    """Tamaño en bytes de una ruta o contenido FASTA (0 si no se conoce)."""
+    try:
+        if _es_ruta(fuente):
+            return os.path.getsize(fuente)
+        if isinstance(fuente, (bytes, bytearray, memoryview)):
+            return memoryview(fuente).nbytes
+        posicion = fuente.tell()
+        tamano = fuente.seek(0, os.SEEK_END)
+        fuente.seek(posicion)
+        return tamano
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        return 0
+
+
+def ramas_paralelas_posibles():
+    """
+    Indica si el proceso actual puede repartir las ramas en procesos hijos.
+
+    No, si hay un solo núcleo, si SALMO_RAMAS_PARALELAS=0 o si el proceso es
+    un daemon (los procesos daemon no pueden tener hijos).
+    """
+    if os.environ.get(VARIABLE_ENTORNO_RAMAS, "").strip().lower() in ('0', 'false', 'no'):
+        return False
+    if (os.cpu_count() or 1) < 2:
+        return False
+    return not multiprocessing.current_process().daemon
+
+
+def usar_procesos(ramas, paralelo=None):
+    """
+    Decide si ejecutar_ramas repartirá las ramas en procesos.
+
+    Parámetros:
+    -----------
+    ramas : list
+        (fuente, argumentos) por rama, como en ejecutar_ramas
+    paralelo : bool, optional
+        True o False fuerzan el modo; None (por defecto) usa procesos si
+        ramas_paralelas_posibles() y las entradas suman al menos
+        MIN_BYTES_PARALELO
+    """
+    if paralelo is not None:
+        return bool(paralelo) and len(ramas) > 1
+    return (
+        len(ramas) > 1
+        and ramas_paralelas_posibles()
+        and sum(tamano_entrada(fuente) for fuente, _ in ramas) >= MIN_BYTES_PARALELO
+    )
+
+
+def _contexto_procesos():
+    """forkserver (con src.pipeline ya importado) donde exista; spawn en el resto."""
+    # fork no es seguro: la app y el backend tienen hilos
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        contexto = multiprocessing.get_context('forkserver')
+        contexto.set_forkserver_preload(_MODULOS_PRECARGADOS)
+        return contexto
+    return multiprocessing.get_context('spawn')
+
+
+def _ejecutar_rama(funcion, nombre_memoria, tamano, fuente, argumentos):
+    """
+    Proceso hijo: ejecuta una rama capturando su salida.
+
+    La salida se devuelve al proceso principal, que la escribe en su propia
+    salida estándar (así respeta redirecciones como la de batch.py y no se
+    mezclan las líneas de las dos especies).
+    """
+    salida = io.StringIO()
+    with contextlib.ExitStack() as pila:
+        if fuente is None:
+            fuente = pila.enter_context(abrir_memoria_compartida(nombre_memoria, tamano))
+        pila.enter_context(contextlib.redirect_stdout(salida))
+        try:
+            resultado = funcion(fuente, *argumentos)
+        except Exception as e:
+            e.salida_rama = salida.getvalue()
+            if isinstance(e, OSError):
+                # filename asignado tras crear la excepción no sobrevive a pickle
+                e.archivo_rama = e.filename
+            raise
+    return resultado, salida.getvalue()
+
+
+def ejecutar_ramas(funcion, ramas, paralelo=None):
+    """
+    Ejecuta funcion(fuente, *argumentos) para cada rama, en paralelo si conviene.
+
+    Parámetros:
+    -----------
+    funcion : callable
+        Función de nivel de módulo (se ejecuta en otro proceso)
+    ramas : list
+        (fuente, argumentos) por rama; fuente es una ruta o un contenido
+        FASTA (bytes, memoryview o archivo binario)
+    paralelo : bool, optional
+        Ver usar_procesos
+
+    Retorna:
+    --------
+    list
+        El resultado de cada rama, en el orden de ramas
+
+    Lanza:
+    ------
+    La excepción de la primera rama (en orden) que falle.
+    MemoryError: Si un proceso terminó inesperadamente
+    """
+    if not usar_procesos(ramas, paralelo):
+        return [funcion(fuente, *argumentos) for fuente, argumentos in ramas]
+
+    bloques = []
+    try:
+        tareas = []
+        for fuente, argumentos in ramas:
+            if _es_ruta(fuente):
+                tareas.append((None, 0, fuente, argumentos))
+            else:
+                bloque, tamano = copiar_a_memoria_compartida(fuente)
+                bloques.append(bloque)
+                tareas.append((bloque.name if bloque is not None else None, tamano, None, argumentos))
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=len(tareas), mp_context=_contexto_procesos()) as pool:
+            futuros = [pool.submit(_ejecutar_rama, funcion, *tarea) for tarea in tareas]
+            concurrent.futures.wait(futuros)
+
+        resultados = []
+        for futuro in futuros:
+            try:
+                resultado, salida = futuro.result()
+            except BrokenProcessPool:
+                raise MemoryError("Un proceso del análisis terminó inesperadamente (posible falta de memoria).")
+            except Exception as e:
+                print(getattr(e, 'salida_rama', ''), end='')
+                if isinstance(e, OSError) and e.filename is None:
+                    e.filename = getattr(e, 'archivo_rama', None)
+                raise
+            print(salida, end='')
+            resultados.append(resultado)
+        return resultados
+    finally:
+        for bloque in bloques:
+            if bloque is not None:
+                bloque.close()
+                bloque.unlink()
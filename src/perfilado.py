@@ -0,0 +1,151 @@
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Activa el perfilado en la app y en AnalysisClient: 'cprofile' o 'tracemalloc'
+VARIABLE_ENTORNO_PERFIL = "SALMO_PERFIL"
+
+MODOS_PERFIL = ('cprofile', 'tracemalloc')
+
+# Número de entradas incluidas en los informes de texto
+LINEAS_INFORME = 60
+
+
+def modo_perfil_desde_entorno():
+    """
+    Lee el modo de perfilado de la variable de entorno SALMO_PERFIL.
+
+    Retorna:
+    --------
+    str o None
+        'cprofile', 'tracemalloc' o None si el perfilado está desactivado
+
+    Lanza:
+    ------
+    ValueError: Si la variable tiene un valor no reconocido
+    """
+    valor = os.environ.get(VARIABLE_ENTORNO_PERFIL, '').strip().lower()
+    if valor in ('', '0', 'no', 'off', 'false'):
+        return None
+    return validar_modo_perfil(valor)
+
+
+def validar_modo_perfil(modo):
+    """Comprueba que el modo de perfilado sea uno de MODOS_PERFIL."""
+    if modo is not None and modo not in MODOS_PERFIL:
+        raise ValueError(
+            f"Modo de perfilado no válido: '{modo}'. Use uno de: {', '.join(MODOS_PERFIL)}"
+        )
+    return modo
+
+
+class Perfilador:
+    """
+    Captura un perfil del análisis y lo guarda junto a los resultados.
+
+    - 'cprofile': perfil de llamadas (perfil_cprofile.prof, legible con pstats
+      o snakeviz) y un resumen ordenado por tiempo acumulado (perfil_cprofile.txt).
+    - 'tracemalloc': snapshot de memoria (perfil_tracemalloc.snapshot, legible
+      con tracemalloc.Snapshot.load) y las líneas que más memoria reservan
+      (perfil_tracemalloc.txt).
+
+    Con modo None no hace nada, para poder dejarlo siempre en el flujo.
+    """
+
+    def __init__(self, modo, directorio_salida):
+        self.modo = validar_modo_perfil(modo)
+        self.directorio_salida = str(directorio_salida)
+        self.artefactos = []
+        self._perfil = None
+        self._inicio = None
+        self._activo = False
+
+    def iniciar(self):
+        """Empieza a perfilar el hilo actual (cprofile) o todas las reservas (tracemalloc)."""
+        if self.modo is None or self._activo:
+            return
+        self._inicio = time.perf_counter()
+        if self.modo == 'cprofile':
+            self._perfil = cProfile.Profile()
+            self._perfil.enable()
+        else:
+            tracemalloc.start()
+        self._activo = True
+        print(f" Perfilado activo ({self.modo})")
+
+    def detener(self):
+        """
+        Detiene el perfilado y escribe los artefactos. Llamarlo dos veces no tiene efecto.
+
+        Retorna:
+        --------
+        list
+            Rutas de los archivos generados
+        """
+        if not self._activo:
+            return self.artefactos
+        self._activo = False
+        segundos = time.perf_counter() - self._inicio
+        os.makedirs(self.directorio_salida, exist_ok=True)
+
+        if self.modo == 'cprofile':
+            self._perfil.disable()
+            self._guardar_cprofile(segundos)
+        else:
+            snapshot = tracemalloc.take_snapshot()
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self._guardar_tracemalloc(snapshot, pico, segundos)
+
+        print(f" Perfil guardado en: {self.directorio_salida}")
+        return self.artefactos
+
+    def _guardar_cprofile(self, segundos):
+        ruta_prof = os.path.join(self.directorio_salida, 'perfil_cprofile.prof')
+        self._perfil.dump_stats(ruta_prof)
+
+        texto = io.StringIO()
+        texto.write(f"Tiempo total perfilado: {segundos:.3f} s\n\n")
+        estadisticas = pstats.Stats(self._perfil, stream=texto)
+        estadisticas.sort_stats('cumulative').print_stats(LINEAS_INFORME)
+        ruta_txt = os.path.join(self.directorio_salida, 'perfil_cprofile.txt')
+        with open(ruta_txt, 'w', encoding='utf-8') as f:
+            f.write(texto.getvalue())
+
+        self.artefactos.extend([ruta_prof, ruta_txt])
+
+    def _guardar_tracemalloc(self, snapshot, pico, segundos):
+        ruta_snapshot = os.path.join(self.directorio_salida, 'perfil_tracemalloc.snapshot')
+        snapshot.dump(ruta_snapshot)
+
+        ruta_txt = os.path.join(self.directorio_salida, 'perfil_tracemalloc.txt')
+        with open(ruta_txt, 'w', encoding='utf-8') as f:
+            f.write(f"Tiempo total perfilado: {segundos:.3f} s\n")
+            f.write(f"Pico de memoria trazada: {pico / 1024 ** 2:.1f} MB\n\n")
+            f.write(f"Top {LINEAS_INFORME} líneas por memoria reservada (aún viva):\n")
+            for estadistica in snapshot.statistics('lineno')[:LINEAS_INFORME]:
+                f.write(f"{estadistica}\n")
+
+        self.artefactos.extend([ruta_snapshot, ruta_txt])
+
+
+@contextmanager
+def perfilar(modo, directorio_salida):
+    """
+    Context manager sobre Perfilador.
+
+    Uso:
+        with perfilar('cprofile', 'results/perfiles') as artefactos:
+            ejecutar_analisis()
+        # artefactos contiene las rutas generadas
+    """
+    perfilador = Perfilador(modo, directorio_salida)
+    perfilador.iniciar()
+    try:
+        yield perfilador.artefactos
+    finally:
+        perfilador.detener()
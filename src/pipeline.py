@@ -0,0 +1,379 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from .procesamiento import (
+    cargar_secuencias,
+    cargar_secuencias_desde_buffer,
+    calcular_metricas_codificadas,
+    validar_secuencias
+)
+from .analisis import calcular_uso_codones_codificadas
+from .bloques import resumir_fasta_por_bloques
+from .codificacion import POLITICAS_NS, SecuenciasCodificadas
+from .instrumentacion import MedidorEtapas, contar_bases
+from .paralelo import ejecutar_ramas, usar_procesos
+from .tabla_columnar import escribir_tabla_columnar
+
+# Parámetros por defecto del análisis (los mismos que ofrece la app).
+# politica_ns=None mantiene el significado de limpiar_ns: 'imputar' (N -> A)
+# si es True y 'conservar' si es False.
+PARAMETROS_POR_DEFECTO = {
+    'min_len': 0,
+    'limpiar_ns': True,
+    'top_codons': 20,
+    'politica_ns': None,
+    'fraccion_max_ns': 0.1,
+    # Bytes por bloque para leer registros muy largos sin cargarlos enteros
+    # (0: cada registro se carga completo)
+    'tam_bloque': 0,
+}
+
+
+def cargar_fuente(fuente, especie):
+    """
+    Carga las secuencias de una especie desde una ruta o un contenido en memoria.
+
+    Parámetros:
+    -----------
+    fuente : str, Path, bytes, memoryview o archivo binario
+        Ruta a un FASTA (plano o comprimido) o su contenido
+    especie : str
+        Nombre de la especie, para los mensajes de error
+
+    Lanza:
+    ------
+    ValueError: Si el archivo no existe o no se puede leer
+    """
+    try:
+        if isinstance(fuente, (str, os.PathLike)):
+            return cargar_secuencias(str(fuente))
+        return cargar_secuencias_desde_buffer(fuente, especie)
+    except (ValueError, FileNotFoundError) as e:
+        raise ValueError(f"Error al cargar el archivo FASTA de {especie}: {str(e)}")
+
+
+def cargar_fuente_por_bloques(fuente, especie, tam_bloque):
+    """
+    Como cargar_fuente, pero resumiendo cada registro por bloques (ver src/bloques.py).
+
+    Lanza:
+    ------
+    ValueError: Si el archivo no existe o no se puede leer
+    """
+    try:
+        return resumir_fasta_por_bloques(fuente, especie, tam_bloque)
+    except (ValueError, FileNotFoundError) as e:
+        raise ValueError(f"Error al cargar el archivo FASTA de {especie}: {str(e)}")
+
+
+def resolver_politica_ns(params):
+    """
+    Política de Ns efectiva de unos parámetros (ver codificacion.POLITICAS_NS).
+
+    Lanza:
+    ------
+    ValueError: Si politica_ns no es una política conocida
+    """
+    politica = params.get('politica_ns') or ('imputar' if params.get('limpiar_ns') else 'conservar')
+    if politica not in POLITICAS_NS:
+        raise ValueError(f"Política de Ns no válida: '{politica}'. Opciones: {', '.join(POLITICAS_NS)}")
+    return politica
+
+
+def grafico_top_codones(df_codones, top_codons):
+    """
+    Gráfico de barras de los top_codons codones más frecuentes.
+
+    Variante de visualizacion.uso_codones_top20 con número de codones
+    configurable. Genera results/graficos/uso_codones_top20.png y retorna
+    el número de codones dibujados.
+    """
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    df_codones_copy = df_codones.copy()
+    df_codones_copy['promedio'] = (
+        df_codones_copy['frecuencia_salmonella'] +
+        df_codones_copy['frecuencia_gallus']
+    ) / 2
+    top_codones_df = df_codones_copy.nlargest(top_codons, 'promedio')
+
+    plt.figure(figsize=(12, 8))
+    x = np.arange(len(top_codones_df))
+    width = 0.35
+
+    plt.bar(x - width/2, top_codones_df['frecuencia_salmonella'], width,
+            label='Salmonella', alpha=0.8)
+    plt.bar(x + width/2, top_codones_df['frecuencia_gallus'], width,
+            label='Gallus', alpha=0.8)
+
+    plt.xlabel('Codones')
+    plt.ylabel('Frecuencia de Uso')
+    plt.title(f'Top {top_codons} Codones Más Frecuentes - Comparación entre Especies')
+    plt.xticks(x, top_codones_df['codon'], rotation=45)
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    plt.savefig('results/graficos/uso_codones_top20.png', dpi=300, bbox_inches='tight')
+    plt.close()
+    return len(top_codones_df)
+
+
+# Etapas de ejecutar_pipeline en orden (nombres de MedidorEtapas)
+ETAPAS_PIPELINE = (
+    'cargar', 'validar', 'filtrar', 'limpiar', 'metricas', 'codones',
+    'grafico:salmonella_gc', 'grafico:gallus_gc',
+    'grafico:distribucion_longitudes', 'grafico:distribucion_gc',
+    'grafico:relacion_longitud_gc', 'grafico:correlacion_codones',
+    'grafico:heatmap_codones', 'grafico:distribucion_acumulativa_longitudes',
+    'grafico:uso_codones_top20',
+)
+
+
+def artefacto_de_etapa(etapa):
+    """
+    Archivo (relativo a results/) que queda escrito al terminar una etapa.
+
+    Permite publicar resultados parciales: las tablas están listas mucho
+    antes que los gráficos.
+
+    Retorna:
+    --------
+    str o None
+        'resumen_metricas.csv', 'codon_usage.csv', 'graficos/<nombre>.png'
+        o None si la etapa no escribe ningún archivo
+    """
+    if etapa == 'metricas':
+        return 'resumen_metricas.csv'
+    if etapa == 'codones':
+        return 'codon_usage.csv'
+    if etapa.startswith('grafico:'):
+        return f"graficos/{etapa.split(':', 1)[1]}.png"
+    return None
+
+
+def generar_graficos(df_salmonella, df_gallus, df_metricas, df_codones, top_codons, medidor):
+    """Genera todos los gráficos en results/graficos (relativo al directorio actual)."""
+    from .visualizacion import (
+        grafico_gc,
+        distribucion_longitudes,
+        distribucion_gc,
+        relacion_longitud_gc,
+        correlacion_codones,
+        heatmap_codones,
+        distribucion_acumulativa_longitudes
+    )
+
+    with medidor.etapa('grafico:salmonella_gc', registros=len(df_salmonella)):
+        grafico_gc(df_salmonella, "salmonella")
+    with medidor.etapa('grafico:gallus_gc', registros=len(df_gallus)):
+        grafico_gc(df_gallus, "gallus")
+
+    graficos = [
+        ('distribucion_longitudes', distribucion_longitudes, df_metricas),
+        ('distribucion_gc', distribucion_gc, df_metricas),
+        ('relacion_longitud_gc', relacion_longitud_gc, df_metricas),
+        ('correlacion_codones', correlacion_codones, df_codones),
+        ('heatmap_codones', heatmap_codones, df_codones),
+        ('distribucion_acumulativa_longitudes', distribucion_acumulativa_longitudes, df_metricas),
+    ]
+    for nombre, funcion, datos in graficos:
+        with medidor.etapa(f'grafico:{nombre}', registros=len(datos)):
+            funcion(datos)
+
+    with medidor.etapa('grafico:uso_codones_top20', registros=len(df_codones)) as etapa:
+        etapa['codones_solicitados'] = top_codons
+        etapa['codones'] = grafico_top_codones(df_codones, top_codons)
+
+
+# Etapas que cada especie recorre por separado (ver procesar_especie)
+ETAPAS_RAMA = ('cargar', 'validar', 'filtrar', 'limpiar', 'metricas', 'codones')
+
+
+def procesar_especie(fuente, especie, params):
+    """
+    Rama de una especie: cargar, validar, filtrar, limpiar, métricas y uso de codones.
+
+    Salmonella y Gallus no dependen una de otra hasta unir el uso de codones:
+    ejecutar_pipeline ejecuta una rama por especie, en paralelo si conviene
+    (ver src/paralelo.py).
+
+    Parámetros:
+    -----------
+    fuente : str, Path, bytes, memoryview o archivo binario
+        Ruta o contenido del FASTA (plano o comprimido)
+    especie : str
+        'Salmonella' o 'Gallus'
+    params : dict
+        Parámetros completos (ver PARAMETROS_POR_DEFECTO)
+
+    Retorna:
+    --------
+    dict
+        {'metricas': DataFrame, 'codones': DataFrame, 'etapas': {nombre: medición}}
+
+    Lanza:
+    ------
+    ValueError: Si el archivo no se puede cargar o contiene caracteres inválidos.
+        La excepción lleva en etapas_rama las mediciones hasta el fallo
+    """
+    politica_ns = resolver_politica_ns(params)
+    tam_bloque = params['tam_bloque']
+    medidor = MedidorEtapas(emitir=False)
+    try:
+        # 1. Cargar (en flujo, sin archivos temporales); por bloques, cada
+        # registro se resume al leerlo y no se guarda su secuencia
+        with medidor.etapa('cargar') as etapa:
+            if tam_bloque > 0:
+                secuencias = cargar_fuente_por_bloques(fuente, especie, tam_bloque)
+                etapa['registros'], etapa['bases'] = len(secuencias), secuencias.total_bases
+            else:
+                secuencias = cargar_fuente(fuente, especie)
+                etapa['registros'], etapa['bases'] = contar_bases(secuencias)
+
+        # 2. Validar (la lectura por bloques ya deja solo A, C, G, T y N)
+        with medidor.etapa('validar', registros=etapa['registros'], bases=etapa['bases']):
+            if tam_bloque <= 0 and not validar_secuencias(secuencias):
+                raise ValueError(f"Las secuencias de {especie} contienen caracteres inválidos. Solo se permiten A, T, C, G y N.")
+
+        # 3. Codificar en un buffer y filtrar por longitud mínima (el filtro solo
+        # selecciona tramos del buffer; las cadenas se liberan aquí)
+        with medidor.etapa('filtrar') as etapa:
+            if tam_bloque <= 0:
+                secuencias = SecuenciasCodificadas.desde_secuencias(secuencias)
+            secuencias = secuencias.filtrar_longitud(params['min_len'])
+            etapa['registros'], etapa['bases'] = len(secuencias), secuencias.total_bases
+
+        # 4. Tratar las Ns según la política (en el buffer, sin copias)
+        with medidor.etapa('limpiar', registros=etapa['registros'], bases=etapa['bases']) as etapa:
+            secuencias = secuencias.aplicar_politica_ns(politica_ns, params['fraccion_max_ns'])
+            etapa['registros'], etapa['bases'] = len(secuencias), secuencias.total_bases
+
+        # 5 y 6. Métricas y uso de codones de la especie
+        with medidor.etapa('metricas', registros=etapa['registros'], bases=etapa['bases']):
+            df_metricas = calcular_metricas_codificadas(secuencias)
+        with medidor.etapa('codones', registros=etapa['registros'], bases=etapa['bases']):
+            df_codones = calcular_uso_codones_codificadas(secuencias, especie.lower())
+    except Exception as e:
+        e.etapas_rama = medidor.etapas
+        raise
+
+    return {
+        'metricas': df_metricas,
+        'codones': df_codones,
+        'etapas': {medicion['etapa']: medicion for medicion in medidor.etapas},
+    }
+
+
+def ejecutar_pipeline(salmonella_fasta, gallus_fasta, params, directorio_trabajo, medidor=None, ramas_paralelas=None):
+    """
+    Ejecuta el análisis completo de un par Salmonella/Gallus.
+
+    Es el flujo común de la app (AnalysisClient en modo local) y del
+    procesamiento por lotes (batch.py): cargar, validar, filtrar, limpiar Ns,
+    métricas, uso de codones y gráficos. Hasta el uso de codones cada especie
+    es una rama independiente (procesar_especie); las dos ramas se ejecutan
+    en procesos separados cuando conviene y se unen para las tablas y los
+    gráficos.
+
+    Parámetros:
+    -----------
+    salmonella_fasta, gallus_fasta : str, Path, bytes o archivo binario
+        Ruta o contenido de cada FASTA (plano o comprimido)
+    params : dict
+        min_len, limpiar_ns, politica_ns, fraccion_max_ns, top_codons y
+        tam_bloque (ver PARAMETROS_POR_DEFECTO). Con tam_bloque > 0 cada FASTA
+        se lee por bloques (ver src/bloques.py): los resultados son los mismos
+        y la memoria no depende de la longitud de los registros
+    directorio_trabajo : str o Path
+        Los resultados se escriben en directorio_trabajo/results
+    medidor : MedidorEtapas, optional
+        Medidor donde registrar cada etapa (cada etapa de las ramas se
+        registra una vez, sumando las dos especies)
+    ramas_paralelas : bool, optional
+        True o False fuerzan o impiden ejecutar las ramas en procesos
+        separados; None (por defecto) decide según los núcleos y el tamaño de
+        las entradas (ver paralelo.usar_procesos)
+
+    Retorna:
+    --------
+    dict
+        {'resumen_csv_path', 'resumen_parquet_path', 'codon_csv_path', 'images'}
+        con rutas absolutas. resumen_parquet_path es la misma tabla de
+        métricas en Parquet, para consultarla por páginas (ver
+        src/tabla_columnar.py)
+
+    Lanza:
+    ------
+    ValueError: Si los archivos no se pueden cargar o contienen caracteres inválidos
+    MemoryError: Si el proceso de una rama terminó inesperadamente
+    """
+    params = {**PARAMETROS_POR_DEFECTO, **(params or {})}
+    politica_ns = resolver_politica_ns(params)
+    if medidor is None:
+        medidor = MedidorEtapas(emitir=False)
+
+    directorio_trabajo = Path(directorio_trabajo).absolute()
+    results_dir = directorio_trabajo / "results"
+    graficos_dir = results_dir / "graficos"
+    graficos_dir.mkdir(parents=True, exist_ok=True)
+
+    # 1-4. Una rama por especie: cargar, validar, filtrar, limpiar, métricas y codones
+    ramas = [(salmonella_fasta, ("Salmonella", params)), (gallus_fasta, ("Gallus", params))]
+    simultaneas = usar_procesos(ramas, ramas_paralelas)
+    try:
+        rama_salmonella, rama_gallus = ejecutar_ramas(procesar_especie, ramas, simultaneas)
+    except Exception as e:
+        # Solo se registra la etapa que falló: registrar las anteriores como
+        # terminadas anunciaría artefactos que no existen
+        fallidas = [m for m in getattr(e, 'etapas_rama', []) if m['estado'] == 'ERROR']
+        if fallidas:
+            with medidor.etapa(fallidas[-1]['etapa'], ramas=fallidas[-1:]):
+                raise
+        raise
+    # Cada etapa registra el parámetro que la controla
+    parametros_etapa = {'filtrar': {'min_len': params['min_len']}, 'limpiar': {'politica_ns': politica_ns}}
+    for nombre in ETAPAS_RAMA[:4]:
+        with medidor.etapa(nombre, ramas=[rama_salmonella['etapas'][nombre], rama_gallus['etapas'][nombre]],
+                           simultaneas=simultaneas) as etapa:
+            etapa.update(parametros_etapa.get(nombre, {}))
+
+    # 5. Métricas básicas de las dos especies
+    etapas_ramas = [rama_salmonella['etapas']['metricas'], rama_gallus['etapas']['metricas']]
+    with medidor.etapa('metricas', ramas=etapas_ramas, simultaneas=simultaneas):
+        df_salmonella = rama_salmonella['metricas']
+        df_gallus = rama_gallus['metricas']
+        df_metricas = pd.concat([df_salmonella, df_gallus], ignore_index=True)
+        metricas_path = results_dir / "resumen_metricas.csv"
+        df_metricas.to_csv(str(metricas_path), index=False)
+        metricas_parquet_path = results_dir / "resumen_metricas.parquet"
+        escribir_tabla_columnar(df_metricas, metricas_parquet_path)
+
+    # 6. Unir el uso de codones de las dos especies
+    etapas_ramas = [rama_salmonella['etapas']['codones'], rama_gallus['etapas']['codones']]
+    with medidor.etapa('codones', ramas=etapas_ramas, simultaneas=simultaneas):
+        df_codones = pd.merge(
+            rama_salmonella['codones'],
+            rama_gallus['codones'],
+            on="codon",
+            how="outer"
+        ).fillna(0).sort_values("codon").reset_index(drop=True)
+        codon_path = results_dir / "codon_usage.csv"
+        df_codones.to_csv(str(codon_path), index=False)
+
+    # 7. Gráficos: las funciones de visualización escriben en results/graficos relativo
+    directorio_original = os.getcwd()
+    try:
+        os.chdir(directorio_trabajo)
+        generar_graficos(df_salmonella, df_gallus, df_metricas, df_codones, params['top_codons'], medidor)
+    finally:
+        os.chdir(directorio_original)
+
+    return {
+        'resumen_csv_path': str(metricas_path),
+        'resumen_parquet_path': str(metricas_parquet_path),
+        'codon_csv_path': str(codon_path),
+        'images': [str(img) for img in graficos_dir.glob("*.png")],
+    }
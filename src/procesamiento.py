@@ -1,20 +1,208 @@
-from Bio import SeqIO
+import numpy as np
 import pandas as pd
+import codecs
+import io
 import os
 
+from .codificacion import contar_gc
+from .compresion import abrir_descomprimido
+from .lector_mmap import abrir_mmap, iterar_registros_mmap, puede_usar_mmap, es_compatible_mmap
+
+# Bytes que se inspeccionan para detectar la codificación del archivo
+TAM_PREFIJO_CODIFICACION = 64 * 1024
+
+MENSAJE_ERROR_CODIFICACION = (
+    "El archivo contiene caracteres especiales (como acentos, ñ, etc.) que no se pueden leer correctamente. "
+    "Por favor, guarde el archivo en formato UTF-8 o ASCII antes de subirlo. "
+    "Puede hacer esto abriendo el archivo en un editor de texto y guardándolo como 'UTF-8' o 'ASCII'."
+)
+
+
+class _LectorMemoryview(io.RawIOBase):
+    """Flujo de solo lectura sobre un buffer (bytes, bytearray, memoryview) sin copiarlo."""
+
+    def __init__(self, buffer):
+        self._vista = memoryview(buffer).cast('B')
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, destino):
+        restante = len(self._vista) - self._pos
+        n = min(len(destino), restante)
+        destino[:n] = self._vista[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+
+def detectar_codificacion(prefijo):
+    """
+    Detecta la codificación de un archivo FASTA a partir de sus primeros bytes.
+    
+    Parámetros:
+    -----------
+    prefijo : bytes
+        Primeros bytes del archivo (ver TAM_PREFIJO_CODIFICACION)
+        
+    Retorna:
+    --------
+    str
+        'utf-8-sig' si hay BOM, 'utf-8' si el prefijo es UTF-8 válido,
+        'latin-1' en caso contrario (latin-1 acepta cualquier byte)
+    """
+    if prefijo.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # final=False tolera un carácter multibyte cortado al final del prefijo
+        codecs.getincrementaldecoder('utf-8')().decode(prefijo, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def _abrir_flujo_binario(fuente):
+    """
+    Devuelve un flujo binario con peek() para bytes, memoryview o archivos abiertos.
+    
+    Los buffers en memoria se envuelven sin copiarse; los objetos tipo archivo
+    (ej: UploadedFile de Streamlit) se rebobinan y se leen por bloques.
+    """
+    if isinstance(fuente, (bytes, bytearray, memoryview)):
+        return io.BufferedReader(_LectorMemoryview(fuente))
+    if hasattr(fuente, 'seekable') and fuente.seekable():
+        fuente.seek(0)
+    if hasattr(fuente, 'peek'):
+        return fuente
+    return io.BufferedReader(fuente)
+
+
+def _iterar_registros(handle):
+    """Recorre los registros del FASTA uno a uno validando su identificador."""
+    # Biopython solo se necesita en la ruta lenta (flujos y archivos comprimidos)
+    from Bio import SeqIO
+
+    for registro in SeqIO.parse(handle, "fasta"):
+        # Verificar que el registro tenga un ID válido
+        if not registro.id or len(registro.id.strip()) == 0:
+            raise ValueError(f"El archivo FASTA contiene secuencias sin identificador válido. Verifique el formato del archivo.")
+        
+        # Entregar ID y secuencia (sin normalizar aún)
+        yield registro.id, str(registro.seq)
+
+
+def _leer_secuencias_de_flujo(flujo, origen):
+    """
+    Parsea y normaliza las secuencias de un flujo binario registro a registro.
+    
+    La codificación se detecta con un prefijo del flujo y la limpieza se aplica
+    a cada registro a medida que se lee, de modo que en memoria solo conviven
+    la lista de secuencias limpias y el registro en curso.
+    """
+    if hasattr(flujo, 'peek'):
+        prefijo = flujo.peek(TAM_PREFIJO_CODIFICACION)[:TAM_PREFIJO_CODIFICACION]
+    else:
+        prefijo = b''
+    codificacion = detectar_codificacion(prefijo)
+    
+    # errors='replace' evita fallar si más adelante aparece un byte no decodificable
+    # (solo puede afectar a cabeceras: las bases son siempre ASCII)
+    texto = io.TextIOWrapper(flujo, encoding=codificacion, errors='replace')
+    try:
+        secuencias = limpiar_y_normalizar_secuencias(_iterar_registros(texto))
+    finally:
+        # Soltar el flujo sin cerrarlo: el llamador (ej: Streamlit) puede seguir usándolo
+        texto.detach()
+    
+    # Verificar que se encontraron secuencias
+    if len(secuencias) == 0:
+        raise ValueError(f"El archivo FASTA no contiene secuencias válidas: {origen}. Verifique que el archivo tenga el formato correcto.")
+    
+    print(f" Cargadas {len(secuencias)} secuencias desde {origen}")
+    return secuencias
+
+
+def _leer_secuencias_de_datos(datos, origen):
+    """
+    Parser rápido: recorre un buffer FASTA (mmap o bytes) con bytes.find/translate.
+    
+    Evita los objetos SeqRecord/Seq de Biopython y normaliza cada secuencia en
+    una sola pasada en C. Produce las mismas secuencias que el camino de
+    Biopython seguido de limpiar_y_normalizar_secuencias, pero como bytes.
+    """
+    codificacion = detectar_codificacion(bytes(datos[:TAM_PREFIJO_CODIFICACION]))
+    # Las secuencias quedan como bytes (solo A, C, G, T y N): sin copias str por secuencia
+    secuencias = list(iterar_registros_mmap(datos, codificacion))
+    
+    print(f" Cargadas {len(secuencias)} secuencias desde {origen}")
+    print(f" Secuencias normalizadas: {len(secuencias)} secuencias procesadas correctamente")
+    return secuencias
+
+
+def _traducir_error_carga(e, origen):
+    """Convierte un error de parsing en un ValueError con mensaje descriptivo."""
+    if isinstance(e, ValueError):
+        # Re-lanzar ValueError con mensaje descriptivo (ya incluye mensajes claros)
+        return e
+    if isinstance(e, UnicodeDecodeError):
+        return ValueError(MENSAJE_ERROR_CODIFICACION)
+    
+    error_msg = str(e).lower()
+    
+    # Detectar específicamente errores de codificación
+    if "codec" in error_msg or "decode" in error_msg or "ascii" in error_msg or "utf" in error_msg:
+        return ValueError(MENSAJE_ERROR_CODIFICACION)
+    elif "empty" in error_msg or "no sequences" in error_msg:
+        return ValueError(f"El archivo FASTA está vacío o no contiene secuencias válidas: {origen}")
+    elif "format" in error_msg or "parse" in error_msg:
+        return ValueError(f"El archivo FASTA está corrupto o tiene un formato inválido: {origen}. Verifique que el archivo tenga el formato FASTA correcto.")
+    else:
+        return ValueError(f"Error al cargar el archivo FASTA (archivo posiblemente corrupto): {origen}. Error: {str(e)}")
+
+
+def _contenido_en_memoria(fuente):
+    """
+    Contenido de fuente como bytes o bytearray (admiten find, como un mmap).
+
+    Los objetos con getvalue (BytesIO, UploadedFile de Streamlit) se sirven
+    sin copia; otros archivos que admiten seek se leen una vez. Retorna None
+    si la fuente es un flujo que no se puede rebobinar.
+    """
+    if isinstance(fuente, (bytes, bytearray)):
+        return fuente
+    if isinstance(fuente, memoryview):
+        if isinstance(fuente.obj, bytes) and fuente.nbytes == len(fuente.obj):
+            return fuente.obj
+        # Ej: la memoria compartida de services/pool_analisis.py (una copia en C)
+        return fuente.tobytes()
+    if hasattr(fuente, 'getvalue'):
+        return fuente.getvalue()
+    if hasattr(fuente, 'seekable') and fuente.seekable():
+        fuente.seek(0)
+        contenido = fuente.read()
+        fuente.seek(0)
+        return contenido
+    return None
+
+
 def cargar_secuencias(ruta_archivo):
     """
     Carga secuencias desde un archivo FASTA.
     
+    Los archivos comprimidos con gzip, BGZF o zstd se detectan por su firma
+    y se descomprimen en flujo (BGZF en paralelo).
+    
     Parámetros:
     -----------
     ruta_archivo : str
-        Ruta al archivo FASTA (ej: "data/salmonella_genes.fasta")
+        Ruta al archivo FASTA (ej: "data/salmonella_genes.fasta" o "data/salmonella_genes.fasta.gz")
         
     Retorna:
     --------
     list
-        Lista de tuplas (id_secuencia, secuencia) para cada secuencia en el archivo
+        Lista de tuplas (id_secuencia, secuencia) para cada secuencia en el archivo.
+        Con el parser rápido (FASTA plano) la secuencia son bytes con solo
+        A, C, G, T y N; por Biopython (comprimidos), str
         
     Conectado con:
     --------------
@@ -34,85 +222,84 @@ def cargar_secuencias(ruta_archivo):
     if os.path.getsize(ruta_archivo) == 0:
         raise ValueError(f"El archivo FASTA está vacío: {ruta_archivo}")
     
-    secuencias = []
     try:
-        # Intentar detectar y manejar la codificación del archivo
-        # Primero intentamos con UTF-8, luego con otras codificaciones comunes
-        codificaciones = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-        archivo_parseado = False
-        
-        for encoding in codificaciones:
+        # Camino rápido: FASTA plano mapeado en memoria; Biopython queda como respaldo
+        # para archivos comprimidos o con formato poco habitual
+        if puede_usar_mmap(ruta_archivo):
+            f, datos = abrir_mmap(ruta_archivo)
             try:
-                # Abrir el archivo con la codificación especificada y parsearlo
-                with open(ruta_archivo, 'r', encoding=encoding) as f:
-                    registros = list(SeqIO.parse(f, "fasta"))
-                    archivo_parseado = True
-                    break
-            except UnicodeDecodeError:
-                # Intentar con la siguiente codificación
-                continue
-            except Exception:
-                # Si es otro tipo de error, intentar con la siguiente codificación
-                continue
+                return _leer_secuencias_de_datos(datos, ruta_archivo)
+            finally:
+                datos.close()
+                f.close()
         
-        # Si no se pudo parsear con ninguna codificación, intentar con el método por defecto
-        if not archivo_parseado:
+        with open(ruta_archivo, 'rb') as f:
+            # Descompresión transparente de .gz, .bgz (en paralelo) y .zst
+            flujo = abrir_descomprimido(f)
             try:
-                registros = list(SeqIO.parse(ruta_archivo, "fasta"))
-            except UnicodeDecodeError as e:
-                # Error de codificación - proporcionar mensaje claro
-                raise ValueError(
-                    "El archivo contiene caracteres especiales (como acentos, ñ, etc.) que no se pueden leer correctamente. "
-                    "Por favor, guarde el archivo en formato UTF-8 o ASCII antes de subirlo. "
-                    "Puede hacer esto abriendo el archivo en un editor de texto y guardándolo como 'UTF-8' o 'ASCII'."
-                )
-        
-        # Verificar que se encontraron secuencias
-        if len(registros) == 0:
-            raise ValueError(f"El archivo FASTA no contiene secuencias válidas: {ruta_archivo}. Verifique que el archivo tenga el formato correcto.")
-        
-        for registro in registros:
-            # Verificar que el registro tenga un ID válido
-            if not registro.id or len(registro.id.strip()) == 0:
-                raise ValueError(f"El archivo FASTA contiene secuencias sin identificador válido. Verifique el formato del archivo.")
-            
-            # Guardar ID y secuencia (sin normalizar aún)
-            secuencias.append((registro.id, str(registro.seq)))
-        
-        print(f" Cargadas {len(secuencias)} secuencias desde {ruta_archivo}")
-        
-        # Limpiar y normalizar las secuencias
-        secuencias = limpiar_y_normalizar_secuencias(secuencias)
-        
-    except ValueError as e:
-        # Re-lanzar ValueError con mensaje descriptivo (ya incluye mensajes claros)
-        raise
-    except UnicodeDecodeError as e:
-        # Error de codificación - proporcionar mensaje claro y útil
-        raise ValueError(
-            "El archivo contiene caracteres especiales (como acentos, ñ, etc.) que no se pueden leer correctamente. "
-            "Por favor, guarde el archivo en formato UTF-8 o ASCII antes de subirlo. "
-            "Puede hacer esto abriendo el archivo en un editor de texto y guardándolo como 'UTF-8' o 'ASCII'."
-        )
+                return _leer_secuencias_de_flujo(flujo, ruta_archivo)
+            finally:
+                if flujo is not f:
+                    flujo.close()
     except Exception as e:
-        # Capturar otros errores de parsing (archivo corrupto, formato inválido, etc.)
-        error_msg = str(e).lower()
+        raise _traducir_error_carga(e, ruta_archivo) from e
+
+
+def cargar_secuencias_desde_buffer(fuente, nombre="buffer"):
+    """
+    Carga secuencias FASTA directamente desde memoria, sin archivo temporal.
+    
+    Un FASTA plano (bytes, bytearray, memoryview o archivo que admite seek)
+    se recorre con el parser rápido de iterar_registros_mmap; los comprimidos
+    se descomprimen en flujo. El contenido no se decodifica entero a str.
+    
+    Parámetros:
+    -----------
+    fuente : bytes, bytearray, memoryview o archivo binario
+        Contenido FASTA, plano o comprimido con gzip/BGZF/zstd
+        (ej: el UploadedFile de Streamlit, sus bytes o la memoria compartida
+        del pool de análisis)
+    nombre : str
+        Nombre para los mensajes de error (ej: "Salmonella")
+        
+    Retorna:
+    --------
+    list
+        Lista de tuplas (id_secuencia, secuencia) ya normalizadas, igual que
+        cargar_secuencias (secuencia en bytes con el parser rápido)
         
-        # Detectar específicamente errores de codificación
-        if "codec" in error_msg or "decode" in error_msg or "ascii" in error_msg or "utf" in error_msg:
-            raise ValueError(
-                "El archivo contiene caracteres especiales (como acentos, ñ, etc.) que no se pueden leer correctamente. "
-                "Por favor, guarde el archivo en formato UTF-8 o ASCII antes de subirlo. "
-                "Puede hacer esto abriendo el archivo en un editor de texto y guardándolo como 'UTF-8' o 'ASCII'."
-            )
-        elif "empty" in error_msg or "no sequences" in error_msg:
-            raise ValueError(f"El archivo FASTA está vacío o no contiene secuencias válidas: {ruta_archivo}")
-        elif "format" in error_msg or "parse" in error_msg:
-            raise ValueError(f"El archivo FASTA está corrupto o tiene un formato inválido: {ruta_archivo}. Verifique que el archivo tenga el formato FASTA correcto.")
-        else:
-            raise ValueError(f"Error al cargar el archivo FASTA (archivo posiblemente corrupto): {ruta_archivo}. Error: {str(e)}")
+    Lanza:
+    ------
+    ValueError: Si el contenido está vacío, corrupto o no es un FASTA válido
+    """
+    contenido = _contenido_en_memoria(fuente)
+    if contenido is not None:
+        if es_compatible_mmap(contenido):
+            # FASTA plano en memoria: camino rápido sin copias adicionales
+            try:
+                return _leer_secuencias_de_datos(contenido, nombre)
+            except Exception as e:
+                raise _traducir_error_carga(e, nombre) from e
+        # Comprimido o con formato poco habitual: en flujo sobre el contenido ya leído
+        fuente = contenido
     
-    return secuencias
+    flujo = _abrir_flujo_binario(fuente)
+    try:
+        if not flujo.peek(1):
+            raise ValueError(f"El archivo FASTA está vacío: {nombre}")
+        # Descompresión transparente de .gz, .bgz (en paralelo) y .zst
+        descomprimido = abrir_descomprimido(flujo)
+        try:
+            return _leer_secuencias_de_flujo(descomprimido, nombre)
+        finally:
+            if descomprimido is not flujo:
+                descomprimido.close()
+    except Exception as e:
+        raise _traducir_error_carga(e, nombre) from e
+    finally:
+        # Si se envolvió un archivo del llamador, soltarlo sin cerrarlo
+        if flujo is not fuente and not isinstance(fuente, (bytes, bytearray, memoryview)):
+            flujo.detach()
 
 def limpiar_y_normalizar_secuencias(secuencias):
     """
@@ -129,12 +316,12 @@ def limpiar_y_normalizar_secuencias(secuencias):
     secuencias : list
         Lista de tuplas (id_secuencia, secuencia) donde:
         - id_secuencia: es el ID de la secuencia
-        - secuencia: es la secuencia de ADN (puede contener espacios, minúsculas, etc.)
+        - secuencia: es la secuencia de ADN, str o bytes (puede contener espacios, minúsculas, etc.)
         
     Retorna:
     --------
     list
-        Lista de tuplas (id_secuencia, secuencia_limpia) con secuencias normalizadas
+        Lista de tuplas (id_secuencia, secuencia_limpia) con secuencias normalizadas (str)
         
     Lanza:
     ------
@@ -146,6 +333,10 @@ def limpiar_y_normalizar_secuencias(secuencias):
     secuencias_con_error = []
     
     for id_sec, sec in secuencias:
+        # cargar_secuencias entrega bytes con el parser rápido
+        if not isinstance(sec, str):
+            sec = bytes(sec).decode('latin-1')
+        
         # Normalizar: convertir a mayúsculas y eliminar espacios, saltos de línea, tabs, etc.
         sec_limpia = sec.upper().replace(' ', '').replace('\n', '').replace('\r', '').replace('\t', '')
         
@@ -193,7 +384,8 @@ def calcular_metricas_basicas(secuencias):
     Parámetros:
     -----------
     secuencias : list
-        Lista de tuplas (id_secuencia, secuencia) cargada desde FASTA
+        Lista de tuplas (id_secuencia, secuencia) cargada desde FASTA.
+        La secuencia puede ser str o bytes (ej: la salida de iterar_registros_mmap)
         
     Retorna:
     --------
@@ -214,9 +406,8 @@ def calcular_metricas_basicas(secuencias):
         longitud = len(sec)
         
         # Calcular contenido GC
-        count_g = sec.count('G')
-        count_c = sec.count('C')
-        porcentaje_gc = (count_g + count_c) / longitud * 100 if longitud > 0 else 0
+        count_gc = contar_gc(sec)
+        porcentaje_gc = count_gc / longitud * 100 if longitud > 0 else 0
         
         # Almacenar resultados
         datos.append({
@@ -231,6 +422,41 @@ def calcular_metricas_basicas(secuencias):
     
     return df
 
+def calcular_metricas_codificadas(codificadas):
+    """
+    Versión vectorizada de calcular_metricas_basicas sobre un SecuenciasCodificadas.
+
+    Con la política de Ns 'enmascarar', el porcentaje de GC se calcula sobre
+    las bases distintas de N; la longitud es siempre la del registro.
+
+    Parámetros:
+    -----------
+    codificadas : SecuenciasCodificadas o bloques.ResumenRegistros
+        Secuencias ya filtradas y con la política de Ns aplicada
+
+    Retorna:
+    --------
+    pandas.DataFrame
+        Mismas columnas que calcular_metricas_basicas: id, longitud, porcentaje_GC
+    """
+    longitudes = codificadas.longitudes
+    denominador = longitudes
+    if codificadas.politica_ns == 'enmascarar':
+        denominador = longitudes - codificadas.contar_ns()
+    gc = codificadas.contar_gc()
+    porcentaje_gc = np.zeros(len(codificadas), dtype=np.float64)
+    np.divide(gc, denominador, out=porcentaje_gc, where=denominador > 0)
+    porcentaje_gc *= 100
+
+    df = pd.DataFrame({
+        'id': codificadas.ids,
+        'longitud': longitudes,
+        'porcentaje_GC': np.round(porcentaje_gc, 2),
+    })
+    print(f" Calculadas métricas para {len(df)} secuencias")
+
+    return df
+
 def validar_secuencias(secuencias):
     """
     Valida que las secuencias contengan solo caracteres de nucleótidos válidos.
@@ -239,6 +465,7 @@ def validar_secuencias(secuencias):
     -----------
     secuencias : list
         Lista de tuplas (id_secuencia, secuencia) cargada desde FASTA
+        (secuencia str o bytes)
         
     Retorna:
     --------
@@ -248,6 +475,9 @@ def validar_secuencias(secuencias):
     nucleotidos_validos = {'A', 'T', 'C', 'G', 'N'}
     
     for id_sec, sec in secuencias:
+        if not isinstance(sec, str):
+            # bytes (parser rápido): translate borra los válidos en C y deja el resto
+            sec = bytes(sec).upper().translate(None, b'ATCGN').decode('latin-1')
         sec_set = set(sec.upper())
         if not sec_set.issubset(nucleotidos_validos):
             print(f" Secuencia {id_sec} contiene caracteres inválidos: {sec_set - nucleotidos_validos}")
@@ -0,0 +1,256 @@
+"""
+Tabla de métricas en disco (Parquet) con consultas por páginas.
+
+El pipeline escribe resumen_metricas.parquet junto al CSV. TablaColumnar lo
+consulta con pyarrow: el filtro (id, rango de GC, rango de longitud) se
+evalúa sobre las columnas en C++ usando las estadísticas de cada grupo de
+filas, el orden se calcula con índices y solo la página pedida se convierte
+a pandas. La última selección filtrada y ordenada se guarda, así que pasar
+de página no repite el filtro ni el orden.
+
+Uso:
+    tabla = TablaColumnar("results/resumen_metricas.parquet")
+    pagina = tabla.consultar(rango_gc=(40, 60), orden='longitud', descendente=True)
+    pagina['filas']  # DataFrame con tam_pagina filas como mucho
+"""
+import collections
+import functools
+import math
+import operator
+import threading
+
+# Filas por grupo de filas del Parquet: unidad mínima de lectura y de las
+# estadísticas min/max que permiten saltar grupos al filtrar
+TAM_GRUPO_FILAS = 64 * 1024
+
+TAM_PAGINA_POR_DEFECTO = 50
+MAX_TAM_PAGINA = 1000
+
+# Columnas de la tabla de métricas
+COLUMNA_ID = 'id'
+COLUMNA_LONGITUD = 'longitud'
+COLUMNA_GC = 'porcentaje_GC'
+COLUMNAS_ORDENABLES = (COLUMNA_ID, COLUMNA_LONGITUD, COLUMNA_GC)
+
+# Selecciones (filtro + orden) que se guardan por tabla
+MAX_SELECCIONES = 4
+
+
+def _importar_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ValueError(
+            "La tabla de resultados requiere el paquete 'pyarrow'. Instálelo con 'pip install pyarrow'."
+        )
+
+
+def escribir_tabla_columnar(df, ruta):
+    """
+    Escribe una tabla como Parquet (zstd, grupos de TAM_GRUPO_FILAS filas).
+
+    Lanza:
+    ------
+    ValueError: Si pyarrow no está instalado
+    """
+    _importar_pyarrow()
+    df.to_parquet(str(ruta), engine='pyarrow', compression='zstd', index=False, row_group_size=TAM_GRUPO_FILAS)
+
+
+def _validar_rango(nombre, rango):
+    """Normaliza un rango (mínimo, máximo) con extremos opcionales (None = sin límite)."""
+    if rango is None:
+        return None
+    minimo, maximo = rango
+    minimo = None if minimo is None else float(minimo)
+    maximo = None if maximo is None else float(maximo)
+    if minimo is not None and maximo is not None and minimo > maximo:
+        raise ValueError(f"Rango de {nombre} no válido: el mínimo ({minimo}) es mayor que el máximo ({maximo})")
+    if minimo is None and maximo is None:
+        return None
+    return minimo, maximo
+
+
+class TablaColumnar:
+    """
+    Consultas con filtro, orden y paginación sobre un Parquet de métricas.
+
+    Parámetros:
+    -----------
+    ruta : str o Path
+        Parquet escrito con escribir_tabla_columnar
+
+    Lanza:
+    ------
+    FileNotFoundError: Si el archivo no existe
+    ValueError: Si pyarrow no está instalado
+    """
+
+    def __init__(self, ruta):
+        _importar_pyarrow()
+        import pyarrow.parquet as pq
+
+        self.ruta = str(ruta)
+        self._metadatos = pq.read_metadata(self.ruta)
+        self.columnas = list(self._metadatos.schema.names)
+        self._selecciones = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def num_filas(self):
+        return self._metadatos.num_rows
+
+    def rango(self, columna):
+        """
+        (mínimo, máximo) de una columna numérica según las estadísticas del Parquet.
+
+        No lee los datos salvo que algún grupo de filas no tenga estadísticas.
+
+        Retorna:
+        --------
+        tuple o None
+            None si la tabla está vacía
+        """
+        if self.num_filas == 0:
+            return None
+        indice = self.columnas.index(columna)
+        minimos, maximos = [], []
+        for grupo in range(self._metadatos.num_row_groups):
+            estadisticas = self._metadatos.row_group(grupo).column(indice).statistics
+            if estadisticas is None or not estadisticas.has_min_max:
+                import pyarrow.compute as pc
+                import pyarrow.parquet as pq
+
+                extremos = pc.min_max(pq.read_table(self.ruta, columns=[columna])[columna]).as_py()
+                return float(extremos['min']), float(extremos['max'])
+            minimos.append(estadisticas.min)
+            maximos.append(estadisticas.max)
+        return float(min(minimos)), float(max(maximos))
+
+    def _filtro(self, filtro_id, rango_gc, rango_longitud):
+        """Expresión de pyarrow con todas las condiciones (None si no hay ninguna)."""
+        import pyarrow.compute as pc
+
+        condiciones = []
+        if filtro_id:
+            condiciones.append(pc.match_substring(pc.field(COLUMNA_ID), filtro_id, ignore_case=True))
+        for columna, rango in ((COLUMNA_GC, rango_gc), (COLUMNA_LONGITUD, rango_longitud)):
+            if rango is None:
+                continue
+            minimo, maximo = rango
+            if minimo is not None:
+                condiciones.append(pc.field(columna) >= minimo)
+            if maximo is not None:
+                condiciones.append(pc.field(columna) <= maximo)
+        return functools.reduce(operator.and_, condiciones) if condiciones else None
+
+    def _seleccion(self, clave):
+        """Filas filtradas y ordenadas (pyarrow.Table), guardadas por clave."""
+        with self._lock:
+            if clave in self._selecciones:
+                self._selecciones.move_to_end(clave)
+                return self._selecciones[clave]
+
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+
+        filtro_id, rango_gc, rango_longitud, orden, descendente = clave
+        tabla = ds.dataset(self.ruta, format='parquet').to_table(
+            filter=self._filtro(filtro_id, rango_gc, rango_longitud)
+        )
+        if orden is not None:
+            # sort_indices es estable: a igual valor se conserva el orden del archivo
+            indices = pc.sort_indices(tabla, sort_keys=[(orden, 'descending' if descendente else 'ascending')])
+            tabla = tabla.take(indices)
+
+        with self._lock:
+            self._selecciones[clave] = tabla
+            while len(self._selecciones) > MAX_SELECCIONES:
+                self._selecciones.popitem(last=False)
+        return tabla
+
+    def _leer_filas(self, inicio, cantidad):
+        """Filas [inicio, inicio + cantidad) sin filtro ni orden: solo se leen sus grupos de filas."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        grupos, desplazamiento, primera = [], 0, None
+        for grupo in range(self._metadatos.num_row_groups):
+            filas_grupo = self._metadatos.row_group(grupo).num_rows
+            if desplazamiento + filas_grupo > inicio and desplazamiento < inicio + cantidad:
+                grupos.append(grupo)
+                if primera is None:
+                    primera = desplazamiento
+            desplazamiento += filas_grupo
+        if not grupos:
+            return pa.table({c: [] for c in self.columnas})
+        tabla = pq.ParquetFile(self.ruta).read_row_groups(grupos)
+        return tabla.slice(inicio - primera, cantidad)
+
+    def consultar(
+        self,
+        filtro_id=None,
+        rango_gc=None,
+        rango_longitud=None,
+        orden=None,
+        descendente=False,
+        pagina=0,
+        tam_pagina=TAM_PAGINA_POR_DEFECTO
+    ):
+        """
+        Devuelve una página de la tabla filtrada y ordenada.
+
+        Parámetros:
+        -----------
+        filtro_id : str, optional
+            Texto que debe contener el id (sin distinguir mayúsculas)
+        rango_gc, rango_longitud : tuple, optional
+            (mínimo, máximo) inclusivos; cualquiera de los extremos puede ser None
+        orden : str, optional
+            Columna de COLUMNAS_ORDENABLES (por defecto, el orden del archivo)
+        descendente : bool
+            Orden descendente
+        pagina : int
+            Página pedida, empezando en 0 (se ajusta a la última si se pasa)
+        tam_pagina : int
+            Filas por página (1 a MAX_TAM_PAGINA)
+
+        Retorna:
+        --------
+        dict
+            - filas: DataFrame con las filas de la página
+            - total: filas que cumplen el filtro
+            - pagina: página devuelta (empezando en 0)
+            - paginas: número de páginas (al menos 1)
+
+        Lanza:
+        ------
+        ValueError: Si el orden, los rangos o el tamaño de página no son válidos
+        """
+        if orden is not None and orden not in COLUMNAS_ORDENABLES:
+            raise ValueError(f"Columna de orden no válida: '{orden}'. Opciones: {', '.join(COLUMNAS_ORDENABLES)}")
+        if not 1 <= tam_pagina <= MAX_TAM_PAGINA:
+            raise ValueError(f"El tamaño de página debe estar entre 1 y {MAX_TAM_PAGINA} (recibido: {tam_pagina})")
+        clave = (
+            (filtro_id or '').strip(),
+            _validar_rango("GC", rango_gc),
+            _validar_rango("longitud", rango_longitud),
+            orden,
+            bool(descendente) and orden is not None,
+        )
+
+        sin_seleccion = clave == ('', None, None, None, False)
+        total = self.num_filas if sin_seleccion else self._seleccion(clave).num_rows
+        paginas = max(1, math.ceil(total / tam_pagina))
+        pagina = min(max(int(pagina), 0), paginas - 1)
+        inicio = pagina * tam_pagina
+        if sin_seleccion:
+            filas = self._leer_filas(inicio, tam_pagina)
+        else:
+            filas = self._seleccion(clave).slice(inicio, tam_pagina)
+        return {
+            'filas': filas.to_pandas(),
+            'total': total,
+            'pagina': pagina,
+            'paginas': paginas,
+        }
@@ -0,0 +1,208 @@
+"""
+Validación completa de un FASTA antes del análisis.
+
+Recorre todo el archivo (descomprimido en flujo) en bloques grandes y
+clasifica cada byte con una tabla de búsqueda (bytes.translate): bases (A,
+C, G, T, N en mayúsculas o minúsculas), espacios y saltos de línea, o
+caracteres inválidos. Los conteos y las búsquedas sobre las clases también
+se hacen en C (bytes.count, bytes.find), así que en una sola pasada se
+obtienen el número de registros, el total de bases y la posición de los
+primeros caracteres inválidos sin construir ninguna secuencia.
+
+Los caracteres inválidos (códigos IUPAC como R o Y, huecos '-', etc.) se
+informan pero no impiden el análisis: la carga los omite igual que
+limpiar_y_normalizar_secuencias. Solo un problema de estructura (sin
+cabecera inicial, cabecera sin identificador, ningún registro) es fatal.
+"""
+from .bloques import abrir_fasta_en_flujo
+from .procesamiento import TAM_PREFIJO_CODIFICACION, _traducir_error_carga, detectar_codificacion
+
+# Bytes leídos en cada bloque
+TAM_BLOQUE_VALIDACION = 16 * 1024 * 1024
+
+# Posiciones de caracteres inválidos que se informan (el total se cuenta igual)
+MAX_POSICIONES_INVALIDAS = 20
+
+# Clase de cada byte para bytes.translate
+_CLASE_BASE = b'b'
+_CLASE_ESPACIO = b' '
+_CLASE_INVALIDA = b'x'
+_TABLA_CLASES = bytes(
+    _CLASE_BASE[0] if b in b'ACGTNacgtn' else _CLASE_ESPACIO[0] if b in b'\n\r\t ' else _CLASE_INVALIDA[0]
+    for b in range(256)
+)
+
+_SALTO = 0x0A      # b'\n'
+_CABECERA = 0x3E   # b'>'
+
+
+def _identificador(cabecera, codificacion):
+    """Primer campo de la cabecera, o None si está vacía."""
+    partes = bytes(cabecera).decode(codificacion, errors='replace').strip().split(None, 1)
+    return partes[0] if partes else None
+
+
+def _error_cabecera(linea):
+    return ValueError(f"La cabecera de la línea {linea} no tiene identificador de secuencia.")
+
+
+def validar_flujo_fasta(flujo, tam_bloque=TAM_BLOQUE_VALIDACION, max_posiciones=MAX_POSICIONES_INVALIDAS):
+    """
+    Valida un FASTA sin comprimir leyéndolo entero en bloques.
+
+    Parámetros:
+    -----------
+    flujo : archivo binario
+        FASTA sin comprimir
+    tam_bloque : int
+        Bytes por bloque (acota la memoria)
+    max_posiciones : int
+        Caracteres inválidos de los que se guarda la posición
+
+    Retorna:
+    --------
+    dict
+        - registros: número de registros (cabeceras)
+        - registros_vacios: registros sin ninguna base
+        - bases: total de bases A, C, G, T y N
+        - invalidos: total de caracteres inválidos en las secuencias (el
+          análisis los omite)
+        - posiciones_invalidas: hasta max_posiciones diccionarios
+          {'registro', 'linea', 'posicion', 'caracter'} (posicion es el byte
+          en el contenido descomprimido, empezando en 0)
+        - bytes: tamaño del contenido descomprimido
+
+    Lanza:
+    ------
+    ValueError: Si el contenido no empieza por una cabecera '>', una
+    cabecera no tiene identificador o no hay ningún registro
+    """
+    if tam_bloque <= 0:
+        raise ValueError(f"El tamaño de bloque debe ser positivo (recibido: {tam_bloque})")
+    resultado = {
+        'registros': 0,
+        'registros_vacios': 0,
+        'bases': 0,
+        'invalidos': 0,
+        'posiciones_invalidas': [],
+        'bytes': 0,
+    }
+    codificacion = None
+    cabecera = None          # bytearray mientras se lee una línea de cabecera
+    registro = None          # identificador del registro en curso
+    bases_registro = 0
+    inicio_linea = True
+    lineas = 0               # saltos de línea en los bloques anteriores
+
+    def cerrar_registro():
+        if registro is not None and bases_registro == 0:
+            resultado['registros_vacios'] += 1
+
+    while True:
+        bloque = flujo.read(tam_bloque)
+        if not bloque:
+            break
+        if codificacion is None:
+            codificacion = detectar_codificacion(bloque[:TAM_PREFIJO_CODIFICACION])
+        clases = bloque.translate(_TABLA_CLASES)
+        pos, total = 0, len(bloque)
+        while pos < total:
+            if cabecera is not None:
+                fin = bloque.find(b'\n', pos)
+                if fin == -1:
+                    cabecera += bloque[pos:]
+                    break
+                cabecera += bloque[pos:fin]
+                cerrar_registro()
+                registro = _identificador(cabecera, codificacion)
+                if registro is None:
+                    # Contar líneas solo aquí: hacerlo en cada cabecera sería cuadrático
+                    raise _error_cabecera(lineas + bloque.count(b'\n', 0, fin) + 1)
+                resultado['registros'] += 1
+                cabecera, bases_registro, inicio_linea = None, 0, True
+                pos = fin + 1
+                continue
+            if inicio_linea and bloque[pos] == _CABECERA:
+                cabecera = bytearray()
+                pos += 1
+                continue
+
+            siguiente = bloque.find(b'\n>', pos)
+            fin = total if siguiente == -1 else siguiente + 1
+            bases = clases.count(_CLASE_BASE, pos, fin)
+            invalidos = clases.count(_CLASE_INVALIDA, pos, fin)
+            if registro is None and bases + invalidos:
+                raise ValueError("Formato FASTA inválido: el archivo debe comenzar con '>' (cabecera de secuencia).")
+            bases_registro += bases
+            resultado['bases'] += bases
+            resultado['invalidos'] += invalidos
+            p = pos - 1
+            while invalidos and len(resultado['posiciones_invalidas']) < max_posiciones:
+                p = clases.find(_CLASE_INVALIDA, p + 1, fin)
+                if p == -1:
+                    break
+                resultado['posiciones_invalidas'].append({
+                    'registro': registro,
+                    'linea': lineas + bloque.count(b'\n', 0, p) + 1,
+                    'posicion': resultado['bytes'] + p,
+                    'caracter': chr(bloque[p]),
+                })
+            inicio_linea = bloque[fin - 1] == _SALTO
+            pos = fin
+
+        lineas += bloque.count(b'\n')
+        resultado['bytes'] += total
+
+    if cabecera is not None:
+        # Última línea: cabecera sin salto final ni secuencia
+        cerrar_registro()
+        registro = _identificador(cabecera, codificacion)
+        if registro is None:
+            raise _error_cabecera(lineas + 1)
+        resultado['registros'] += 1
+        bases_registro = 0
+    cerrar_registro()
+
+    if resultado['registros'] == 0:
+        raise ValueError("No se encontraron secuencias FASTA en el archivo (ninguna cabecera '>').")
+    return resultado
+
+
+def validar_fasta(fuente, nombre=None, tam_bloque=TAM_BLOQUE_VALIDACION, max_posiciones=MAX_POSICIONES_INVALIDAS):
+    """
+    Valida un FASTA completo (ruta, contenido o archivo binario; plano o comprimido).
+
+    Ver validar_flujo_fasta para el resultado. Un archivo es apto para el
+    análisis si no lanza error y resultado['bases'] es mayor que 0; si
+    resultado['invalidos'] no es 0, conviene avisar de que esos caracteres
+    se omitirán (ver describir_invalidos).
+
+    Lanza:
+    ------
+    FileNotFoundError: Si la ruta no existe
+    ValueError: Si el archivo está vacío, no se puede descomprimir o su
+    estructura no es FASTA
+    """
+    try:
+        with abrir_fasta_en_flujo(fuente, nombre) as flujo:
+            return validar_flujo_fasta(flujo, tam_bloque, max_posiciones)
+    except FileNotFoundError:
+        raise
+    except Exception as e:
+        raise _traducir_error_carga(e, nombre or "buffer") from e
+
+
+def describir_invalidos(resultado, max_ejemplos=5):
+    """
+    Texto breve con los caracteres inválidos encontrados por validar_fasta.
+
+    Ej: "3 caracteres distintos de A, C, G, T y N (se omitirán); 'X' en la línea 12 (gen1), 'R' en la línea 40 (gen2)"
+    """
+    ejemplos = [
+        f"'{p['caracter']}' en la línea {p['linea']} ({p['registro']})"
+        for p in resultado['posiciones_invalidas'][:max_ejemplos]
+    ]
+    texto = f"{resultado['invalidos']} caracteres distintos de A, C, G, T y N (se omitirán); " + ", ".join(ejemplos)
+    if resultado['invalidos'] > len(ejemplos):
+        texto += "..."
+    return texto
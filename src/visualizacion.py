@@ -2,7 +2,6 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
-from scipy.stats import gaussian_kde
 import os
 
 def grafico_gc(df, nombre_salida):
@@ -93,6 +92,9 @@ def relacion_longitud_gc(df_metricas):
     -------
     results/graficos/relacion_longitud_gc.png
     """
+    # scipy solo se carga para este gráfico
+    from scipy.stats import gaussian_kde
+
     plt.figure(figsize=(10, 6))
     x = df_metricas['longitud']
     y = df_metricas['porcentaje_GC']
@@ -1,17 +1,348 @@
 """
 Utilidad para comprimir resultados de análisis en un archivo ZIP.
+
+iterar_zip genera el ZIP por bloques a medida que lee cada miembro (de disco
+o de memoria), sin escribir el archivo completo: sirve tal cual como cuerpo
+de una respuesta HTTP por fragmentos o, unido, como descarga de Streamlit.
+crear_zip_resultados y crear_zip_desde_paths escriben ese mismo flujo a disco.
+
+Los miembros con deflate se comprimen por bloques en paralelo, las tablas
+pueden exportarse como CSV, CSV con zstd o Parquet, y manifiesto.json
+recoge el tamaño y el SHA-256 de cada archivo del paquete.
 """
+import collections
+import concurrent.futures
+import hashlib
+import io
+import json
 import os
+import struct
+import time
 import zipfile
+import zlib
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Formatos ya comprimidos: deflate no reduce su tamaño y solo gasta CPU
+EXTENSIONES_SIN_COMPRIMIR = ('.png', '.jpg', '.jpeg', '.gz', '.bgz', '.zst', '.zip', '.parquet')
+
+TAM_BLOQUE_ZIP = 1024 * 1024
+
+# Firmas de los registros del formato ZIP (APPNOTE)
+_FIRMA_LOCAL = 0x04034B50
+_FIRMA_DESCRIPTOR = 0x08074B50
+_FIRMA_CENTRAL = 0x02014B50
+_FIRMA_FIN64 = 0x06064B50
+_FIRMA_LOCALIZADOR64 = 0x07064B50
+_FIRMA_FIN = 0x06054B50
+# Bit 3: CRC y tamaños en el descriptor de datos; bit 11: nombres en UTF-8
+_BANDERAS = 0x0008 | 0x0800
+
+_NOMBRE_MANIFIESTO = "manifiesto.json"
+
+# Formatos de las tablas dentro del ZIP de resultados
+FORMATOS_TABLAS = ('csv', 'csv.zst', 'parquet')
+
+# Miembro del ZIP: (nombre dentro del ZIP, ruta en disco, contenido en memoria
+# o función sin argumentos que devuelve el contenido al llegar su turno)
+MiembroZip = Tuple[str, Union[str, Path, bytes, Callable[[], bytes]]]
+
+
+def metodo_compresion(nombre: str) -> int:
+    """ZIP_STORED para formatos ya comprimidos (PNG, gzip, zstd, Parquet...), ZIP_DEFLATED para el resto."""
+    return zipfile.ZIP_STORED if nombre.lower().endswith(EXTENSIONES_SIN_COMPRIMIR) else zipfile.ZIP_DEFLATED
+
+
+def _fecha_dos(instante: float) -> Tuple[int, int]:
+    """Fecha y hora en formato MS-DOS (el de las cabeceras ZIP)."""
+    t = time.localtime(instante)
+    anio = max(t.tm_year, 1980)
+    return (
+        (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+        ((anio - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday,
+    )
+
+
+def _bloques_miembro(fuente, tam_bloque: int) -> Iterator[bytes]:
+    """Lee un miembro (ruta o bytes) en bloques de tam_bloque."""
+    if isinstance(fuente, (bytes, bytearray, memoryview)):
+        vista = memoryview(fuente).cast('B')
+        for inicio in range(0, vista.nbytes, tam_bloque):
+            yield vista[inicio:inicio + tam_bloque]
+    else:
+        with open(fuente, 'rb') as origen:
+            yield from iter(lambda: origen.read(tam_bloque), b'')
+
+
+def _deflate_bloque(bloque, nivel: int, ultimo: bool) -> bytes:
+    """
+    Comprime un bloque como parte de un flujo deflate crudo.
+
+    Cada bloque se comprime por separado y termina en un límite de byte
+    (Z_SYNC_FLUSH), así que la concatenación de todos, con el último cerrado
+    por Z_FINISH, es un único flujo deflate válido (técnica de pigz).
+    """
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, -15)
+    return compresor.compress(bloque) + compresor.flush(zlib.Z_FINISH if ultimo else zlib.Z_SYNC_FLUSH)
+
+
+def _con_siguiente(bloques: Iterator[bytes]) -> Iterator[Tuple[bytes, bool]]:
+    """Empareja cada bloque con si es el último (un miembro vacío da un bloque vacío final)."""
+    anterior = None
+    for bloque in bloques:
+        if anterior is not None:
+            yield anterior, False
+        anterior = bloque
+    yield (anterior if anterior is not None else b''), True
+
+
+class _EntradaZip:
+    """Datos de un miembro ya escrito, para el directorio central."""
+
+    def __init__(self, nombre: bytes, metodo: int, hora: int, fecha: int, desplazamiento: int):
+        self.nombre = nombre
+        self.metodo = metodo
+        self.hora = hora
+        self.fecha = fecha
+        self.desplazamiento = desplazamiento
+        self.crc = 0
+        self.tam_comprimido = 0
+        self.tam_original = 0
+
+
+def iterar_zip(
+    miembros: Iterable[MiembroZip],
+    tam_bloque: int = TAM_BLOQUE_ZIP,
+    hilos: Optional[int] = None,
+    nivel: int = 6,
+    manifiesto: bool = False
+) -> Iterator[bytes]:
+    """
+    Genera un archivo ZIP por bloques, sin tenerlo entero en memoria ni en disco.
+    
+    Cada miembro se lee en bloques de tam_bloque y sus bytes comprimidos se
+    entregan en cuanto están listos, así que el primer byte sale enseguida y
+    la memoria usada no depende del tamaño total. Los bloques de los miembros
+    comprimidos con deflate se comprimen en paralelo en varios hilos (zlib
+    libera el GIL). El CRC y los tamaños se escriben tras cada miembro
+    (descriptor de datos) y se usa ZIP64 cuando hace falta.
+    
+    Parámetros:
+    -----------
+    miembros : iterable de (str, str/Path/bytes/callable)
+        Nombre dentro del ZIP y ruta en disco, contenido en memoria o
+        función que genera el contenido (se llama al llegar a ese miembro)
+    tam_bloque : int
+        Tamaño de lectura (y de compresión en paralelo) de cada miembro
+    hilos : int, optional
+        Hilos de compresión (por defecto: núcleos)
+    nivel : int
+        Nivel de deflate (1-9)
+    manifiesto : bool
+        Si True, añade al final manifiesto.json con el tamaño y el SHA-256
+        de cada miembro
+    
+    Retorna:
+    --------
+    iterator de bytes
+        Bloques consecutivos del archivo ZIP
+    """
+    hilos = hilos or os.cpu_count() or 1
+    entradas = []
+    registros_manifiesto = []
+    posicion = 0
+    
+    def miembros_y_manifiesto():
+        yield from miembros
+        if manifiesto:
+            contenido = json.dumps({'archivos': registros_manifiesto}, indent=2, ensure_ascii=False)
+            yield _NOMBRE_MANIFIESTO, contenido.encode('utf-8')
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=hilos) as executor:
+        for nombre, fuente in miembros_y_manifiesto():
+            if callable(fuente):
+                fuente = fuente()
+            metodo = metodo_compresion(nombre)
+            es_ruta = not isinstance(fuente, (bytes, bytearray, memoryview))
+            hora, fecha = _fecha_dos(os.stat(fuente).st_mtime if es_ruta else time.time())
+            entrada = _EntradaZip(nombre.encode('utf-8'), metodo, hora, fecha, posicion)
+            
+            # Cabecera local: CRC y tamaños van en el descriptor de datos
+            cabecera = struct.pack(
+                '<IHHHHHIIIHH', _FIRMA_LOCAL, 45, _BANDERAS, metodo, hora, fecha,
+                0, 0xFFFFFFFF, 0xFFFFFFFF, len(entrada.nombre), 20,
+            ) + entrada.nombre + struct.pack('<HHQQ', 0x0001, 16, 0, 0)
+            posicion += len(cabecera)
+            yield cabecera
+            
+            crc = 0
+            suma = hashlib.sha256()
+            if metodo == zipfile.ZIP_STORED:
+                for bloque in _bloques_miembro(fuente, tam_bloque):
+                    crc = zlib.crc32(bloque, crc)
+                    suma.update(bloque)
+                    entrada.tam_original += len(bloque)
+                    entrada.tam_comprimido += len(bloque)
+                    yield bytes(bloque)
+            else:
+                # Ventana acotada de bloques en compresión: memoria ~ 2·hilos·tam_bloque
+                pendientes = collections.deque()
+                for bloque, ultimo in _con_siguiente(_bloques_miembro(fuente, tam_bloque)):
+                    crc = zlib.crc32(bloque, crc)
+                    suma.update(bloque)
+                    entrada.tam_original += len(bloque)
+                    pendientes.append(executor.submit(_deflate_bloque, bytes(bloque), nivel, ultimo))
+                    while len(pendientes) > 2 * hilos or (pendientes and pendientes[0].done()):
+                        comprimido = pendientes.popleft().result()
+                        entrada.tam_comprimido += len(comprimido)
+                        yield comprimido
+                while pendientes:
+                    comprimido = pendientes.popleft().result()
+                    entrada.tam_comprimido += len(comprimido)
+                    yield comprimido
+            
+            entrada.crc = crc
+            descriptor = struct.pack('<IIQQ', _FIRMA_DESCRIPTOR, crc, entrada.tam_comprimido, entrada.tam_original)
+            posicion += entrada.tam_comprimido + len(descriptor)
+            yield descriptor
+            entradas.append(entrada)
+            if nombre != _NOMBRE_MANIFIESTO:
+                registros_manifiesto.append({
+                    'nombre': nombre, 'bytes': entrada.tam_original, 'sha256': suma.hexdigest(),
+                })
+    
+    yield _directorio_central(entradas, posicion)
+
+
+def _directorio_central(entradas: List[_EntradaZip], inicio: int) -> bytes:
+    """Directorio central y registros de fin (ZIP64 siempre: tamaños y desplazamientos de 64 bits)."""
+    partes = []
+    for e in entradas:
+        extra = struct.pack('<HHQQQ', 0x0001, 24, e.tam_original, e.tam_comprimido, e.desplazamiento)
+        partes.append(struct.pack(
+            '<IHHHHHHIIIHHHHHII', _FIRMA_CENTRAL, (3 << 8) | 45, 45, _BANDERAS, e.metodo, e.hora, e.fecha,
+            e.crc, 0xFFFFFFFF, 0xFFFFFFFF, len(e.nombre), len(extra), 0, 0, 0, 0o644 << 16, 0xFFFFFFFF,
+        ) + e.nombre + extra)
+    central = b''.join(partes)
+    fin_central = inicio + len(central)
+    n = len(entradas)
+    fin64 = struct.pack('<IQHHIIQQQQ', _FIRMA_FIN64, 44, 45, 45, 0, 0, n, n, len(central), inicio)
+    localizador = struct.pack('<IIQI', _FIRMA_LOCALIZADOR64, 0, fin_central, 1)
+    fin = struct.pack('<IHHHHIIH', _FIRMA_FIN, 0, 0, min(n, 0xFFFF), min(n, 0xFFFF),
+                      min(len(central), 0xFFFFFFFF), min(inicio, 0xFFFFFFFF), 0)
+    return central + fin64 + localizador + fin
+
+
+def escribir_zip(miembros: Iterable[MiembroZip], archivo_salida: str, **opciones) -> str:
+    """Escribe a disco el ZIP generado por iterar_zip (mismas opciones) y devuelve su ruta."""
+    with open(archivo_salida, 'wb') as f:
+        for bloque in iterar_zip(miembros, **opciones):
+            f.write(bloque)
+    return archivo_salida
+
+
+def _csv_a_zstd(ruta_csv: Path) -> bytes:
+    """Comprime un CSV con zstd usando todos los núcleos."""
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError(
+            "El formato 'csv.zst' requiere el paquete 'zstandard'. Instálelo con 'pip install zstandard'."
+        )
+    with open(ruta_csv, 'rb') as f:
+        return zstandard.ZstdCompressor(level=3, threads=-1).compress(f.read())
+
+
+def _csv_a_parquet(ruta_csv: Path) -> bytes:
+    """Convierte un CSV a Parquet (columnas tipadas, compresión zstd)."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ValueError(
+            "El formato 'parquet' requiere el paquete 'pyarrow'. Instálelo con 'pip install pyarrow'."
+        )
+    import pandas as pd
+    
+    salida = io.BytesIO()
+    pd.read_csv(ruta_csv).to_parquet(salida, engine='pyarrow', compression='zstd', index=False)
+    return salida.getvalue()
+
+
+def miembros_resultados(
+    directorio_resultados: str,
+    incluir_csv: bool = True,
+    incluir_graficos: bool = True,
+    incluir_perfiles: bool = True,
+    formato_tablas: str = 'csv'
+) -> List[MiembroZip]:
+    """
+    Lista los archivos de un directorio de resultados como miembros del ZIP.
+    
+    Parámetros:
+    -----------
+    formato_tablas : str
+        'csv' (tal cual), 'csv.zst' (CSV comprimido con zstd) o 'parquet'.
+        La conversión se hace al escribir el ZIP, no al listar.
+    
+    Retorna:
+    --------
+    list
+        (nombre dentro del ZIP, ruta o función): tablas en la raíz,
+        graficos/*.png y perfiles/*
+    
+    Lanza:
+    ------
+    ValueError: Si el directorio no existe o el formato no es válido
+    """
+    resultados_path = Path(directorio_resultados)
+    
+    if not resultados_path.exists():
+        raise ValueError(f"El directorio de resultados no existe: {directorio_resultados}")
+    if formato_tablas not in FORMATOS_TABLAS:
+        raise ValueError(f"Formato de tablas no válido: '{formato_tablas}'. Opciones: {', '.join(FORMATOS_TABLAS)}")
+    
+    miembros = []
+    # Agregar tablas (CSV o su conversión)
+    if incluir_csv:
+        for csv_file in (resultados_path / "resumen_metricas.csv", resultados_path / "codon_usage.csv"):
+            if not csv_file.exists():
+                continue
+            if formato_tablas == 'csv':
+                miembros.append((csv_file.name, csv_file))
+            elif formato_tablas == 'csv.zst':
+                miembros.append((f"{csv_file.name}.zst", lambda ruta=csv_file: _csv_a_zstd(ruta)))
+            elif csv_file.with_suffix('.parquet').exists():
+                # El pipeline ya escribe las métricas en Parquet (ver src/tabla_columnar.py)
+                miembros.append((f"{csv_file.stem}.parquet", csv_file.with_suffix('.parquet')))
+            else:
+                miembros.append((f"{csv_file.stem}.parquet", lambda ruta=csv_file: _csv_a_parquet(ruta)))
+    
+    # Agregar gráficos (en subdirectorio graficos/ dentro del ZIP)
+    if incluir_graficos:
+        graficos_dir = resultados_path / "graficos"
+        if graficos_dir.exists():
+            for png_file in sorted(graficos_dir.glob("*.png")):
+                miembros.append((f"graficos/{png_file.name}", png_file))
+    
+    # Agregar perfiles (--perfil en main.py o SALMO_PERFIL en la app)
+    if incluir_perfiles:
+        perfiles_dir = resultados_path / "perfiles"
+        if perfiles_dir.exists():
+            for perfil_file in sorted(perfiles_dir.iterdir()):
+                if perfil_file.is_file():
+                    miembros.append((f"perfiles/{perfil_file.name}", perfil_file))
+    
+    return miembros
 
 
 def crear_zip_resultados(
     directorio_resultados: str,
     archivo_salida: Optional[str] = None,
     incluir_csv: bool = True,
-    incluir_graficos: bool = True
+    incluir_graficos: bool = True,
+    incluir_perfiles: bool = True,
+    formato_tablas: str = 'csv',
+    manifiesto: bool = True
 ) -> str:
     """
     Crea un archivo ZIP con los resultados del análisis.
@@ -28,49 +359,33 @@ def crear_zip_resultados(
         Si True, incluye los archivos CSV
     incluir_graficos : bool
         Si True, incluye los gráficos PNG
+    incluir_perfiles : bool
+        Si True, incluye los perfiles de rendimiento de perfiles/ (si existen)
+    formato_tablas : str
+        'csv', 'csv.zst' o 'parquet' (ver miembros_resultados)
+    manifiesto : bool
+        Si True, incluye manifiesto.json con el SHA-256 de cada archivo
     
     Retorna:
     --------
     str
         Ruta del archivo ZIP creado
     """
-    resultados_path = Path(directorio_resultados)
-    
-    if not resultados_path.exists():
-        raise ValueError(f"El directorio de resultados no existe: {directorio_resultados}")
+    miembros = miembros_resultados(directorio_resultados, incluir_csv, incluir_graficos, incluir_perfiles, formato_tablas)
     
     # Determinar nombre del archivo ZIP
     if archivo_salida is None:
-        archivo_salida = str(resultados_path / "resultados_analisis.zip")
+        archivo_salida = str(Path(directorio_resultados) / "resultados_analisis.zip")
     else:
         archivo_salida = str(Path(archivo_salida))
     
-    # Crear archivo ZIP
-    with zipfile.ZipFile(archivo_salida, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        # Agregar archivos CSV
-        if incluir_csv:
-            csv_files = [
-                resultados_path / "resumen_metricas.csv",
-                resultados_path / "codon_usage.csv",
-            ]
-            for csv_file in csv_files:
-                if csv_file.exists():
-                    zipf.write(csv_file, csv_file.name)
-        
-        # Agregar gráficos
-        if incluir_graficos:
-            graficos_dir = resultados_path / "graficos"
-            if graficos_dir.exists():
-                for png_file in graficos_dir.glob("*.png"):
-                    # Guardar en subdirectorio graficos/ dentro del ZIP
-                    zipf.write(png_file, f"graficos/{png_file.name}")
-    
-    return archivo_salida
+    return escribir_zip(miembros, archivo_salida, manifiesto=manifiesto)
 
 
 def crear_zip_desde_paths(
     archivos: List[str],
-    archivo_salida: str
+    archivo_salida: str,
+    manifiesto: bool = True
 ) -> str:
     """
     Crea un archivo ZIP desde una lista de paths de archivos.
@@ -81,26 +396,26 @@ def crear_zip_desde_paths(
         Lista de rutas de archivos a incluir en el ZIP
     archivo_salida : str
         Ruta del archivo ZIP de salida
+    manifiesto : bool
+        Si True, incluye manifiesto.json con el SHA-256 de cada archivo
     
     Retorna:
     --------
     str
         Ruta del archivo ZIP creado
     """
-    with zipfile.ZipFile(archivo_salida, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for archivo in archivos:
-            archivo_path = Path(archivo)
-            if archivo_path.exists():
-                # Mantener estructura de directorios relativa
-                if archivo_path.is_file():
-                    zipf.write(archivo_path, archivo_path.name)
-                else:
-                    # Si es un directorio, agregar todos los archivos recursivamente
-                    for file_path in archivo_path.rglob("*"):
-                        if file_path.is_file():
-                            # Mantener estructura relativa
-                            arcname = file_path.relative_to(archivo_path.parent)
-                            zipf.write(file_path, arcname)
+    miembros = []
+    for archivo in archivos:
+        archivo_path = Path(archivo)
+        if archivo_path.exists():
+            # Mantener estructura de directorios relativa
+            if archivo_path.is_file():
+                miembros.append((archivo_path.name, archivo_path))
+            else:
+                # Si es un directorio, agregar todos los archivos recursivamente
+                for file_path in sorted(archivo_path.rglob("*")):
+                    if file_path.is_file():
+                        # Mantener estructura relativa
+                        miembros.append((str(file_path.relative_to(archivo_path.parent)), file_path))
     
-    return archivo_salida
-
+    return escribir_zip(miembros, archivo_salida, manifiesto=manifiesto)